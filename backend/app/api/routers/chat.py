@@ -1,20 +1,36 @@
+import json
 import logging
-from typing import Dict, Any, List
-from fastapi import APIRouter, HTTPException, Depends, Query
+import functools
+from typing import Dict, Any, List, AsyncIterator, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.services.chat.chat_service import ChatService
-from app.services.chat.chat_history_service import ChatHistoryService
+from app.services.chat.chat_history_service import ChatHistoryService, encode_cursor
+from app.services.chat.session_summarizer import session_summarizer
+from app.services.chat.history_retention import history_maintenance
+from app.services.chat.history_writer import history_writer
+from app.services.chat.history_cache import history_cache
 from app.interfaces.chat_interface import ChatServiceInterface
 from app.exceptions.chat_exceptions import ChatValidationException, ChatProcessingException
+from app.exceptions.llm_exceptions import LLMUnavailableException
 from app.api.deps import get_db, get_current_active_user
 from app.models.user import User
+from db.pool import pool_stats
+from db.session import SessionLocal, engine
+from app.embeddings.client import embeddings
+from app.llm.client import resilient_llm
+from app.services.rag.answer_cache import answer_cache
+from app.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+@functools.lru_cache()
 def get_chat_service() -> ChatServiceInterface:
+    """Return the process-wide chat service; it holds no per-request state."""
     return ChatService()
 
 def get_history_service(db: Session) -> ChatHistoryService:
@@ -22,6 +38,7 @@ def get_history_service(db: Session) -> ChatHistoryService:
 
 def handle_chat_exceptions(func):
     """Decorator to handle common chat exceptions."""
+    @functools.wraps(func)
     async def wrapper(*args, **kwargs):
         try:
             return await func(*args, **kwargs)
@@ -31,6 +48,9 @@ def handle_chat_exceptions(func):
         except ChatProcessingException as e:
             logger.error("Processing error: %s", str(e))
             raise HTTPException(status_code=500, detail="Error processing chat request")
+        except LLMUnavailableException as e:
+            logger.warning("LLM unavailable: %s", str(e))
+            raise HTTPException(status_code=503, detail="Chat service is temporarily unavailable")
         except Exception as e:
             logger.error("Unexpected error: %s", str(e))
             raise HTTPException(status_code=500, detail="Internal server error")
@@ -58,15 +78,13 @@ async def chat_ask(
     history_service = get_history_service(db)
     session_id = str(current_user.id)
     
-    # Save user message
-    history_service.save_message(current_user.id, "user", request.message, session_id)
+    # Get prior history and process request
+    history = await history_service.aget_prompt_history_as_dict(current_user.id, session_id)
+    response = await chat_service.aprocess_chat_request(request, session_id, history)
     
-    # Get recent history and process request
-    history = history_service.get_recent_history_as_dict(current_user.id, session_id)
-    response = chat_service.process_chat_request(request, session_id, history)
-    
-    # Save assistant response
-    history_service.save_message(current_user.id, "assistant", response, session_id)
+    # Save the turn in one write and fold older turns into the session summary
+    await history_service.asave_turn(current_user.id, session_id, request.message, response)
+    session_summarizer.schedule(current_user.id, session_id)
     
     return ChatResponse(response=response)
 
@@ -80,23 +98,116 @@ async def chat_send(
     """Alias for /ask endpoint to match frontend expectations."""
     return await chat_ask(request, current_user, db, chat_service)
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_chat_events(
+    http_request: Request,
+    token_stream: AsyncIterator[str],
+    user_id: int,
+    session_id: str,
+    user_message: str
+) -> AsyncIterator[str]:
+    """Relay tokens as SSE frames and persist the turn once the stream completes.
+
+    If the client disconnects, the token stream is closed, which cancels the
+    upstream LLM call, and nothing is persisted. ``done`` is only sent once
+    the turn is saved; a failed save ends the stream with an ``error`` event.
+    """
+    chunks = []
+    try:
+        async for token in token_stream:
+            if await http_request.is_disconnected():
+                logger.info("Client disconnected, cancelling chat stream for user %s", user_id)
+                return
+            chunks.append(token)
+            yield format_sse("token", {"content": token})
+    except LLMUnavailableException as e:
+        logger.warning("LLM unavailable: %s", str(e))
+        yield format_sse("error", {"detail": "Chat service is temporarily unavailable"})
+        return
+    except Exception as e:
+        logger.error("Error streaming chat response: %s", str(e))
+        yield format_sse("error", {"detail": "Error processing chat request"})
+        return
+    finally:
+        await token_stream.aclose()
+
+    response = "".join(chunks)
+    # The request-scoped session may already be closed once streaming starts.
+    db = SessionLocal()
+    try:
+        await get_history_service(db).asave_turn(user_id, session_id, user_message, response)
+    except Exception as e:
+        logger.error("Error saving streamed chat turn for user %s: %s", user_id, str(e))
+        yield format_sse("error", {"detail": "Error saving chat history"})
+        return
+    finally:
+        db.close()
+    session_summarizer.schedule(user_id, session_id)
+    yield format_sse("done", {"response": response})
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    chat_service: ChatServiceInterface = Depends(get_chat_service)
+) -> StreamingResponse:
+    """Stream the chat response as Server-Sent Events."""
+    history_service = get_history_service(db)
+    session_id = str(current_user.id)
+    
+    try:
+        chat_service.validate_request(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    history = await history_service.aget_prompt_history_as_dict(current_user.id, session_id)
+    token_stream = chat_service.astream_chat_request(request, session_id, history)
+    
+    return StreamingResponse(
+        stream_chat_events(http_request, token_stream, current_user.id, session_id, request.message),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/history")
 async def get_chat_history(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ) -> Dict[str, Any]:
-    """Get chat history for the current user."""
+    """Get chat history for the current user, newest page first.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` to fetch the next,
+    older page; it is ``None`` on the last page. ``offset`` is still
+    accepted but gets slower the deeper the page.
+    """
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
     try:
         history_service = get_history_service(db)
-        messages = history_service.get_history(current_user.id, limit, offset)
-        total = history_service.get_message_count(current_user.id)
+        if offset:
+            messages = await history_service.aget_history(current_user.id, limit, offset)
+            next_cursor = None
+        else:
+            messages, next_cursor = await history_service.aget_history_page(current_user.id, limit, cursor)
+        total = await history_service.aget_message_count(current_user.id)
+        if offset and messages and offset + limit < total:
+            next_cursor = encode_cursor(messages[0])
         
         return {
             "messages": [convert_message_to_response(msg) for msg in messages],
-            "total": total
+            "total": total,
+            "next_cursor": next_cursor
         }
+    except ChatValidationException as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error("Error getting chat history: %s", str(e))
         raise HTTPException(status_code=500, detail="Error retrieving chat history")
@@ -109,7 +220,7 @@ async def clear_chat_history(
     """Clear chat history for the current user."""
     try:
         history_service = get_history_service(db)
-        history_service.clear_history(current_user.id)
+        await history_service.aclear_history(current_user.id)
         return {"message": "Chat history cleared successfully"}
     except Exception as e:
         logger.error("Error clearing chat history: %s", str(e))
@@ -120,18 +231,29 @@ async def chat_health(
     chat_service: ChatServiceInterface = Depends(get_chat_service)
 ) -> Dict[str, Any]:
     """Get chat service health status."""
-    health_status = chat_service.health_check()
+    health_status = await chat_service.ahealth_check()
     
     return {
         "status": health_status.get("overall", "unknown"),
         "service": "chat",
         "version": "1.0.0",
         "checks": health_status,
+        "caches": {
+            "embeddings": embeddings.stats(),
+            "answers": answer_cache.stats(),
+            "history": history_cache.stats()
+        },
+        "llm": resilient_llm.stats(),
+        "history_writer": history_writer.stats(),
+        "history_maintenance": history_maintenance.stats(),
+        "database_pool": pool_stats(engine),
+        "metrics": metrics.snapshot(),
         "features": [
             "RAG-powered responses",
             "Score filtering", 
             "Business type adaptation",
-            "Conversation history"
+            "Conversation history",
+            "Token streaming (SSE)"
         ]
     }
 
@@ -29,18 +29,108 @@ class AppSettings(BaseSettings):
     postgres_password: str = ""
     postgres_db: str = ""
 
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = -1
+    db_pool_pre_ping: bool = False
+    db_statement_timeout_ms: int = 0
+
     openai_api_key: str = ""
 
     jwt_secret_key: str = ""
     jwt_algorithm: str = ""
     jwt_access_token_expire_minutes: int = 0
+
+    rag_engine_registry_size: int = 32
+    vector_backend: str = "chroma"
+    numpy_store_path: str = "data/numpy"
+    faiss_store_path: str = "data/faiss"
+    faiss_index_type: str = "flat"
+    faiss_nlist: int = 100
+    faiss_nprobe: int = 8
+    faiss_hnsw_m: int = 32
+    faiss_ef_construction: int = 200
+    faiss_ef_search: int = 64
+    mmr_fetch_multiplier: int = 4
+    hybrid_vector_k: int = 0
+    hybrid_lexical_k: int = 0
+    hybrid_rrf_k: int = 60
+    ingest_batch_size: int = 256
+    ingest_max_workers: int = 4
+    ingest_requests_per_second: float = 5.0
+    ingest_flush_every_batches: int = 20
+    ingest_checkpoint_path: str = "data/ingest_checkpoint.json"
+
+    llm_provider: str = "openai"
+    embedding_provider: str = "openai"
+
+    embedding_model: str = "text-embedding-3-large"
+    embedding_cache_size: int = 10000
+    embedding_cache_ttl_seconds: int = 86400
+    embedding_cache_disk_path: str = ""
+
+    answer_cache_enabled: bool = True
+    answer_cache_size: int = 1000
+    answer_cache_similarity_threshold: float = 0.97
+    answer_cache_ttl_seconds: int = 600
+
+    product_snapshot_cache_size: int = 50000
+    product_snapshot_ttl_seconds: int = 30
+
+    prompt_token_budget: int = 3000
+    prompt_context_token_budget: int = 1200
+    prompt_history_message_max_tokens: int = 400
+
+    chat_summary_enabled: bool = True
+    chat_summary_keep_recent_messages: int = 4
+    chat_summary_min_new_messages: int = 4
+    chat_summary_max_tokens: int = 300
+
+    chat_history_write_behind: bool = False
+    chat_history_write_batch_size: int = 500
+    chat_history_write_interval_ms: int = 50
+    chat_history_write_max_pending: int = 10000
+    chat_history_write_max_retries: int = 3
+
+    chat_history_cache_backend: str = "memory"
+    chat_history_cache_messages: int = 20
+    chat_history_cache_max_sessions: int = 10000
+    chat_history_cache_max_mb: int = 64
+    chat_history_cache_ttl_seconds: int = 600
+    chat_history_cache_redis_url: str = "redis://localhost:6379/0"
+
+    chat_history_retention_days: int = 0
+    chat_history_archive_retention_days: int = 0
+    chat_history_retention_interval_seconds: int = 3600
+    chat_history_delete_batch_size: int = 1000
+    chat_history_delete_pause_ms: int = 10
+
+    llm_timeout_seconds: float = 30
+    llm_max_retries: int = 2
+    llm_retry_backoff_seconds: float = 0.5
+    llm_retry_backoff_max_seconds: float = 8
+    llm_max_concurrency: int = 32
+    llm_queue_timeout_seconds: float = 5
+    llm_max_connections: int = 64
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30
+
+    fake_llm_mode: str = "canned"
+    fake_llm_latency_distribution: str = "lognormal"
+    fake_llm_latency_ms: float = 400
+    fake_llm_latency_spread: float = 0.5
+    fake_llm_tokens_per_second: float = 60
+    fake_embedding_dimension: int = 1536
+    fake_embedding_latency_ms: float = 0
+    fake_provider_seed: int = 42
     
     class Config:
         env_file = ".env"
         case_sensitive = False
     
     def __post_init__(self):
-        if not self.openai_api_key:
+        if "openai" in (self.llm_provider, self.embedding_provider) and not self.openai_api_key:
             raise ValueError("OPENAI_API_KEY is required in environment variables")
         
         if not all([self.postgres_host, self.postgres_user, self.postgres_password, self.postgres_db]):
@@ -8,6 +8,11 @@ logger = logging.getLogger(__name__)
 load_dotenv(find_dotenv())
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    logger.error("OPENAI_API_KEY is not set")
-    raise ValueError("OPENAI_API_KEY is not set")
\ No newline at end of file
+
+
+def require_openai_api_key() -> str:
+    """Return the OpenAI key; only the OpenAI providers need one."""
+    if not OPENAI_API_KEY:
+        logger.error("OPENAI_API_KEY is not set")
+        raise ValueError("OPENAI_API_KEY is not set")
+    return OPENAI_API_KEY
\ No newline at end of file
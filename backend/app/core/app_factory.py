@@ -2,14 +2,21 @@ import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 from app.config.app_config import app_settings
 from app.core.logging_config import LoggingConfig
 from app.core.exception_handlers import ExceptionHandlers
 from app.api.routers import chat, auth, products
+from app.schemas.chat import ChatRequest
 
 logger = logging.getLogger(__name__)
 
+# How long shutdown waits for write-behind chat messages to reach the database.
+HISTORY_WRITER_SHUTDOWN_SECONDS = 30
+# Cleared histories still being deleted at shutdown are finished by the next retention pass.
+HISTORY_MAINTENANCE_SHUTDOWN_SECONDS = 5
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -17,9 +24,36 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting RAG Chat API...")
     logger.info(f"Environment: {app_settings.app_name} v{app_settings.app_version}")
+    _warmup_rag_engines()
+    from app.services.chat.history_retention import history_maintenance
+    if history_maintenance.interval_seconds > 0:
+        history_maintenance.start()
     yield
     # Shutdown
     logger.info("Shutting down RAG Chat API...")
+    from app.services.chat.session_summarizer import session_summarizer
+    await session_summarizer.wait_idle()
+    from app.services.chat.history_writer import history_writer
+    await run_in_threadpool(history_writer.close, HISTORY_WRITER_SHUTDOWN_SECONDS)
+    await run_in_threadpool(history_maintenance.close, HISTORY_MAINTENANCE_SHUTDOWN_SECONDS)
+    from app.services.rag.rag_service import engine_registry
+    engine_registry.clear()
+    from db.session import engine
+    engine.dispose()
+
+
+def _warmup_rag_engines() -> None:
+    """Build the engine for the default chat request so the first call is warm."""
+    try:
+        from app.services.rag.rag_service import engine_registry
+        defaults = ChatRequest(message="warmup")
+        engine_registry.warmup([
+            engine_registry.make_key(
+                defaults.k, defaults.use_scores, defaults.max_score, defaults.business_type, defaults.retrieval_mode
+            )
+        ])
+    except Exception as e:
+        logger.error(f"RAG engine warmup failed: {str(e)}")
 
 
 class AppFactory:
@@ -67,10 +101,12 @@ class AppFactory:
     def _register_exception_handlers(app: FastAPI) -> None:
         """Register exception handlers."""
         from app.exceptions.chat_exceptions import ChatException, ChatValidationException, ChatProcessingException
+        from app.exceptions.llm_exceptions import LLMUnavailableException
         
         app.add_exception_handler(ChatException, ExceptionHandlers.chat_exception_handler)
         app.add_exception_handler(ChatValidationException, ExceptionHandlers.validation_exception_handler)
         app.add_exception_handler(ChatProcessingException, ExceptionHandlers.processing_exception_handler)
+        app.add_exception_handler(LLMUnavailableException, ExceptionHandlers.llm_unavailable_exception_handler)
         app.add_exception_handler(Exception, ExceptionHandlers.general_exception_handler)
         
         logger.info("Exception handlers registered")
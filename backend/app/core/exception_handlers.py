@@ -3,6 +3,7 @@ from typing import Dict, Any
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from app.exceptions.chat_exceptions import ChatException, ChatValidationException, ChatProcessingException
+from app.exceptions.llm_exceptions import LLMUnavailableException
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +50,19 @@ class ExceptionHandlers:
             }
         )
     
+    @staticmethod
+    async def llm_unavailable_exception_handler(request: Request, exc: LLMUnavailableException) -> JSONResponse:
+        """Handle calls rejected by the LLM circuit breaker or concurrency limit."""
+        logger.warning(f"LLM unavailable: {str(exc)}")
+        return JSONResponse(
+            status_code=503,
+            content={
+                "error": "Service unavailable",
+                "detail": "Chat service is temporarily unavailable",
+                "type": "llm_unavailable"
+            }
+        )
+    
     @staticmethod
     async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
         """Handle HTTP exceptions."""
@@ -0,0 +1,36 @@
+import math
+import random
+import threading
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "lognormal")
+
+
+class LatencyProfile:
+    """Samples simulated upstream delays, in seconds.
+
+    - ``constant``: always ``median_ms``.
+    - ``uniform``: evenly spread over ``median_ms ± spread`` milliseconds.
+    - ``lognormal``: ``median_ms * exp(N(0, spread))``, the long right tail
+      typical of hosted model APIs.
+    """
+
+    def __init__(self, distribution: str = "constant", median_ms: float = 0, spread: float = 0, seed: int = None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency distribution must be one of: {', '.join(LATENCY_DISTRIBUTIONS)}")
+        self.distribution = distribution
+        self.median_ms = median_ms
+        self.spread = spread
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        with self._lock:
+            if self.distribution == "uniform":
+                delay_ms = self._random.uniform(self.median_ms - self.spread, self.median_ms + self.spread)
+            elif self.distribution == "lognormal":
+                delay_ms = self.median_ms * math.exp(self._random.gauss(0, self.spread))
+            else:
+                delay_ms = self.median_ms
+        return max(delay_ms, 0.0) / 1000
@@ -0,0 +1,71 @@
+import threading
+from collections import deque
+from typing import Any, Deque, Dict
+
+
+class _Distribution:
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self.recent)
+
+        def percentile(p: float) -> float:
+            return recent[min(len(recent) - 1, int(p * len(recent)))] if recent else 0.0
+
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "max": self.max,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95)
+        }
+
+
+class MetricsRegistry:
+    """Process-wide counters and value distributions.
+
+    Distributions keep exact count/mean/max plus percentiles over the last
+    ``window`` observations. ``snapshot`` is what the health endpoints expose.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._counters: Dict[str, float] = {}
+        self._distributions: Dict[str, _Distribution] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            distribution = self._distributions.get(name)
+            if distribution is None:
+                distribution = self._distributions[name] = _Distribution(self.window)
+            distribution.observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "distributions": {name: d.snapshot() for name, d in self._distributions.items()}
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._distributions.clear()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import json
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+
+def make_flight_key(payload: Any) -> str:
+    """Stable key for a JSON-serializable request payload."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls made from worker threads.
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight block and receive the same result or exception. Nothing is cached
+    once the call returns.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.increment(f"{self.name}_coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """Coalesce concurrent identical coroutine calls on an event loop.
+
+    The upstream call runs as its own task and every caller awaits it through
+    ``asyncio.shield``, so cancelling one caller (for example a client that
+    disconnected) does not cancel the call for the others. When the last
+    waiting caller is cancelled the upstream task is cancelled too. Results
+    and exceptions are delivered to all callers; nothing is cached once the
+    task finishes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _AsyncCall]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _forget(self, calls: Dict[Hashable, _AsyncCall], key: Hashable, call: _AsyncCall) -> None:
+        if calls.get(key) is call:
+            del calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        calls = self._calls.setdefault(loop, {})
+        call = calls.get(key)
+        if call is None:
+            call = calls[key] = _AsyncCall(loop.create_task(fn()))
+            call.task.add_done_callback(lambda _task: self._forget(calls, key, call))
+        else:
+            metrics.increment(f"{self.name}_coalesced")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Detach first so a new caller starts a fresh call instead of
+                # joining one that is being cancelled.
+                self._forget(calls, key, call)
+                call.task.cancel()
@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import TTLCache
+from app.core.single_flight import AsyncSingleFlight, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def make_cache_key(text: str, model_name: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class SQLiteEmbeddingStore:
+    """Disk tier for cached embeddings so warm entries survive restarts."""
+
+    def __init__(self, path: str, ttl_seconds: float = 0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        vector, created_at = row
+        if self.ttl_seconds > 0 and created_at + self.ttl_seconds < time.time():
+            self.delete(key)
+            return None
+        return np.frombuffer(vector, dtype=np.float32).tolist()
+
+    def set(self, key: str, embedding: List[float]) -> None:
+        blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                (key, blob, time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that memoizes query embeddings.
+
+    Lookups go memory LRU -> optional disk tier -> upstream model. Keys combine
+    the model name with the normalized query text, and concurrent misses for
+    the same key share one upstream request. Normalization only shapes the
+    key: the model is sent the query as written, and every caller gets its
+    own copy of the cached vector. Document embeddings (the
+    ingestion path) are passed through untouched so a catalog seed does not
+    evict the hot query entries.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        max_entries: int = 10000,
+        ttl_seconds: float = 0,
+        disk_store: Optional[SQLiteEmbeddingStore] = None
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.memory = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.disk_store = disk_store
+        self.disk_hits = 0
+        self._flight = SingleFlight("embedding")
+        self._aflight = AsyncSingleFlight("embedding")
+
+    def _lookup_disk(self, key: str) -> Optional[List[float]]:
+        if self.disk_store is None:
+            return None
+        try:
+            embedding = self.disk_store.get(key)
+        except Exception as e:
+            logger.warning("Embedding disk cache read failed: %s", str(e))
+            return None
+        if embedding is not None:
+            self.disk_hits += 1
+            self.memory.set(key, embedding)
+        return embedding
+
+    def _store(self, key: str, embedding: List[float]) -> None:
+        self.memory.set(key, embedding)
+        if self.disk_store is not None:
+            try:
+                self.disk_store.set(key, embedding)
+            except Exception as e:
+                logger.warning("Embedding disk cache write failed: %s", str(e))
+
+    def embed_query(self, text: str) -> List[float]:
+        key = make_cache_key(text, self.model_name)
+        embedding = self.memory.get(key)
+        if embedding is None:
+            embedding = self._lookup_disk(key)
+        if embedding is None:
+            embedding = self._flight.do(key, lambda: self._embed_and_store(key, text))
+        return list(embedding)
+
+    def _embed_and_store(self, key: str, text: str) -> List[float]:
+        embedding = self.underlying.embed_query(text)
+        self._store(key, embedding)
+        return embedding
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = make_cache_key(text, self.model_name)
+        embedding = self.memory.get(key)
+        if embedding is None and self.disk_store is not None:
+            embedding = await run_in_threadpool(self._lookup_disk, key)
+        if embedding is None:
+            embedding = await self._aflight.do(key, lambda: self._aembed_and_store(key, text))
+        return list(embedding)
+
+    async def _aembed_and_store(self, key: str, text: str) -> List[float]:
+        embedding = await self.underlying.aembed_query(text)
+        if self.disk_store is not None:
+            await run_in_threadpool(self._store, key, embedding)
+        else:
+            self.memory.set(key, embedding)
+        return embedding
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.underlying.aembed_documents(texts)
+
+    def clear(self) -> None:
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["model"] = self.model_name
+        stats["disk_enabled"] = self.disk_store is not None
+        stats["disk_hits"] = self.disk_hits
+        return stats
@@ -1,15 +1,63 @@
 import logging
+from pathlib import Path
 from dotenv import load_dotenv, find_dotenv
 from langchain_openai import OpenAIEmbeddings
-from app.config.settings import OPENAI_API_KEY
+from app.config.settings import require_openai_api_key
+from app.config.app_config import app_settings
+from app.core.latency import LatencyProfile
+from app.embeddings.cache import CachedEmbeddings, SQLiteEmbeddingStore
+from app.embeddings.fake import HashEmbeddings
 
 logger = logging.getLogger(__name__)
 
 load_dotenv(find_dotenv())
 
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-large",
-    openai_api_key=OPENAI_API_KEY
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+
+def _build_base_embeddings():
+    """Create the embedding model selected by ``EMBEDDING_PROVIDER``; returns ``(model, cache name)``."""
+    if app_settings.embedding_provider == "fake":
+        logger.info("Using offline hash embeddings (%d dimensions)", app_settings.fake_embedding_dimension)
+        model = HashEmbeddings(
+            dimension=app_settings.fake_embedding_dimension,
+            latency=LatencyProfile(median_ms=app_settings.fake_embedding_latency_ms)
+        )
+        # Keeps fake vectors out of cache entries written by a real model.
+        return model, f"hash-{app_settings.fake_embedding_dimension}"
+    if app_settings.embedding_provider != "openai":
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{app_settings.embedding_provider}', expected 'openai' or 'fake'")
+    model = OpenAIEmbeddings(
+        model=app_settings.embedding_model,
+        openai_api_key=require_openai_api_key()
+    )
+    return model, app_settings.embedding_model
+
+
+base_embeddings, embedding_cache_name = _build_base_embeddings()
+
+
+def _build_disk_store():
+    if not app_settings.embedding_cache_disk_path:
+        return None
+    path = Path(app_settings.embedding_cache_disk_path)
+    if not path.is_absolute():
+        path = ROOT / path
+    try:
+        logger.info("Using embedding disk cache at %s", path)
+        return SQLiteEmbeddingStore(str(path), ttl_seconds=app_settings.embedding_cache_ttl_seconds)
+    except Exception as e:
+        logger.error("Failed to open embedding disk cache, continuing in memory only: %s", str(e))
+        return None
+
+
+embeddings = CachedEmbeddings(
+    base_embeddings,
+    model_name=embedding_cache_name,
+    max_entries=app_settings.embedding_cache_size,
+    ttl_seconds=app_settings.embedding_cache_ttl_seconds,
+    disk_store=_build_disk_store()
 )
 
 def embed_text(text: str) -> list[float]:
@@ -21,3 +69,13 @@ def embed_text(text: str) -> list[float]:
     except Exception as e:
         logger.error("Failed to generate embedding: %s", str(e))
         raise
+
+async def aembed_text(text: str) -> list[float]:
+    try:
+        logger.info("Generating async embedding for text of length %d", len(text))
+        embedding = await embeddings.aembed_query(text)
+        logger.info("Async embedding generated successfully, dimension: %d", len(embedding))
+        return embedding
+    except Exception as e:
+        logger.error("Failed to generate async embedding: %s", str(e))
+        raise
@@ -0,0 +1,62 @@
+import asyncio
+import hashlib
+import re
+import time
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.latency import LatencyProfile
+
+_WORD = re.compile(r"[0-9a-z]+")
+# Character trigrams give misspellings and plurals partial overlap.
+TRIGRAM_WEIGHT = 0.5
+
+
+def _features(text: str):
+    for word in _WORD.findall((text or "").lower()):
+        yield word, 1.0
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            yield padded[i:i + 3], TRIGRAM_WEIGHT
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic offline embeddings built by feature hashing.
+
+    Words and character trigrams are hashed into ``dimension`` signed
+    buckets and the result is L2-normalized, so texts sharing vocabulary get
+    a high cosine similarity. No network access or model files are needed,
+    which makes it a stand-in for load tests and isolated environments.
+    """
+
+    def __init__(self, dimension: int = 1536, latency: Optional[LatencyProfile] = None):
+        self.dimension = dimension
+        self.latency = latency or LatencyProfile()
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature, weight in _features(text):
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dimension] += weight if digest >> 63 else -weight
+        norm = np.linalg.norm(vector)
+        if not norm:
+            vector[0], norm = 1.0, 1.0
+        return (vector / norm).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency.sample())
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency.sample())
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency.sample())
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency.sample())
+        return self._embed(text)
@@ -0,0 +1,13 @@
+class LLMUnavailableException(Exception):
+    """Raised without calling the LLM when it is failing or saturated."""
+    pass
+
+
+class CircuitOpenException(LLMUnavailableException):
+    """Raised while the circuit breaker is open after repeated upstream failures."""
+    pass
+
+
+class LLMOverloadedException(LLMUnavailableException):
+    """Raised when no concurrency slot frees up within the queue timeout."""
+    pass
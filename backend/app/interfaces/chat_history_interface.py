@@ -1,11 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 class ChatHistoryServiceInterface(ABC):
     @abstractmethod
     def save_message(self, user_id: int, message_type: str, content: str, session_id: str):
         pass
 
+    @abstractmethod
+    def save_turn(self, user_id: int, session_id: str, user_message: str, assistant_message: str) -> None:
+        pass
+
     @abstractmethod
     def get_recent_history(self, user_id: int, session_id: str, limit: int = 10):
         pass
@@ -14,10 +18,18 @@ class ChatHistoryServiceInterface(ABC):
     def get_recent_history_as_dict(self, user_id: int, session_id: str, limit: int = 10) -> List[Dict[str, str]]:
         pass
 
+    @abstractmethod
+    def get_prompt_history_as_dict(self, user_id: int, session_id: str, limit: int = 10) -> List[Dict[str, str]]:
+        pass
+
     @abstractmethod
     def get_history(self, user_id: int, limit: int = 50, offset: int = 0):
         pass
 
+    @abstractmethod
+    def get_history_page(self, user_id: int, limit: int = 50, cursor: Optional[str] = None):
+        pass
+
     @abstractmethod
     def get_message_count(self, user_id: int) -> int:
         pass
@@ -25,3 +37,35 @@ class ChatHistoryServiceInterface(ABC):
     @abstractmethod
     def clear_history(self, user_id: int) -> None:
         pass
+
+    @abstractmethod
+    async def asave_message(self, user_id: int, message_type: str, content: str, session_id: str):
+        pass
+
+    @abstractmethod
+    async def asave_turn(self, user_id: int, session_id: str, user_message: str, assistant_message: str) -> None:
+        pass
+
+    @abstractmethod
+    async def aget_recent_history_as_dict(self, user_id: int, session_id: str, limit: int = 10) -> List[Dict[str, str]]:
+        pass
+
+    @abstractmethod
+    async def aget_prompt_history_as_dict(self, user_id: int, session_id: str, limit: int = 10) -> List[Dict[str, str]]:
+        pass
+
+    @abstractmethod
+    async def aget_history(self, user_id: int, limit: int = 50, offset: int = 0):
+        pass
+
+    @abstractmethod
+    async def aget_history_page(self, user_id: int, limit: int = 50, cursor: Optional[str] = None):
+        pass
+
+    @abstractmethod
+    async def aget_message_count(self, user_id: int) -> int:
+        pass
+
+    @abstractmethod
+    async def aclear_history(self, user_id: int) -> None:
+        pass
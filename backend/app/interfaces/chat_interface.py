@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import AsyncIterator, List
 from app.schemas.chat import ChatRequest, ChatMessage
 
 
@@ -10,6 +10,16 @@ class ChatServiceInterface(ABC):
     def process_chat_request(self, request: ChatRequest) -> str:
         """Process a chat request and return the response."""
         pass
+    
+    @abstractmethod
+    async def aprocess_chat_request(self, request: ChatRequest) -> str:
+        """Process a chat request without blocking the event loop."""
+        pass
+    
+    @abstractmethod
+    def astream_chat_request(self, request: ChatRequest) -> AsyncIterator[str]:
+        """Stream the response to a chat request token by token."""
+        pass
 
 
 class HistoryConverterInterface(ABC):
@@ -1,7 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional
+from app.rag.filters import ProductFilter
 
 class RAGServiceInterface(ABC):
     @abstractmethod
-    def ask(self, user_id: str, message: str, history: List[Dict[str, str]] = None) -> str:
+    def ask(self, user_id: str, message: str, history: List[Dict[str, str]] = None, product_filter: Optional[ProductFilter] = None) -> str:
+        pass
+
+    @abstractmethod
+    async def aask(self, user_id: str, message: str, history: List[Dict[str, str]] = None, product_filter: Optional[ProductFilter] = None) -> str:
+        pass
+
+    @abstractmethod
+    def astream(self, user_id: str, message: str, history: List[Dict[str, str]] = None, product_filter: Optional[ProductFilter] = None) -> AsyncIterator[str]:
         pass
@@ -1,26 +1,119 @@
 import os
 import logging
+from typing import AsyncIterator
 from dotenv import load_dotenv, find_dotenv
+import httpx
 from langchain_openai import ChatOpenAI
-from app.config.settings import OPENAI_API_KEY
+from app.config.settings import require_openai_api_key
+from app.config.app_config import app_settings
+from app.core.latency import LatencyProfile
+from app.core.single_flight import AsyncSingleFlight, SingleFlight, make_flight_key
+from app.llm.fake import FAKE_LLM_MODES, FakeChatModel
+from app.llm.resilience import Bulkhead, CircuitBreaker, ResilientChatModel
 
 logger = logging.getLogger(__name__)
 
 load_dotenv(find_dotenv())
 
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0,
-    openai_api_key=OPENAI_API_KEY
+
+def _build_llm():
+    """Create the chat model selected by ``LLM_PROVIDER``."""
+    if app_settings.llm_provider == "fake":
+        if app_settings.fake_llm_mode not in FAKE_LLM_MODES:
+            raise ValueError(f"FAKE_LLM_MODE must be one of: {', '.join(FAKE_LLM_MODES)}")
+        logger.info("Using the offline fake LLM (%s mode)", app_settings.fake_llm_mode)
+        return FakeChatModel(
+            mode=app_settings.fake_llm_mode,
+            latency=LatencyProfile(
+                app_settings.fake_llm_latency_distribution,
+                app_settings.fake_llm_latency_ms,
+                app_settings.fake_llm_latency_spread,
+                seed=app_settings.fake_provider_seed
+            ),
+            tokens_per_second=app_settings.fake_llm_tokens_per_second
+        )
+    if app_settings.llm_provider != "openai":
+        raise ValueError(f"Unknown LLM_PROVIDER '{app_settings.llm_provider}', expected 'openai' or 'fake'")
+
+    # Retries and deadlines are handled by ResilientChatModel, so the SDK's own
+    # retries are disabled; the pooled clients bound connections to the API.
+    pool_limits = httpx.Limits(
+        max_connections=app_settings.llm_max_connections,
+        max_keepalive_connections=app_settings.llm_max_connections
+    )
+    return ChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0,
+        openai_api_key=require_openai_api_key(),
+        timeout=app_settings.llm_timeout_seconds,
+        max_retries=0,
+        http_client=httpx.Client(limits=pool_limits),
+        http_async_client=httpx.AsyncClient(limits=pool_limits)
+    )
+
+
+llm = _build_llm()
+
+resilient_llm = ResilientChatModel(
+    lambda: llm,
+    timeout_seconds=app_settings.llm_timeout_seconds,
+    max_retries=app_settings.llm_max_retries,
+    backoff_seconds=app_settings.llm_retry_backoff_seconds,
+    backoff_max_seconds=app_settings.llm_retry_backoff_max_seconds,
+    breaker=CircuitBreaker(
+        failure_threshold=app_settings.llm_circuit_failure_threshold,
+        reset_timeout_seconds=app_settings.llm_circuit_reset_seconds
+    ),
+    bulkhead=Bulkhead(
+        max_concurrent=app_settings.llm_max_concurrency,
+        max_wait_seconds=app_settings.llm_queue_timeout_seconds
+    )
 )
 
+# Identical prompts in flight at the same time share one upstream call.
+_completion_flight = SingleFlight("llm_completion")
+_acompletion_flight = AsyncSingleFlight("llm_completion")
+
+
+def _invoke(messages: list[dict]) -> str:
+    return resilient_llm.invoke(messages).content
+
+
+async def _ainvoke(messages: list[dict]) -> str:
+    response = await resilient_llm.ainvoke(messages)
+    return response.content
+
+
 def generate_chat_completion(messages: list[dict]) -> str:
     try:
         logger.info("Generating chat completion with %d messages", len(messages))
-        response = llm.invoke(messages)
+        content = _completion_flight.do(make_flight_key(messages), lambda: _invoke(messages))
         logger.info("Chat completion generated successfully")
-        return response.content
+        return content
     except Exception as e:
         logger.error("Error generating chat completion: %s", str(e))
         raise
- 
\ No newline at end of file
+
+
+async def agenerate_chat_completion(messages: list[dict]) -> str:
+    try:
+        logger.info("Generating async chat completion with %d messages", len(messages))
+        content = await _acompletion_flight.do(make_flight_key(messages), lambda: _ainvoke(messages))
+        logger.info("Async chat completion generated successfully")
+        return content
+    except Exception as e:
+        logger.error("Error generating async chat completion: %s", str(e))
+        raise
+
+
+async def astream_chat_completion(messages: list[dict]) -> AsyncIterator[str]:
+    """Yield completion tokens as they arrive; closing the generator cancels the upstream call."""
+    logger.info("Streaming chat completion with %d messages", len(messages))
+    try:
+        async for chunk in resilient_llm.astream(messages):
+            if chunk.content:
+                yield chunk.content
+        logger.info("Chat completion stream finished successfully")
+    except Exception as e:
+        logger.error("Error streaming chat completion: %s", str(e))
+        raise
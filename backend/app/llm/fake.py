@@ -0,0 +1,82 @@
+import asyncio
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict, Field
+
+from app.core.latency import LatencyProfile
+
+FAKE_LLM_MODES = ("canned", "echo")
+
+_TOKEN = re.compile(r"\S+\s*")
+_CONTEXT_LINE = re.compile(r"^- (\S+)x (.+) \(Price: \$([^)]+)\)$", re.MULTILINE)
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic offline chat model with simulated latency and streaming.
+
+    ``canned`` answers with the products found in the prompt's retrieved
+    context, ``echo`` repeats the last user message. Time to first token is
+    drawn from ``latency``; tokens then arrive at ``tokens_per_second``, both
+    for streamed and whole responses.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    mode: str = "canned"
+    latency: LatencyProfile = Field(default_factory=LatencyProfile)
+    tokens_per_second: float = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        user_messages = [message.content for message in messages if message.type == "human"]
+        if self.mode == "echo":
+            return user_messages[-1] if user_messages else ""
+
+        products = []
+        for content in user_messages:
+            products.extend(_CONTEXT_LINE.findall(content))
+        if not products:
+            return "I could not find products matching your request in our catalog."
+        lines = [f"- {text} for ${price} ({quantity} in stock)" for quantity, text, price in products[:3]]
+        return "Here are some products that match what you are looking for:\n" + "\n".join(lines)
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        return _TOKEN.findall(self._reply(messages))
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _result(self, tokens: List[str]) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.latency.sample() + len(tokens) * self._token_delay())
+        return self._result(tokens)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency.sample() + len(tokens) * self._token_delay())
+        return self._result(tokens)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency.sample())
+        for i, token in enumerate(self._tokens(messages)):
+            if i:
+                time.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency.sample())
+        for i, token in enumerate(self._tokens(messages)):
+            if i:
+                await asyncio.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import openai
+
+from app.exceptions.llm_exceptions import CircuitOpenException, LLMOverloadedException
+
+logger = logging.getLogger(__name__)
+
+# Upstream failures worth retrying; they also count towards opening the circuit.
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    TimeoutError
+)
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker around an upstream dependency.
+
+    ``failure_threshold`` consecutive failures open the circuit, rejecting
+    calls for ``reset_timeout_seconds``. The circuit then goes half-open and
+    lets a single probe through: success closes it, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def _refresh(self) -> None:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            self._refresh()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("LLM circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                logger.warning("LLM circuit opened after %d consecutive failures", self._failures)
+
+    def release(self) -> None:
+        """End a call that says nothing about upstream health (e.g. cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
+
+
+class Bulkhead:
+    """Caps concurrent upstream calls; waiting longer than ``max_wait_seconds`` fails.
+
+    Threads share one semaphore and each event loop gets its own, both sized
+    ``max_concurrent``.
+    """
+
+    def __init__(self, max_concurrent: int = 32, max_wait_seconds: float = 5):
+        self.max_concurrent = max_concurrent
+        self.max_wait_seconds = max_wait_seconds
+        self._thread_slots = threading.BoundedSemaphore(max_concurrent)
+        self._loop_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def _enter(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def _exit(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _reject(self) -> LLMOverloadedException:
+        with self._lock:
+            self.rejected += 1
+        return LLMOverloadedException(f"LLM concurrency limit of {self.max_concurrent} reached")
+
+    @contextmanager
+    def acquire(self):
+        if not self._thread_slots.acquire(timeout=self.max_wait_seconds):
+            raise self._reject()
+        self._enter()
+        try:
+            yield
+        finally:
+            self._exit()
+            self._thread_slots.release()
+
+    @asynccontextmanager
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            slots = self._loop_slots.get(loop)
+            if slots is None:
+                slots = self._loop_slots[loop] = asyncio.Semaphore(self.max_concurrent)
+        try:
+            await asyncio.wait_for(slots.acquire(), self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            raise self._reject() from None
+        self._enter()
+        try:
+            yield
+        finally:
+            self._exit()
+            slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"max_concurrent": self.max_concurrent, "in_flight": self.in_flight, "rejected": self.rejected}
+
+
+class ResilientChatModel:
+    """Chat model wrapper with a bulkhead, deadlines, retries and a circuit breaker.
+
+    ``llm_provider`` returns the model at call time. Each attempt must finish
+    within ``timeout_seconds`` (for streams: the first token and every gap
+    between tokens). Retryable errors are retried up to ``max_retries`` times
+    with full-jitter exponential backoff, but a stream is never retried once
+    tokens were yielded. While the circuit is open, calls fail fast with
+    ``CircuitOpenException``.
+    """
+
+    def __init__(
+        self,
+        llm_provider: Callable[[], Any],
+        timeout_seconds: float = 30,
+        max_retries: int = 2,
+        backoff_seconds: float = 0.5,
+        backoff_max_seconds: float = 8,
+        breaker: Optional[CircuitBreaker] = None,
+        bulkhead: Optional[Bulkhead] = None
+    ):
+        self.llm_provider = llm_provider
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self.bulkhead = bulkhead or Bulkhead()
+        self.retries = 0
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max_seconds, self.backoff_seconds * 2 ** attempt))
+
+    def _allow(self) -> None:
+        if not self.breaker.allow():
+            raise CircuitOpenException("LLM circuit is open, failing fast")
+
+    def _should_retry(self, attempt: int, error: Exception) -> bool:
+        """Record a retryable failure and decide whether another attempt is made."""
+        self.breaker.record_failure()
+        if attempt >= self.max_retries or self.breaker.state != CircuitBreaker.CLOSED:
+            return False
+        self.retries += 1
+        logger.warning("LLM call failed (attempt %d/%d), retrying: %s", attempt + 1, self.max_retries + 1, str(error))
+        return True
+
+    def _finish(self, error: BaseException) -> None:
+        """Settle the breaker for a non-retryable outcome."""
+        if isinstance(error, openai.APIStatusError):
+            # The upstream answered (e.g. 400 or 401): it is healthy.
+            self.breaker.record_success()
+        else:
+            self.breaker.release()
+
+    def invoke(self, messages: list[dict]) -> Any:
+        attempt = 0
+        while True:
+            self._allow()
+            try:
+                with self.bulkhead.acquire():
+                    response = self.llm_provider().invoke(messages)
+            except RETRYABLE_ERRORS as e:
+                if not self._should_retry(attempt, e):
+                    raise
+            except BaseException as e:
+                self._finish(e)
+                raise
+            else:
+                self.breaker.record_success()
+                return response
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def ainvoke(self, messages: list[dict]) -> Any:
+        attempt = 0
+        while True:
+            self._allow()
+            try:
+                async with self.bulkhead.aacquire():
+                    response = await asyncio.wait_for(self.llm_provider().ainvoke(messages), self.timeout_seconds)
+            except RETRYABLE_ERRORS as e:
+                if not self._should_retry(attempt, e):
+                    raise
+            except BaseException as e:
+                self._finish(e)
+                raise
+            else:
+                self.breaker.record_success()
+                return response
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def astream(self, messages: list[dict]) -> AsyncIterator[Any]:
+        attempt = 0
+        while True:
+            self._allow()
+            started = False
+            try:
+                async with self.bulkhead.aacquire():
+                    chunks = self.llm_provider().astream(messages).__aiter__()
+                    try:
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout_seconds)
+                            except StopAsyncIteration:
+                                break
+                            started = True
+                            yield chunk
+                    finally:
+                        aclose = getattr(chunks, "aclose", None)
+                        if aclose is not None:
+                            await aclose()
+            except RETRYABLE_ERRORS as e:
+                if started:
+                    self.breaker.record_failure()
+                    raise
+                if not self._should_retry(attempt, e):
+                    raise
+            except BaseException as e:
+                self._finish(e)
+                raise
+            else:
+                self.breaker.record_success()
+                return
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.stats(),
+            "bulkhead": self.bulkhead.stats(),
+            "retries": self.retries,
+            "timeout_seconds": self.timeout_seconds,
+            "max_retries": self.max_retries
+        }
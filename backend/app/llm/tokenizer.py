@@ -0,0 +1,47 @@
+import re
+from typing import Dict, List
+
+# Chat models add a few tokens of framing per message (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+# Reply priming tokens added once per request.
+PROMPT_OVERHEAD_TOKENS = 3
+
+_PIECE = re.compile(r"\d+|[^\W\d_]+|[^\w\s]|_")
+_ELLIPSIS = "..."
+
+
+def _piece_tokens(piece: str) -> int:
+    # BPE vocabularies split digits in groups of three and keep most short
+    # words whole; long words split roughly every four characters.
+    size = 3 if piece[0].isdigit() else 4
+    return max(1, -(-len(piece) // size))
+
+
+def estimate_tokens(text: str) -> int:
+    """Offline estimate of the number of BPE tokens in ``text``.
+
+    No vocabulary is loaded, so this works without network access. It errs
+    on the high side for English product text so budgets are not exceeded.
+    """
+    return sum(_piece_tokens(piece) for piece in _PIECE.findall(text or ""))
+
+
+def estimate_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimated prompt size of a chat message list, including framing."""
+    return PROMPT_OVERHEAD_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content", "")) for message in messages
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` so that it fits ``max_tokens``, marking the cut with an ellipsis."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - estimate_tokens(_ELLIPSIS)
+    used, end = 0, 0
+    for match in _PIECE.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > budget:
+            break
+        end = match.end()
+    return text[:end].rstrip() + _ELLIPSIS if end else ""
@@ -1,4 +1,7 @@
 from .user import User
 from .chat_message import ChatMessage
+from .chat_session_summary import ChatSessionSummary
+from .chat_message_count import ChatMessageCount
+from .chat_message_archive import ChatMessageArchive
 
-__all__ = ["User", "ChatMessage"] 
\ No newline at end of file
+__all__ = ["User", "ChatMessage", "ChatSessionSummary", "ChatMessageCount", "ChatMessageArchive"] 
\ No newline at end of file
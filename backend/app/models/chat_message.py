@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from db.session import Base
@@ -14,6 +14,16 @@ class ChatMessage(Base):
     session_id = Column(String(100), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Newest-first scans of a session or of a user's whole history, including
+    # keyset pagination on (created_at, id), are served straight from these.
+    # Clearing hides ids up to a watermark, so ids must never be reused; that
+    # needs AUTOINCREMENT on SQLite.
+    __table_args__ = (
+        Index("idx_chat_messages_user_session_created", user_id, session_id, created_at.desc(), id.desc()),
+        Index("idx_chat_messages_user_created", user_id, created_at.desc(), id.desc()),
+        {"sqlite_autoincrement": True},
+    )
+
     user = relationship("User", back_populates="chat_messages")
     
     def __repr__(self):
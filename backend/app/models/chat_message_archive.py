@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from db.session import Base
+
+
+class ChatMessageArchive(Base):
+    """Chat messages moved out of ``chat_messages`` by the retention job.
+
+    Rows keep their original id and columns but carry only the indexes the
+    retention job needs, so archived turns cost little beyond their content.
+    """
+
+    __tablename__ = "chat_messages_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    message_type = Column(String(20), nullable=False)
+    content = Column(Text, nullable=False)
+    session_id = Column(String(100), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_chat_messages_archive_user", user_id),
+        Index("idx_chat_messages_archive_created", created_at),
+    )
+
+    def __repr__(self):
+        return f"<ChatMessageArchive(id={self.id}, user_id={self.user_id}, session_id='{self.session_id}')>"
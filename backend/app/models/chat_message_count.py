@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from db.session import Base
+
+
+class ChatMessageCount(Base):
+    """Per-user chat history state, maintained alongside inserts and deletes.
+
+    ``message_count`` is the number of visible messages. ``cleared_through_id``
+    hides messages up to that id right away when history is cleared, while
+    they are deleted in the background.
+    """
+
+    __tablename__ = "chat_message_counts"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    message_count = Column(BigInteger, nullable=False, default=0)
+    cleared_through_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ChatMessageCount(user_id={self.user_id}, message_count={self.message_count})>"
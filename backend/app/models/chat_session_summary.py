@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from db.session import Base
+
+
+class ChatSessionSummary(Base):
+    """Rolling summary of a chat session up to ``last_message_id``."""
+
+    __tablename__ = "chat_session_summaries"
+    __table_args__ = (UniqueConstraint("user_id", "session_id", name="uq_chat_session_summaries_session"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    session_id = Column(String(100), nullable=False)
+    summary = Column(Text, nullable=False)
+    last_message_id = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ChatSessionSummary(user_id={self.user_id}, session_id='{self.session_id}', last_message_id={self.last_message_id})>"
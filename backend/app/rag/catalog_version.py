@@ -0,0 +1,53 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+VERSION_FILE = ROOT / "data" / "catalog_version"
+
+_CHECK_INTERVAL_SECONDS = 2.0
+_lock = threading.Lock()
+_cached_version = None
+_last_check = 0.0
+
+
+def _read_version() -> int:
+    try:
+        return int(VERSION_FILE.read_text().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def get_catalog_version() -> int:
+    """Return the current catalog version.
+
+    The version lives in a small file next to the vector store so that seed
+    and sync scripts running in another process can invalidate API caches.
+    Reads are throttled to one stat per interval.
+    """
+    global _cached_version, _last_check
+    now = time.monotonic()
+    with _lock:
+        if _cached_version is None or now - _last_check >= _CHECK_INTERVAL_SECONDS:
+            _cached_version = _read_version()
+            _last_check = now
+        return _cached_version
+
+
+def bump_catalog_version() -> int:
+    """Mark the catalog as changed and return the new version."""
+    global _cached_version, _last_check
+    with _lock:
+        version = _read_version() + 1
+        VERSION_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = VERSION_FILE.with_suffix(".tmp")
+        tmp_file.write_text(str(version))
+        os.replace(tmp_file, VERSION_FILE)
+        _cached_version = version
+        _last_check = time.monotonic()
+    logger.info("Catalog version bumped to %d", version)
+    return version
@@ -1,8 +1,11 @@
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
+import numpy as np
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
 from app.embeddings.client import embeddings
+from app.rag.catalog_version import bump_catalog_version
 
 logger = logging.getLogger(__name__)
 
@@ -19,12 +22,86 @@ def add_documents(docs: list[dict]) -> None:
         logger.info("Adding %d documents to vector store", len(docs))
         texts = [d["text"] for d in docs]
         metadatas = [d.get("metadata", {}) for d in docs]
+        ids = [d.get("id") for d in docs]
 
+        # Chroma upserts by id, so re-adding a product replaces its vector.
         vectorstore.add_texts(
             texts=texts,
-            metadatas=metadatas
+            metadatas=metadatas,
+            ids=ids
         )
+        bump_catalog_version()
         logger.info("Successfully added %d documents to vector store", len(docs))
     except Exception as e:
         logger.error("Failed to add documents to vector store: %s", str(e))
-        raise
\ No newline at end of file
+        raise
+
+def add_embedded_documents(docs: list[dict], vectors: list[list[float]]) -> None:
+    """Upsert documents whose embeddings were computed by the caller."""
+    try:
+        vectorstore._collection.upsert(
+            ids=[d["id"] for d in docs],
+            embeddings=vectors,
+            metadatas=[d.get("metadata", {}) for d in docs],
+            documents=[d["text"] for d in docs]
+        )
+    except Exception as e:
+        logger.error("Failed to upsert embedded documents into vector store: %s", str(e))
+        raise
+
+def flush() -> None:
+    """Chroma persists every upsert itself; nothing is buffered."""
+
+def search_with_embeddings(embedding: list[float], k: int, filter: dict = None) -> list[tuple]:
+    """Return ``(document, score, vector)`` hits; the vectors come back in the same query."""
+    result = vectorstore._collection.query(
+        query_embeddings=[embedding],
+        n_results=k,
+        where=filter,
+        include=["documents", "metadatas", "distances", "embeddings"]
+    )
+    return [
+        (Document(id=doc_id, page_content=text, metadata=metadata or {}), float(distance), np.asarray(vector, dtype=np.float32))
+        for doc_id, text, metadata, distance, vector in zip(
+            result["ids"][0], result["documents"][0], result["metadatas"][0], result["distances"][0], result["embeddings"][0]
+        )
+    ]
+
+def get_indexed_metadata(ids: list[str]) -> dict[str, dict]:
+    """Return ``{id: metadata}`` for those ``ids`` that are indexed, without loading vectors."""
+    data = vectorstore.get(ids=ids, include=["metadatas"])
+    return {doc_id: metadata or {} for doc_id, metadata in zip(data["ids"], data["metadatas"])}
+
+def iter_indexed_ids(batch_size: int):
+    """Page through every indexed id without loading metadata or vectors."""
+    offset = 0
+    while True:
+        ids = vectorstore._collection.get(include=[], limit=batch_size, offset=offset)["ids"]
+        if not ids:
+            return
+        yield ids
+        offset += len(ids)
+
+def update_metadata(ids: list[str], metadatas: list[dict], persist: bool = True) -> None:
+    """Replace metadata in place; the stored embeddings are left untouched.
+
+    Chroma writes at once either way; ``persist=False`` only leaves the
+    catalog version bump to the caller's ``flush()``.
+    """
+    try:
+        logger.info("Updating metadata for %d documents in vector store", len(ids))
+        vectorstore._collection.update(ids=ids, metadatas=metadatas)
+        if persist:
+            bump_catalog_version()
+    except Exception as e:
+        logger.error("Failed to update metadata in vector store: %s", str(e))
+        raise
+
+def delete_documents(ids: list[str]) -> None:
+    try:
+        logger.info("Deleting %d documents from vector store", len(ids))
+        vectorstore.delete(ids=ids)
+        bump_catalog_version()
+    except Exception as e:
+        logger.error("Failed to delete documents from vector store: %s", str(e))
+        raise
@@ -0,0 +1,515 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.config.app_config import app_settings
+from app.embeddings.client import embeddings
+from app.core.rwlock import ReadWriteLock
+from app.rag.catalog_version import bump_catalog_version, get_catalog_version
+from app.rag.filters import matches_where
+from app.rag.vector_math import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.json"
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+# FAISS needs roughly this many training points per IVF list for stable
+# centroids; until the store holds that many vectors it stays exact (flat).
+IVF_MIN_POINTS_PER_LIST = 39
+IVF_MAX_TRAINING_POINTS_PER_LIST = 256
+# HNSW is rebuilt without its tombstoned labels once they exceed this share of the graph.
+TOMBSTONE_COMPACT_RATIO = 0.2
+FILTER_CACHE_SIZE = 64
+
+
+class FaissVectorStore:
+    """FAISS-backed ANN store with flat, IVF and HNSW index variants.
+
+    Vectors are L2-normalized and searched by inner product; scores are
+    reported as ``2 - 2 * cosine`` to match the Chroma and NumPy backends.
+    Every document gets an internal int64 label so upserts and deletes by
+    product id work for all variants. HNSW cannot remove vectors, so its
+    deleted labels are tombstoned and excluded inside the graph search; once
+    they exceed ``compact_ratio`` of the graph it is rebuilt without them.
+    IVF is only trained once the store holds ``IVF_MIN_POINTS_PER_LIST``
+    vectors per list, on a sample of everything stored; smaller stores use
+    an exact flat index.
+
+    Writes mutate the index in place under the write side of a read-write
+    lock. ``persist=False`` skips writing the index and docstore files so
+    bulk ingestion can add or update many batches and call ``flush()`` once. When another process
+    bumps the catalog version, the next search reloads from disk. The label
+    selector for each metadata filter is memoized until the next write.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str,
+        embedding_function: Embeddings,
+        index_type: str = "flat",
+        nlist: int = 100,
+        nprobe: int = 8,
+        hnsw_m: int = 32,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        compact_ratio: float = TOMBSTONE_COMPACT_RATIO
+    ):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type '{index_type}'. Expected one of: {', '.join(INDEX_TYPES)}")
+        self.persist_directory = Path(persist_directory)
+        self.embedding_function = embedding_function
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.compact_ratio = compact_ratio
+        self._lock = ReadWriteLock()
+        self._filter_lock = threading.Lock()
+        self._filter_selectors: "OrderedDict[str, Optional[faiss.IDSelector]]" = OrderedDict()
+        self._dirty = False
+        self._docs_dirty = False
+        self._load()
+
+    def _new_index(self, dim: int) -> faiss.Index:
+        """Empty index for this store; IVF starts out flat until ``_maybe_train_ivf`` can train it."""
+        if self.index_type == "hnsw":
+            inner = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            inner.hnsw.efConstruction = self.ef_construction
+            index = faiss.IndexIDMap2(inner)
+        else:
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self._apply_search_params(index)
+        return index
+
+    @staticmethod
+    def _is_ivf(index: faiss.Index) -> bool:
+        return faiss.try_extract_index_ivf(index) is not None
+
+    def _apply_search_params(self, index: faiss.Index) -> None:
+        if self._is_ivf(index):
+            faiss.extract_index_ivf(index).nprobe = self.nprobe
+        elif self.index_type == "hnsw":
+            faiss.downcast_index(index.index).hnsw.efSearch = self.ef_search
+
+    def _search_params(self, selector: Optional[faiss.IDSelector]) -> faiss.SearchParameters:
+        """Per-query parameters restricting the search to ``selector``'s labels."""
+        if self._is_ivf(self.index):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=self.nprobe)
+        if self.index_type == "hnsw":
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=self.ef_search)
+        return faiss.SearchParameters(sel=selector)
+
+    def _live_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        labels = np.asarray(sorted(self.labels), dtype=np.int64)
+        return labels, self.index.reconstruct_batch(labels)
+
+    def _maybe_train_ivf(self) -> None:
+        """Swap the interim flat index for a trained IVF once enough vectors are stored."""
+        if self.index_type != "ivf" or self._is_ivf(self.index):
+            return
+        if len(self.labels) < IVF_MIN_POINTS_PER_LIST * self.nlist:
+            return
+        labels, vectors = self._live_vectors()
+        training_size = min(len(labels), IVF_MAX_TRAINING_POINTS_PER_LIST * self.nlist)
+        sample = np.random.default_rng(0).choice(len(labels), size=training_size, replace=False)
+        quantizer = faiss.IndexFlatIP(vectors.shape[1])
+        index = faiss.IndexIVFFlat(quantizer, vectors.shape[1], self.nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors[sample])
+        # Lets reconstruct() return candidate vectors for reranking.
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        index.add_with_ids(vectors, labels)
+        self._apply_search_params(index)
+        self.index = index
+        logger.info("Trained FAISS IVF index with %d lists on %d of %d vectors", self.nlist, training_size, len(labels))
+
+    def _maybe_compact(self) -> None:
+        """Rebuild the HNSW graph without tombstoned labels once they pass ``compact_ratio``."""
+        if not self.tombstones or len(self.tombstones) <= self.compact_ratio * self.index.ntotal:
+            return
+        labels, vectors = self._live_vectors()
+        index = self._new_index(self.index.d)
+        if len(labels):
+            index.add_with_ids(vectors, labels)
+        logger.info("Compacted FAISS HNSW index, dropped %d tombstoned vectors", len(self.tombstones))
+        self.index = index
+        self.tombstones = set()
+        self._tombstone_selector = None
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """Tune recall/latency at runtime without rebuilding the index."""
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+        with self._lock.write():
+            if self.index is not None:
+                self._apply_search_params(self.index)
+
+    def _load(self) -> None:
+        self.loaded_version = get_catalog_version()
+        self.index = None
+        self.labels: Dict[int, str] = {}
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.tombstones = set()
+        self._tombstone_selector = None
+        self._filter_selectors.clear()
+        self.next_label = 0
+
+        index_path = self.persist_directory / INDEX_FILE
+        docstore_path = self.persist_directory / DOCSTORE_FILE
+        if not index_path.exists() or not docstore_path.exists():
+            return
+
+        docstore = json.loads(docstore_path.read_text())
+        if docstore["index_type"] != self.index_type:
+            logger.warning(
+                "Persisted FAISS index is '%s' but '%s' is configured; re-seed to switch index types",
+                docstore["index_type"], self.index_type
+            )
+            self.index_type = docstore["index_type"]
+        self.index = faiss.read_index(str(index_path))
+        if self._is_ivf(self.index) and self.index.direct_map.type == faiss.DirectMap.NoMap:
+            self.index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        self._apply_search_params(self.index)
+        self.labels = {int(label): doc_id for label, doc_id in docstore["labels"].items()}
+        self.docs = docstore["docs"]
+        self.tombstones = set(docstore["tombstones"])
+        self.next_label = docstore["next_label"]
+        logger.info("Loaded FAISS %s index with %d vectors", self.index_type, len(self.docs))
+
+    def _maybe_reload(self) -> None:
+        if self._dirty or self._docs_dirty or get_catalog_version() == self.loaded_version:
+            return
+        with self._lock.write():
+            if not (self._dirty or self._docs_dirty) and get_catalog_version() != self.loaded_version:
+                logger.info("Catalog version changed, reloading FAISS index from disk")
+                self._load()
+
+    def _persist(self, write_index: bool = True) -> None:
+        self.persist_directory.mkdir(parents=True, exist_ok=True)
+        index_path = self.persist_directory / INDEX_FILE
+        docstore_path = self.persist_directory / DOCSTORE_FILE
+
+        tmp_index = index_path.with_suffix(".tmp")
+        if write_index:
+            faiss.write_index(self.index, str(tmp_index))
+        tmp_docstore = docstore_path.with_suffix(".tmp")
+        tmp_docstore.write_text(json.dumps({
+            "index_type": self.index_type,
+            "labels": {str(label): doc_id for label, doc_id in self.labels.items()},
+            "docs": self.docs,
+            "tombstones": sorted(self.tombstones),
+            "next_label": self.next_label
+        }))
+        if write_index:
+            os.replace(tmp_index, index_path)
+        os.replace(tmp_docstore, docstore_path)
+        self._dirty = False
+        self._docs_dirty = False
+
+    def _remove_labels(self, labels: List[int]) -> None:
+        if not labels:
+            return
+        if self.index_type == "hnsw":
+            self.tombstones.update(labels)
+            self._tombstone_selector = None
+        else:
+            self.index.remove_ids(np.asarray(labels, dtype=np.int64))
+        for label in labels:
+            self.labels.pop(label, None)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add_embeddings(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        persist: bool = True
+    ) -> List[str]:
+        """Insert or replace documents by id using precomputed embeddings."""
+        ids = [str(doc_id) for doc_id in ids]
+        metadatas = list(metadatas) if metadatas else [{} for _ in ids]
+        matrix = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        with self._lock.write():
+            if self.index is None:
+                self.index = self._new_index(matrix.shape[1])
+            self._remove_labels([self.docs[doc_id]["label"] for doc_id in ids if doc_id in self.docs])
+
+            new_labels = np.arange(self.next_label, self.next_label + len(ids), dtype=np.int64)
+            self.index.add_with_ids(matrix, new_labels)
+            for label, doc_id, text, metadata in zip(new_labels.tolist(), ids, texts, metadatas):
+                self.labels[label] = doc_id
+                self.docs[doc_id] = {"text": text, "metadata": metadata, "label": label}
+            self.next_label += len(ids)
+            self._filter_selectors.clear()
+            self._maybe_compact()
+            self._maybe_train_ivf()
+
+            self._dirty = True
+            if persist:
+                self._persist()
+        return ids
+
+    def add_texts(
+        self,
+        texts: Sequence[str],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        ids: Optional[Sequence[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        if ids is None:
+            ids = [str(len(self) + i) for i in range(len(texts))]
+        vectors = self.embedding_function.embed_documents(texts)
+        return self.add_embeddings(ids, texts, vectors, metadatas)
+
+    def flush(self) -> None:
+        """Persist writes made with ``persist=False``."""
+        with self._lock.write():
+            if (self._dirty or self._docs_dirty) and self.index is not None:
+                self._persist(write_index=self._dirty)
+
+    def delete(self, ids: Optional[Sequence[str]] = None, **kwargs: Any) -> None:
+        if not ids:
+            return
+        with self._lock.write():
+            to_delete = [str(doc_id) for doc_id in ids if str(doc_id) in self.docs]
+            if not to_delete or self.index is None:
+                return
+            self._remove_labels([self.docs.pop(doc_id)["label"] for doc_id in to_delete])
+            self._filter_selectors.clear()
+            self._maybe_compact()
+            self._persist()
+
+    def get_metadata(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Metadata of those ``ids`` that are indexed."""
+        with self._lock.read():
+            return {doc_id: self.docs[doc_id]["metadata"] for doc_id in map(str, ids) if doc_id in self.docs}
+
+    def iter_ids(self, batch_size: int) -> Iterator[List[str]]:
+        """Page through indexed ids in label order, holding the read lock for one page at a time."""
+        start = 0
+        while True:
+            with self._lock.read():
+                end = min(start + batch_size, self.next_label)
+                if start >= end:
+                    return
+                page = [self.labels[label] for label in range(start, end) if label in self.labels]
+            start = end
+            if page:
+                yield page
+
+    def update_metadata(self, ids: Sequence[str], metadatas: Sequence[Dict[str, Any]], persist: bool = True) -> None:
+        """Replace metadata for existing documents; the index file is not rewritten.
+
+        With ``persist=False`` the docstore is written on the next ``flush()``.
+        """
+        with self._lock.write():
+            for doc_id, metadata in zip(ids, metadatas):
+                doc_id = str(doc_id)
+                if doc_id in self.docs:
+                    self.docs[doc_id] = {**self.docs[doc_id], "metadata": metadata}
+            self._filter_selectors.clear()
+            self._docs_dirty = True
+            if persist and self.index is not None:
+                self._persist(write_index=self._dirty)
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """Top-k by vector; ``filter`` is a Chroma-style ``where`` applied inside the index search."""
+        return [
+            (doc, score) for doc, score, _ in
+            self.similarity_search_by_vector_with_embeddings(embedding, k, filter, with_vectors=False)
+        ]
+
+    def similarity_search_by_vector_with_embeddings(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = True
+    ) -> List[Tuple[Document, float, Optional[np.ndarray]]]:
+        """Like ``similarity_search_by_vector_with_relevance_scores`` plus each hit's unit vector.
+
+        Vectors are reconstructed from the index itself, so no extra storage
+        or lookup is needed.
+        """
+        self._maybe_reload()
+        with self._lock.read():
+            if self.index is None or not self.docs:
+                return []
+            query = normalize_rows(np.asarray([embedding], dtype=np.float32))
+            if filter:
+                selector = self._filter_selector(filter)
+                if selector is None:
+                    return []
+                similarities, labels = self.index.search(query, k, params=self._search_params(selector))
+            elif self.tombstones:
+                similarities, labels = self.index.search(query, k, params=self._search_params(self._excluded_tombstones()))
+            else:
+                similarities, labels = self.index.search(query, k)
+
+            results, hit_labels = [], []
+            for similarity, label in zip(similarities[0], labels[0]):
+                if label < 0 or label in self.tombstones:
+                    continue
+                doc_id = self.labels.get(int(label))
+                if doc_id is None:
+                    continue
+                doc = self.docs[doc_id]
+                results.append((
+                    Document(id=doc_id, page_content=doc["text"], metadata=doc["metadata"]),
+                    float(2.0 - 2.0 * similarity)
+                ))
+                hit_labels.append(label)
+                if len(results) == k:
+                    break
+            if not with_vectors or not results:
+                return [(doc, score, None) for doc, score in results]
+            vectors = self.index.reconstruct_batch(np.asarray(hit_labels, dtype=np.int64))
+            return [(doc, score, vector) for (doc, score), vector in zip(results, vectors)]
+
+    def _filter_selector(self, where: Dict[str, Any]) -> Optional[faiss.IDSelector]:
+        """Selector over the labels whose metadata passes ``where``, or ``None`` if none do.
+
+        Memoized per filter; writes clear the cache under the write lock.
+        """
+        key = json.dumps(where, sort_keys=True)
+        with self._filter_lock:
+            if key in self._filter_selectors:
+                self._filter_selectors.move_to_end(key)
+                return self._filter_selectors[key]
+        allowed = [doc["label"] for doc in self.docs.values() if matches_where(doc["metadata"], where)]
+        selector = faiss.IDSelectorBatch(np.asarray(allowed, dtype=np.int64)) if allowed else None
+        with self._filter_lock:
+            self._filter_selectors[key] = selector
+            if len(self._filter_selectors) > FILTER_CACHE_SIZE:
+                self._filter_selectors.popitem(last=False)
+        return selector
+
+    def _excluded_tombstones(self) -> faiss.IDSelector:
+        """Selector skipping tombstoned labels, rebuilt only when the tombstones change."""
+        selector = self._tombstone_selector
+        if selector is None:
+            batch = faiss.IDSelectorBatch(np.asarray(sorted(self.tombstones), dtype=np.int64))
+            selector = faiss.IDSelectorNot(batch)
+            # IDSelectorNot does not own the wrapped selector; keep it alive alongside.
+            selector.referenced = batch
+            self._tombstone_selector = selector
+        return selector
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(embedding, k=k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+
+def _store_path() -> Path:
+    path = Path(app_settings.faiss_store_path)
+    return path if path.is_absolute() else ROOT / path
+
+
+vectorstore = FaissVectorStore(
+    persist_directory=str(_store_path()),
+    embedding_function=embeddings,
+    index_type=app_settings.faiss_index_type,
+    nlist=app_settings.faiss_nlist,
+    nprobe=app_settings.faiss_nprobe,
+    hnsw_m=app_settings.faiss_hnsw_m,
+    ef_construction=app_settings.faiss_ef_construction,
+    ef_search=app_settings.faiss_ef_search
+)
+
+
+def add_documents(docs: list[dict]) -> None:
+    try:
+        logger.info("Adding %d documents to FAISS vector store", len(docs))
+        vectorstore.add_texts(
+            texts=[d["text"] for d in docs],
+            metadatas=[d.get("metadata", {}) for d in docs],
+            ids=[d.get("id") for d in docs]
+        )
+        bump_catalog_version()
+        logger.info("Successfully added %d documents to FAISS vector store", len(docs))
+    except Exception as e:
+        logger.error("Failed to add documents to FAISS vector store: %s", str(e))
+        raise
+
+
+def add_embedded_documents(docs: list[dict], vectors: list[list[float]]) -> None:
+    """Upsert documents whose embeddings were computed by the caller."""
+    try:
+        vectorstore.add_embeddings(
+            [d["id"] for d in docs],
+            [d["text"] for d in docs],
+            vectors,
+            [d.get("metadata", {}) for d in docs],
+            persist=False
+        )
+    except Exception as e:
+        logger.error("Failed to upsert embedded documents into FAISS vector store: %s", str(e))
+        raise
+
+
+def flush() -> None:
+    """Persist documents and metadata buffered by ``add_embedded_documents`` and ``update_metadata``."""
+    vectorstore.flush()
+
+
+def search_with_embeddings(embedding: list[float], k: int, filter: dict = None) -> list[tuple]:
+    """Return ``(document, score, vector)`` hits in a single index lookup."""
+    return vectorstore.similarity_search_by_vector_with_embeddings(embedding, k=k, filter=filter)
+
+
+def get_indexed_metadata(ids: list[str]) -> dict[str, dict]:
+    return vectorstore.get_metadata(ids)
+
+
+def iter_indexed_ids(batch_size: int):
+    return vectorstore.iter_ids(batch_size)
+
+
+def update_metadata(ids: list[str], metadatas: list[dict], persist: bool = True) -> None:
+    """Replace metadata in place; with ``persist=False`` it is buffered until ``flush()``."""
+    try:
+        logger.info("Updating metadata for %d documents in FAISS vector store", len(ids))
+        vectorstore.update_metadata(ids, metadatas, persist=persist)
+        if persist:
+            bump_catalog_version()
+    except Exception as e:
+        logger.error("Failed to update metadata in FAISS vector store: %s", str(e))
+        raise
+
+
+def delete_documents(ids: list[str]) -> None:
+    try:
+        logger.info("Deleting %d documents from FAISS vector store", len(ids))
+        vectorstore.delete(ids=ids)
+        bump_catalog_version()
+    except Exception as e:
+        logger.error("Failed to delete documents from FAISS vector store: %s", str(e))
+        raise
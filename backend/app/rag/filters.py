@@ -0,0 +1,169 @@
+import re
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, List, Optional
+
+CATEGORY_PREFIX = "cat_"
+
+_PRICE = r"\$?\s*(\d+(?:[.,]\d+)?)(?:\s*(?:\$|usd|dollars?))?(?![0-9a-z%])"
+_BETWEEN = re.compile(rf"\b(?:between|from)\s+{_PRICE}\s+(?:and|to)\s+{_PRICE}")
+_RANGE = re.compile(rf"\$\s*(\d+(?:[.,]\d+)?)\s*-\s*{_PRICE}")
+_MAX_PRICE = re.compile(rf"\b(?:under|below|less than|cheaper than|up to|at most|no more than)\s+{_PRICE}")
+_MIN_PRICE = re.compile(rf"\b(?:over|above|more than|at least)\s+{_PRICE}")
+_IN_STOCK = re.compile(r"\b(?:in stock|available now|available today|ready to ship)\b")
+
+
+def category_key(category: str) -> str:
+    """Metadata key flagging membership in a category, e.g. ``cat_3d-printing``."""
+    return CATEGORY_PREFIX + normalize_facet(category).replace(" ", "-")
+
+
+def normalize_facet(value: str) -> str:
+    return " ".join((value or "").lower().split())
+
+
+def _price(value: str) -> float:
+    return float(value.replace(",", "."))
+
+
+@dataclass
+class ProductFilter:
+    """Structured constraints pushed down to the vector store.
+
+    ``to_where`` renders the Chroma ``where`` syntax; the NumPy, FAISS and
+    lexical indexes evaluate the same dict with ``matches_where``.
+    ``fallback`` is the filter to retry with when this one matches nothing,
+    e.g. the explicit constraints alone when others were inferred from the
+    message.
+    """
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    in_stock_only: bool = False
+    categories: List[str] = field(default_factory=list)
+    brands: List[str] = field(default_factory=list)
+    fallback: Optional["ProductFilter"] = field(default=None, compare=False, repr=False)
+
+    def is_empty(self) -> bool:
+        return self.to_where() is None
+
+    def merged_with(self, fallback: "ProductFilter") -> "ProductFilter":
+        """Fill unset constraints from ``fallback``; explicit values win."""
+        return replace(
+            self,
+            fallback=None,
+            min_price=self.min_price if self.min_price is not None else fallback.min_price,
+            max_price=self.max_price if self.max_price is not None else fallback.max_price,
+            in_stock_only=self.in_stock_only or fallback.in_stock_only,
+            categories=self.categories or fallback.categories,
+            brands=self.brands or fallback.brands
+        )
+
+    def to_where(self) -> Optional[Dict[str, Any]]:
+        conditions = []
+        if self.min_price is not None:
+            conditions.append({"price": {"$gte": float(self.min_price)}})
+        if self.max_price is not None:
+            conditions.append({"price": {"$lte": float(self.max_price)}})
+        if self.in_stock_only:
+            conditions.append({"quantity": {"$gt": 0}})
+        if self.brands:
+            brands = sorted({normalize_facet(brand) for brand in self.brands})
+            conditions.append({"brand": brands[0]} if len(brands) == 1 else {"brand": {"$in": brands}})
+        if self.categories:
+            keys = sorted({category_key(category) for category in self.categories})
+            flags = [{key: True} for key in keys]
+            conditions.append(flags[0] if len(flags) == 1 else {"$or": flags})
+
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def _compare(value: Any, condition: Any) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+    for operator, operand in condition.items():
+        if operator == "$eq":
+            ok = value == operand
+        elif operator == "$ne":
+            ok = value != operand
+        elif operator == "$in":
+            ok = value in operand
+        elif operator == "$nin":
+            ok = value not in operand
+        elif value is None:
+            ok = False
+        elif operator == "$gt":
+            ok = value > operand
+        elif operator == "$gte":
+            ok = value >= operand
+        elif operator == "$lt":
+            ok = value < operand
+        elif operator == "$lte":
+            ok = value <= operand
+        else:
+            raise ValueError(f"Unsupported where operator '{operator}'")
+        if not ok:
+            return False
+    return True
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style ``where`` filter against one metadata dict."""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif not _compare(metadata.get(key), condition):
+            return False
+    return True
+
+
+def _mentions(message: str, phrase: str) -> bool:
+    return re.search(rf"(?<![0-9a-z]){re.escape(phrase)}(?![0-9a-z])", message) is not None
+
+
+def _category_variants(category: str) -> Iterable[str]:
+    phrase = normalize_facet(category).replace("-", " ")
+    yield phrase
+    if phrase.endswith("s") and len(phrase) > 3:
+        yield phrase[:-1]
+
+
+def parse_message_filters(
+    message: str,
+    brands: Iterable[str] = (),
+    categories: Iterable[str] = ()
+) -> ProductFilter:
+    """Extract price, stock, brand and category constraints from free text.
+
+    Brands and categories are only recognised when they exist in the catalog
+    vocabulary passed in, so arbitrary words never become filters.
+    """
+    text = normalize_facet(message)
+    product_filter = ProductFilter()
+
+    between = _BETWEEN.search(text) or _RANGE.search(text)
+    if between:
+        low, high = sorted((_price(between.group(1)), _price(between.group(2))))
+        product_filter.min_price, product_filter.max_price = low, high
+    else:
+        max_match = _MAX_PRICE.search(text)
+        min_match = _MIN_PRICE.search(text)
+        if max_match:
+            product_filter.max_price = _price(max_match.group(1))
+        if min_match:
+            product_filter.min_price = _price(min_match.group(1))
+
+    product_filter.in_stock_only = _IN_STOCK.search(text) is not None
+    product_filter.brands = sorted(brand for brand in brands if _mentions(text, normalize_facet(brand)))
+    product_filter.categories = sorted(
+        category for category in categories
+        if any(_mentions(text, variant) for variant in _category_variants(category))
+    )
+    return product_filter
@@ -0,0 +1,294 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from db.connection import get_db_connection
+from app.config.app_config import app_settings
+from app.embeddings.client import embeddings
+from app.rag.catalog_version import bump_catalog_version
+from app.rag.seed_vector_db import SyncPlan, build_document, plan_sync
+from app.rag.vector_store import get_store_module
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+PRODUCT_COLUMNS = "id, name, brand, features, price, quantity, categories"
+
+
+class RateLimiter:
+    """Token bucket shared by the embedding workers.
+
+    ``rate`` is requests per second; a value <= 0 disables limiting. The
+    bucket holds at most ``burst`` tokens so an idle period cannot turn into
+    a burst that trips the provider's rate limit.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class IngestCheckpoint:
+    """Last product id whose batch is durably in the vector store."""
+
+    def __init__(self, path: str):
+        path = Path(path)
+        self.path = path if path.is_absolute() else ROOT / path
+
+    def load(self) -> Optional[int]:
+        try:
+            return int(json.loads(self.path.read_text())["last_product_id"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable ingest checkpoint %s: %s", self.path, str(e))
+            return None
+
+    def save(self, last_product_id: int, stats: Dict[str, float]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({
+            "last_product_id": last_product_id,
+            "updated_at": time.time(),
+            "stats": stats
+        }))
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+@dataclass
+class IngestStats:
+    products: int = 0
+    batches: int = 0
+    embedded: int = 0
+    metadata_updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def as_dict(self) -> Dict[str, float]:
+        stats = asdict(self)
+        stats.pop("started_at")
+        elapsed = self.elapsed
+        stats["elapsed_seconds"] = round(elapsed, 2)
+        stats["products_per_second"] = round(self.products / elapsed, 2) if elapsed else 0.0
+        return stats
+
+
+def iter_product_rows(batch_size: int, after_id: int = 0) -> Iterator[List[tuple]]:
+    """Yield raw product rows in id order without loading the whole table.
+
+    Uses a named (server-side) cursor so PostgreSQL streams rows ``batch_size``
+    at a time.
+    """
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor(name="product_ingest")
+        cur.itersize = batch_size
+        cur.execute(
+            f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id > %s ORDER BY id;",
+            (after_id,)
+        )
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+        cur.close()
+    finally:
+        conn.close()
+
+
+def iter_product_batches(batch_size: int, after_id: int = 0) -> Iterator[List[dict]]:
+    """Yield product documents built by ``build_document``, ``batch_size`` at a time."""
+    for rows in iter_product_rows(batch_size, after_id):
+        yield [build_document(*row) for row in rows]
+
+
+def find_stale_ids(store, batch_size: int) -> List[str]:
+    """Indexed ids with no product row, checked one page of store ids at a time.
+
+    Neither the catalog nor the index is loaded as a whole: each page of
+    indexed ids is matched against the products table by primary key.
+    Non-numeric ids (legacy UUIDs from seeds that ignored product ids) are
+    always stale.
+    """
+    stale = []
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        for page in store.iter_indexed_ids(batch_size):
+            numeric = [int(doc_id) for doc_id in page if doc_id.isdigit()]
+            cur.execute("SELECT id FROM products WHERE id = ANY(%s);", (numeric,))
+            existing = {str(prod_id) for (prod_id,) in cur.fetchall()}
+            stale.extend(doc_id for doc_id in page if doc_id not in existing)
+        cur.close()
+    finally:
+        conn.close()
+    return stale
+
+
+def _embed_batch(docs: List[dict], limiter: RateLimiter) -> List[List[float]]:
+    limiter.acquire()
+    return embeddings.embed_documents([d["text"] for d in docs])
+
+
+def ingest_products(
+    backend: str = None,
+    batch_size: int = None,
+    max_workers: int = None,
+    requests_per_second: float = None,
+    flush_every_batches: int = None,
+    checkpoint_path: str = None,
+    resume: bool = True
+) -> Dict[str, float]:
+    """Stream the products table into the vector store.
+
+    Batches go through the same content-hash diff as ``plan_sync``: only new
+    or re-worded products are embedded, price/stock changes become metadata
+    updates. Embedding calls run on a bounded thread pool, but batches are
+    written to the store in id order. Vectors and metadata are buffered in
+    the store and written, with a single catalog version bump, once per
+    ``flush_every_batches``; after each flush the checkpoint records the
+    highest committed product id. A crashed run restarts after
+    that id. Once every batch is in, vectors whose product no longer exists
+    are deleted and the checkpoint is removed. Indexed metadata is read per
+    batch, so memory stays flat regardless of catalog size.
+    """
+    batch_size = batch_size or app_settings.ingest_batch_size
+    max_workers = max_workers or app_settings.ingest_max_workers
+    flush_every_batches = flush_every_batches or app_settings.ingest_flush_every_batches
+    if requests_per_second is None:
+        requests_per_second = app_settings.ingest_requests_per_second
+
+    store = get_store_module(backend)
+    checkpoint = IngestCheckpoint(checkpoint_path or app_settings.ingest_checkpoint_path)
+    after_id = checkpoint.load() if resume else None
+    if after_id is None:
+        checkpoint.clear()
+        after_id = 0
+    else:
+        logger.info("Resuming ingestion after product id %d", after_id)
+
+    limiter = RateLimiter(requests_per_second, burst=max_workers)
+    stats = IngestStats()
+    in_flight: Deque[Tuple[int, SyncPlan, Optional[Future]]] = deque()
+    committed_id = after_id
+    uncommitted_batches = 0
+
+    def commit_head() -> None:
+        nonlocal committed_id, uncommitted_batches
+        last_id, plan, future = in_flight.popleft()
+        if future is not None:
+            store.add_embedded_documents(plan.to_embed, future.result())
+        if plan.to_update:
+            store.update_metadata([d["id"] for d in plan.to_update], [d["metadata"] for d in plan.to_update], persist=False)
+        stats.embedded += len(plan.to_embed)
+        stats.metadata_updated += len(plan.to_update)
+        stats.unchanged += plan.unchanged
+        committed_id = last_id
+        uncommitted_batches += 1
+        if uncommitted_batches >= flush_every_batches:
+            flush()
+
+    def flush() -> None:
+        nonlocal uncommitted_batches
+        store.flush()
+        bump_catalog_version()
+        checkpoint.save(committed_id, stats.as_dict())
+        uncommitted_batches = 0
+        logger.info(
+            "Ingested %d products up to id %d (%d embedded, %.1f products/s)",
+            stats.products, committed_id, stats.embedded, stats.as_dict()["products_per_second"]
+        )
+
+    logger.info(
+        "Starting ingestion: backend=%s batch_size=%d workers=%d rate=%.1f req/s",
+        backend or app_settings.vector_backend, batch_size, max_workers, requests_per_second
+    )
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest") as pool:
+        try:
+            for batch in iter_product_batches(batch_size, after_id):
+                plan = plan_sync(batch, store.get_indexed_metadata([d["id"] for d in batch]))
+                future = pool.submit(_embed_batch, plan.to_embed, limiter) if plan.to_embed else None
+                in_flight.append((int(batch[-1]["id"]), plan, future))
+                stats.products += len(batch)
+                stats.batches += 1
+                # Bound memory: never hold more than 2x workers batches of text and vectors.
+                while in_flight and (len(in_flight) > max_workers * 2 or in_flight[0][2] is None or in_flight[0][2].done()):
+                    commit_head()
+            while in_flight:
+                commit_head()
+        finally:
+            for _, _, future in in_flight:
+                if future is not None:
+                    future.cancel()
+        if uncommitted_batches:
+            flush()
+
+    if stats.products == 0 and after_id == 0:
+        logger.error("No products in database; refusing to sync an empty catalog.")
+        return stats.as_dict()
+
+    # Deleting only after the scan keeps the store's id pages stable while it runs.
+    stale_ids = find_stale_ids(store, batch_size)
+    if stale_ids:
+        store.delete_documents(stale_ids)
+        stats.deleted = len(stale_ids)
+    checkpoint.clear()
+
+    logger.info("Ingestion completed: %s", stats.as_dict())
+    return stats.as_dict()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Stream the products table into the vector store.")
+    parser.add_argument("--backend", default=None, help="Vector backend (defaults to VECTOR_BACKEND)")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rate", type=float, default=None, help="Embedding requests per second (0 disables)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first product")
+    args = parser.parse_args()
+    ingest_products(
+        backend=args.backend,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        requests_per_second=args.rate,
+        resume=not args.restart
+    )
@@ -0,0 +1,204 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.config.app_config import app_settings
+from app.rag.catalog_version import get_catalog_version
+from app.rag.filters import matches_where
+from app.rag.ingest import iter_product_rows
+from app.rag.seed_vector_db import build_document
+from app.rag.vector_math import top_k
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[0-9a-z]+(?:[-./][0-9a-z]+)*")
+_SEPARATORS = re.compile(r"[-./]")
+
+# Name and brand tokens count more than feature tokens (a light BM25F).
+FIELD_WEIGHTS = {"name": 2, "brand": 2, "features": 1}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; hyphenated codes also yield their joined form.
+
+    ``"WH-1000XM5"`` produces ``["wh", "1000xm5", "wh1000xm5"]`` so the model
+    number matches whether or not the user types the hyphen.
+    """
+    tokens = []
+    for match in _TOKEN.findall((text or "").lower()):
+        parts = _SEPARATORS.split(match)
+        tokens.extend(parts)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+    return tokens
+
+
+class BM25Index:
+    """Immutable Okapi BM25 inverted index over product rows.
+
+    Each posting list stores the precomputed BM25 contribution of the term
+    for every document containing it, so a query is a handful of NumPy
+    scatter-adds followed by ``argpartition``.
+    """
+
+    def __init__(
+        self,
+        documents: List[Document],
+        postings: Dict[str, Tuple[np.ndarray, np.ndarray]],
+        brands: Optional[Set[str]] = None,
+        categories: Optional[Set[str]] = None
+    ):
+        self.documents = documents
+        self.postings = postings
+        self.brands = brands or set()
+        self.categories = categories or set()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """Build from ``(id, name, brand, features, price, quantity[, categories])`` rows."""
+        documents: List[Document] = []
+        term_counts: List[Counter] = []
+        brands, categories = set(), set()
+        for row in rows:
+            _, name, brand, features = row[:4]
+            brands.add(brand)
+            if len(row) > 6:
+                categories.update(row[6] or [])
+            doc = build_document(*row)
+            documents.append(Document(id=doc["id"], page_content=doc["text"], metadata=doc["metadata"]))
+            counts = Counter()
+            for field, text in (("name", name), ("brand", brand), ("features", (features or "").replace(";", " "))):
+                for token in tokenize(text):
+                    counts[token] += FIELD_WEIGHTS[field]
+            term_counts.append(counts)
+
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(lengths) else 0.0
+        inverted = defaultdict(list)
+        for doc_index, counts in enumerate(term_counts):
+            for token, tf in counts.items():
+                inverted[token].append((doc_index, tf))
+
+        postings = {}
+        total = len(documents)
+        for token, entries in inverted.items():
+            doc_indices = np.array([doc_index for doc_index, _ in entries], dtype=np.int64)
+            tf = np.array([tf for _, tf in entries], dtype=np.float32)
+            idf = math.log(1 + (total - len(entries) + 0.5) / (len(entries) + 0.5))
+            norm = k1 * (1 - b + b * lengths[doc_indices] / avg_length)
+            postings[token] = (doc_indices, (idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32))
+        return cls(documents, postings, brands, categories)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: str, k: int = 10, where: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """Return up to ``k`` ``(document, bm25_score)`` pairs, best first.
+
+        ``where`` is a Chroma-style metadata filter applied before ranking.
+        """
+        terms = [token for token in set(tokenize(query)) if token in self.postings]
+        if not terms or not self.documents:
+            return []
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for token in terms:
+            doc_indices, weights = self.postings[token]
+            scores[doc_indices] += weights
+        if where:
+            candidates = np.flatnonzero(scores)
+            rejected = [i for i in candidates if not matches_where(self.documents[i].metadata, where)]
+            scores[rejected] = 0
+        indices, best = top_k(scores[np.newaxis, :], k)
+        return [
+            (self.documents[i], float(score))
+            for i, score in zip(indices[0], best[0])
+            if score > 0
+        ]
+
+
+def load_product_rows() -> List[tuple]:
+    """Read the same product rows the vector ingestion embeds."""
+    rows = []
+    for batch in iter_product_rows(app_settings.ingest_batch_size):
+        rows.extend(batch)
+    return rows
+
+
+class CatalogLexicalIndex:
+    """Process-wide BM25 index kept in step with the catalog version.
+
+    The first search builds the index synchronously. After a catalog version
+    bump the old index keeps serving while a background thread rebuilds it.
+    If the products table cannot be read, searches return no lexical hits and
+    the build is retried after ``retry_seconds``.
+    """
+
+    def __init__(self, loader: Callable[[], List[tuple]] = load_product_rows, retry_seconds: float = 60):
+        self.loader = loader
+        self.retry_seconds = retry_seconds
+        self._index: Optional[BM25Index] = None
+        self._version = None
+        self._failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def _build(self) -> None:
+        version = get_catalog_version()
+        start = time.perf_counter()
+        try:
+            index = BM25Index.from_rows(self.loader())
+        except Exception as e:
+            logger.error("Failed to build lexical index: %s", str(e))
+            self._failed_at = time.monotonic()
+            return
+        self._index, self._version, self._failed_at = index, version, None
+        logger.info("Built lexical index over %d products in %.3fs", len(index), time.perf_counter() - start)
+
+    def _rebuild_in_background(self) -> None:
+        try:
+            self._build()
+        finally:
+            self._rebuilding = False
+
+    def _may_retry(self) -> bool:
+        return self._failed_at is None or time.monotonic() - self._failed_at >= self.retry_seconds
+
+    def get(self) -> Optional[BM25Index]:
+        if self._index is None:
+            with self._lock:
+                if self._index is None and self._may_retry():
+                    self._build()
+            return self._index
+
+        if get_catalog_version() != self._version and not self._rebuilding and self._may_retry():
+            with self._lock:
+                if not self._rebuilding:
+                    self._rebuilding = True
+                    threading.Thread(target=self._rebuild_in_background, name="lexical-index", daemon=True).start()
+        return self._index
+
+    def search(self, query: str, k: int = 10, where: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        index = self.get()
+        return index.search(query, k, where) if index is not None else []
+
+    def facets(self) -> Tuple[Set[str], Set[str]]:
+        """Known ``(brands, categories)``, used to recognise filters in messages."""
+        index = self.get()
+        return (index.brands, index.categories) if index is not None else (set(), set())
+
+    def stats(self) -> Dict[str, int]:
+        index = self._index
+        return {
+            "documents": len(index) if index is not None else 0,
+            "terms": len(index.postings) if index is not None else 0
+        }
+
+
+lexical_index = CatalogLexicalIndex()
@@ -0,0 +1,569 @@
+import itertools
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.config.app_config import app_settings
+from app.embeddings.client import embeddings
+from app.rag.catalog_version import bump_catalog_version, get_catalog_version
+from app.rag.filters import matches_where
+from app.rag.vector_math import normalize_rows, top_k
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.json"
+JOURNAL_FILE = "index.log"
+JOURNAL_COMPACT_RATIO = 0.5
+FILTER_CACHE_SIZE = 64
+
+
+def _apply_record(
+    record: Dict[str, Any],
+    ids: List[str],
+    texts: List[str],
+    metadatas: List[Dict[str, Any]],
+    positions: Dict[str, int]
+) -> None:
+    """Upsert one journal record; a ``null`` text list only replaces metadata."""
+    record_texts = record["texts"] or [None] * len(record["ids"])
+    for doc_id, text, metadata in zip(record["ids"], record_texts, record["metadatas"]):
+        position = positions.get(doc_id)
+        if position is None:
+            positions[doc_id] = len(ids)
+            ids.append(doc_id)
+            texts.append(text)
+            metadatas.append(metadata)
+            continue
+        if text is not None:
+            texts[position] = text
+        metadatas[position] = metadata
+
+
+class _Snapshot:
+    """Immutable view of the index; searches read one snapshot without locking."""
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        positions: Optional[Dict[str, int]] = None
+    ):
+        self.matrix = matrix
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.positions = positions if positions is not None else {doc_id: i for i, doc_id in enumerate(ids)}
+        self.filter_rows: Dict[str, np.ndarray] = {}
+
+    def rows_matching(self, where: Dict[str, Any]) -> np.ndarray:
+        """Row indices whose metadata passes ``where``, memoized per filter."""
+        key = json.dumps(where, sort_keys=True)
+        rows = self.filter_rows.get(key)
+        if rows is None:
+            rows = np.array(
+                [i for i, metadata in enumerate(self.metadatas) if matches_where(metadata, where)],
+                dtype=np.int64
+            )
+            if len(self.filter_rows) >= FILTER_CACHE_SIZE:
+                self.filter_rows.pop(next(iter(self.filter_rows)))
+            self.filter_rows[key] = rows
+        return rows
+
+
+class NumpyVectorStore:
+    """Exact in-process vector index over a memory-mapped float32 matrix.
+
+    Rows are L2-normalized at write time, so a search is a single matrix
+    multiply followed by ``argpartition``. Scores are reported as squared L2
+    distance between unit vectors (``2 - 2 * cosine``), the same scale Chroma
+    uses by default, so ``max_score`` thresholds carry over unchanged.
+
+    ``add_embeddings(..., persist=False)`` and ``update_metadata(...,
+    persist=False)`` buffer changes in memory so bulk ingestion writes once
+    per ``flush()`` instead of once per batch. Writes
+    cost the size of the change: new rows are appended to the vector file,
+    re-embedded rows are overwritten in place, and text and metadata
+    changes are appended to a journal that is replayed on load. The new
+    snapshot is built in memory rather than reloaded. ``index.json`` is
+    rewritten only when the journal outgrows ``compact_ratio`` of it, and
+    the vector file only when rows are deleted. Searches reload the files
+    when another process bumps the catalog version.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str,
+        embedding_function: Embeddings,
+        search_batch_rows: int = 65536,
+        compact_ratio: float = JOURNAL_COMPACT_RATIO
+    ):
+        self.persist_directory = Path(persist_directory)
+        self.embedding_function = embedding_function
+        self.search_batch_rows = search_batch_rows
+        self.compact_ratio = compact_ratio
+        self._write_lock = threading.Lock()
+        # (rows, ids, texts, metadatas); rows and texts are None for metadata-only updates.
+        self._pending: List[Tuple[Optional[np.ndarray], List[str], Optional[List[str]], List[Dict[str, Any]]]] = []
+        self._snapshot = self._load()
+
+    def _load(self) -> _Snapshot:
+        self.loaded_version = get_catalog_version()
+        self._generation, self._vectors_name, self._journal_name = 0, VECTORS_FILE, JOURNAL_FILE
+        self._index_bytes = self._journal_bytes = 0
+        index_path = self.persist_directory / INDEX_FILE
+        if not index_path.exists():
+            return _Snapshot(np.zeros((0, 0), dtype=np.float32), [], [], [])
+
+        raw = index_path.read_text()
+        index = json.loads(raw)
+        self._generation = index.get("generation", 0)
+        self._vectors_name = index.get("vectors", VECTORS_FILE)
+        self._journal_name = index.get("journal", JOURNAL_FILE)
+        self._index_bytes = len(raw)
+        if not (self.persist_directory / self._vectors_name).exists():
+            return _Snapshot(np.zeros((0, 0), dtype=np.float32), [], [], [])
+
+        ids, texts, metadatas = index["ids"], index["texts"], index["metadatas"]
+        positions = {doc_id: i for i, doc_id in enumerate(ids)}
+        self._journal_bytes = self._replay_journal(ids, texts, metadatas, positions)
+        matrix = self._map_vectors(index["dim"], len(ids))
+        logger.info("Loaded numpy vector index with %d vectors (dim=%d)", len(ids), index["dim"])
+        return _Snapshot(matrix, ids, texts, metadatas, positions)
+
+    def _replay_journal(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        positions: Dict[str, int]
+    ) -> int:
+        """Apply journal records in order; return the length of the intact prefix."""
+        try:
+            data = (self.persist_directory / self._journal_name).read_bytes()
+        except FileNotFoundError:
+            return 0
+        intact = 0
+        for line in data.splitlines(keepends=True):
+            # A write interrupted mid-record leaves a partial last line.
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            _apply_record(record, ids, texts, metadatas, positions)
+            intact += len(line)
+        return intact
+
+    def _map_vectors(self, dim: int, count: int) -> np.ndarray:
+        if not count:
+            return np.zeros((0, dim), dtype=np.float32)
+        return np.memmap(self.persist_directory / self._vectors_name, dtype=np.float32, mode="r", shape=(count, dim))
+
+    def _commit(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        dim: int,
+        matrix: Optional[np.ndarray] = None
+    ) -> None:
+        """Write a full ``index.json`` with an empty journal, plus a new vector file when ``matrix`` is given.
+
+        Every file of the new generation has a new name, so replacing
+        ``index.json`` switches readers over in one step.
+        """
+        self.persist_directory.mkdir(parents=True, exist_ok=True)
+        generation = self._generation + 1
+        vectors_name = self._vectors_name
+        if matrix is not None:
+            vectors_name = f"vectors-{generation}.f32"
+            np.ascontiguousarray(matrix, dtype=np.float32).tofile(self.persist_directory / vectors_name)
+        journal_name = f"index-{generation}.log"
+        (self.persist_directory / journal_name).unlink(missing_ok=True)
+
+        index_path = self.persist_directory / INDEX_FILE
+        raw = json.dumps({
+            "dim": dim,
+            "generation": generation,
+            "vectors": vectors_name,
+            "journal": journal_name,
+            "ids": ids,
+            "texts": texts,
+            "metadatas": metadatas
+        })
+        tmp_index = index_path.with_suffix(".tmp")
+        tmp_index.write_text(raw)
+        os.replace(tmp_index, index_path)
+
+        (self.persist_directory / self._journal_name).unlink(missing_ok=True)
+        if vectors_name != self._vectors_name:
+            (self.persist_directory / self._vectors_name).unlink(missing_ok=True)
+        self._generation, self._vectors_name, self._journal_name = generation, vectors_name, journal_name
+        self._index_bytes, self._journal_bytes = len(raw), 0
+
+    def _append_journal(self, record: Dict[str, Any]) -> None:
+        line = (json.dumps(record) + "\n").encode()
+        with open(self.persist_directory / self._journal_name, "a+b") as journal:
+            # Drop a partial record left by an interrupted write before appending.
+            journal.truncate(self._journal_bytes)
+            journal.write(line)
+        self._journal_bytes += len(line)
+
+    def _write_rows(self, replaced: Dict[int, np.ndarray], appended: List[np.ndarray], count: int, dim: int) -> None:
+        """Overwrite existing rows in place and append new ones after the first ``count`` rows."""
+        row_bytes = dim * np.dtype(np.float32).itemsize
+        with open(self.persist_directory / self._vectors_name, "r+b") as vectors:
+            for position in sorted(replaced):
+                vectors.seek(position * row_bytes)
+                vectors.write(np.ascontiguousarray(replaced[position], dtype=np.float32).tobytes())
+            if appended:
+                vectors.seek(count * row_bytes)
+                vectors.write(np.ascontiguousarray(np.stack(appended), dtype=np.float32).tobytes())
+                vectors.truncate()
+
+    def _maybe_compact(self) -> None:
+        if self._journal_bytes <= self.compact_ratio * self._index_bytes:
+            return
+        snapshot = self._snapshot
+        logger.info("Compacting numpy vector index journal (%d bytes)", self._journal_bytes)
+        self._commit(snapshot.ids, snapshot.texts, snapshot.metadatas, int(snapshot.matrix.shape[1]))
+
+    def _maybe_reload(self) -> None:
+        if self._pending or get_catalog_version() == self.loaded_version:
+            return
+        with self._write_lock:
+            if not self._pending and get_catalog_version() != self.loaded_version:
+                logger.info("Catalog version changed, reloading numpy vector index from disk")
+                self._snapshot = self._load()
+
+    def __len__(self) -> int:
+        return len(self._snapshot.ids)
+
+    def add_embeddings(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        persist: bool = True
+    ) -> List[str]:
+        """Insert or replace rows by id using precomputed embeddings.
+
+        With ``persist=False`` the rows are buffered until ``flush()``.
+        """
+        ids = [str(doc_id) for doc_id in ids]
+        metadatas = list(metadatas) if metadatas else [{} for _ in ids]
+        new_rows = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        with self._write_lock:
+            self._pending.append((new_rows, ids, list(texts), metadatas))
+            if persist:
+                self._flush_pending()
+        return ids
+
+    def flush(self) -> None:
+        """Write rows and metadata buffered with ``persist=False`` to disk."""
+        with self._write_lock:
+            self._flush_pending()
+
+    def _flush_pending(self) -> None:
+        """Apply buffered writes in order, one journal record per run of rows or of metadata updates."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        for has_rows, group in itertools.groupby(pending, key=lambda entry: entry[0] is not None):
+            group = list(group)
+            ids = [doc_id for _, batch_ids, _, _ in group for doc_id in batch_ids]
+            metadatas = [metadata for _, _, _, batch_metadatas in group for metadata in batch_metadatas]
+            if has_rows:
+                texts = [text for _, _, batch_texts, _ in group for text in batch_texts]
+                self._write_rows_and_text(np.vstack([rows for rows, _, _, _ in group]), ids, texts, metadatas)
+            else:
+                self._write_metadata(ids, metadatas)
+        self._maybe_compact()
+
+    def _write_rows_and_text(self, new_rows: np.ndarray, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        snapshot = self._snapshot
+        count, dim = len(snapshot.ids), new_rows.shape[1]
+        if count and snapshot.matrix.shape[1] != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match the index dimension {snapshot.matrix.shape[1]}")
+        all_ids, all_texts, all_metadatas = list(snapshot.ids), list(snapshot.texts), list(snapshot.metadatas)
+        positions = dict(snapshot.positions)
+
+        replaced, appended = {}, []
+        for row, doc_id, text, metadata in zip(new_rows, ids, texts, metadatas):
+            position = positions.get(doc_id)
+            if position is None:
+                positions[doc_id] = len(all_ids)
+                all_ids.append(doc_id)
+                all_texts.append(text)
+                all_metadatas.append(metadata)
+                appended.append(row)
+                continue
+            all_texts[position] = text
+            all_metadatas[position] = metadata
+            if position >= count:
+                appended[position - count] = row
+            else:
+                replaced[position] = row
+
+        if not count:
+            self._commit(all_ids, all_texts, all_metadatas, dim, np.stack(appended))
+        else:
+            self._write_rows(replaced, appended, count, dim)
+            self._append_journal({"ids": ids, "texts": texts, "metadatas": metadatas})
+        self._snapshot = _Snapshot(self._map_vectors(dim, len(all_ids)), all_ids, all_texts, all_metadatas, positions)
+
+    def _write_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        snapshot = self._snapshot
+        changed = [(doc_id, metadata) for doc_id, metadata in zip(ids, metadatas) if doc_id in snapshot.positions]
+        if not changed:
+            return
+        all_metadatas = list(snapshot.metadatas)
+        for doc_id, metadata in changed:
+            all_metadatas[snapshot.positions[doc_id]] = metadata
+        self._append_journal({
+            "ids": [doc_id for doc_id, _ in changed],
+            "texts": None,
+            "metadatas": [metadata for _, metadata in changed]
+        })
+        self._snapshot = _Snapshot(snapshot.matrix, snapshot.ids, snapshot.texts, all_metadatas, snapshot.positions)
+
+    def add_texts(
+        self,
+        texts: Sequence[str],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        ids: Optional[Sequence[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        if ids is None:
+            ids = [str(len(self) + i) for i in range(len(texts))]
+        vectors = self.embedding_function.embed_documents(texts)
+        return self.add_embeddings(ids, texts, vectors, metadatas)
+
+    def delete(self, ids: Optional[Sequence[str]] = None, **kwargs: Any) -> None:
+        if not ids:
+            return
+        to_delete = {str(doc_id) for doc_id in ids}
+        with self._write_lock:
+            snapshot = self._snapshot
+            keep = [i for i, doc_id in enumerate(snapshot.ids) if doc_id not in to_delete]
+            if len(keep) == len(snapshot.ids):
+                return
+            dim = int(snapshot.matrix.shape[1])
+            matrix = np.array(snapshot.matrix[keep], dtype=np.float32) if keep else np.zeros((0, dim), dtype=np.float32)
+            ids = [snapshot.ids[i] for i in keep]
+            texts = [snapshot.texts[i] for i in keep]
+            metadatas = [snapshot.metadatas[i] for i in keep]
+            self._commit(ids, texts, metadatas, dim, matrix)
+            self._snapshot = _Snapshot(self._map_vectors(dim, len(ids)), ids, texts, metadatas)
+
+    def get_metadata(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Metadata of those ``ids`` that are indexed."""
+        snapshot = self._snapshot
+        positions = (snapshot.positions.get(str(doc_id)) for doc_id in ids)
+        return {snapshot.ids[i]: snapshot.metadatas[i] for i in positions if i is not None}
+
+    def iter_ids(self, batch_size: int) -> Iterator[List[str]]:
+        """Page through the ids of the current snapshot; later writes are not seen."""
+        snapshot = self._snapshot
+        for start in range(0, len(snapshot.ids), batch_size):
+            yield snapshot.ids[start:start + batch_size]
+
+    def update_metadata(self, ids: Sequence[str], metadatas: Sequence[Dict[str, Any]], persist: bool = True) -> None:
+        """Replace metadata for existing rows; vectors are not touched.
+
+        With ``persist=False`` the update is buffered until ``flush()``.
+        """
+        with self._write_lock:
+            self._pending.append((None, [str(doc_id) for doc_id in ids], None, list(metadatas)))
+            if persist:
+                self._flush_pending()
+
+    def search_batch(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top-k for a batch of queries.
+
+        Returns ``(indices, similarities)`` into the current snapshot. The
+        matrix is scanned in row blocks so very large catalogs do not need a
+        full ``queries x rows`` score matrix in memory. ``rows`` restricts the
+        scan to a subset of row indices (a metadata pre-filter).
+        """
+        snapshot = self._snapshot
+        queries = normalize_rows(np.atleast_2d(np.asarray(query_vectors, dtype=np.float32)))
+        total = snapshot.matrix.shape[0] if rows is None else len(rows)
+        if total == 0:
+            empty = np.empty((queries.shape[0], 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        best_indices, best_scores = None, None
+        for start in range(0, total, self.search_batch_rows):
+            if rows is None:
+                block = snapshot.matrix[start:start + self.search_batch_rows]
+                indices, scores = top_k(queries @ block.T, k)
+                indices = indices + start
+            else:
+                block_rows = rows[start:start + self.search_batch_rows]
+                indices, scores = top_k(queries @ snapshot.matrix[block_rows].T, k)
+                indices = block_rows[indices]
+            if best_indices is None:
+                best_indices, best_scores = indices, scores
+            else:
+                merged_indices = np.hstack([best_indices, indices])
+                order, best_scores = top_k(np.hstack([best_scores, scores]), k)
+                best_indices = np.take_along_axis(merged_indices, order, axis=1)
+        return best_indices, best_scores
+
+    def _to_results(self, snapshot: _Snapshot, indices: np.ndarray, similarities: np.ndarray) -> List[Tuple[Document, float]]:
+        return [
+            (
+                Document(id=snapshot.ids[i], page_content=snapshot.texts[i], metadata=snapshot.metadatas[i]),
+                float(2.0 - 2.0 * similarity)
+            )
+            for i, similarity in zip(indices, similarities)
+        ]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """Top-k by vector; ``filter`` is a Chroma-style ``where`` applied before scoring."""
+        return [(doc, score) for doc, score, _ in self.similarity_search_by_vector_with_embeddings(embedding, k, filter)]
+
+    def similarity_search_by_vector_with_embeddings(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float, np.ndarray]]:
+        """Like ``similarity_search_by_vector_with_relevance_scores`` plus each hit's unit vector."""
+        self._maybe_reload()
+        snapshot = self._snapshot
+        rows = snapshot.rows_matching(filter) if filter else None
+        indices, similarities = self.search_batch(np.asarray([embedding]), k, rows)
+        results = self._to_results(snapshot, indices[0], similarities[0])
+        vectors = np.asarray(snapshot.matrix[indices[0]], dtype=np.float32)
+        return [(doc, score, vector) for (doc, score), vector in zip(results, vectors)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(embedding, k=k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+
+def _store_path() -> Path:
+    path = Path(app_settings.numpy_store_path)
+    return path if path.is_absolute() else ROOT / path
+
+
+vectorstore = NumpyVectorStore(persist_directory=str(_store_path()), embedding_function=embeddings)
+
+
+def add_documents(docs: list[dict]) -> None:
+    try:
+        logger.info("Adding %d documents to numpy vector store", len(docs))
+        vectorstore.add_texts(
+            texts=[d["text"] for d in docs],
+            metadatas=[d.get("metadata", {}) for d in docs],
+            ids=[d.get("id") for d in docs]
+        )
+        bump_catalog_version()
+        logger.info("Successfully added %d documents to numpy vector store", len(docs))
+    except Exception as e:
+        logger.error("Failed to add documents to numpy vector store: %s", str(e))
+        raise
+
+
+def add_embedded_documents(docs: list[dict], vectors: list[list[float]]) -> None:
+    """Upsert documents whose embeddings were computed by the caller."""
+    try:
+        vectorstore.add_embeddings(
+            [d["id"] for d in docs],
+            [d["text"] for d in docs],
+            vectors,
+            [d.get("metadata", {}) for d in docs],
+            persist=False
+        )
+    except Exception as e:
+        logger.error("Failed to upsert embedded documents into numpy vector store: %s", str(e))
+        raise
+
+
+def flush() -> None:
+    """Persist documents and metadata buffered by ``add_embedded_documents`` and ``update_metadata``."""
+    vectorstore.flush()
+
+
+def search_with_embeddings(embedding: list[float], k: int, filter: dict = None) -> list[tuple]:
+    """Return ``(document, score, vector)`` hits in a single index lookup."""
+    return vectorstore.similarity_search_by_vector_with_embeddings(embedding, k=k, filter=filter)
+
+
+def get_indexed_metadata(ids: list[str]) -> dict[str, dict]:
+    return vectorstore.get_metadata(ids)
+
+
+def iter_indexed_ids(batch_size: int):
+    return vectorstore.iter_ids(batch_size)
+
+
+def update_metadata(ids: list[str], metadatas: list[dict], persist: bool = True) -> None:
+    """Replace metadata in place; with ``persist=False`` it is buffered until ``flush()``."""
+    try:
+        logger.info("Updating metadata for %d documents in numpy vector store", len(ids))
+        vectorstore.update_metadata(ids, metadatas, persist=persist)
+        if persist:
+            bump_catalog_version()
+    except Exception as e:
+        logger.error("Failed to update metadata in numpy vector store: %s", str(e))
+        raise
+
+
+def delete_documents(ids: list[str]) -> None:
+    try:
+        logger.info("Deleting %d documents from numpy vector store", len(ids))
+        vectorstore.delete(ids=ids)
+        bump_catalog_version()
+    except Exception as e:
+        logger.error("Failed to delete documents from numpy vector store: %s", str(e))
+        raise
+
+
+def import_from_chroma() -> int:
+    """Copy vectors, texts and metadata out of the Chroma store without re-embedding."""
+    from app.rag.chroma_store import vectorstore as chroma_vectorstore
+
+    data = chroma_vectorstore.get(include=["documents", "metadatas", "embeddings"])
+    if not data["ids"]:
+        logger.warning("Chroma store is empty, nothing to import")
+        return 0
+    vectorstore.add_embeddings(data["ids"], data["documents"], data["embeddings"], data["metadatas"])
+    bump_catalog_version()
+    logger.info("Imported %d vectors from Chroma into the numpy store", len(data["ids"]))
+    return len(data["ids"])
+
+
+if __name__ == "__main__":
+    import_from_chroma()
@@ -1,41 +1,193 @@
 import logging
-from typing import List, Any
-from app.rag.chroma_store import vectorstore
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+from app.config.app_config import app_settings
+from app.rag.vector_math import mmr_select
+from app.rag.vector_store import get_store_module, get_vectorstore
+from app.rag.lexical_index import lexical_index
+from app.services.rag.answer_cache import document_id
+from app.embeddings.client import embeddings
 
 logger = logging.getLogger(__name__)
 
 
-def get_retriever(k: int = 3, use_scores: bool = False, max_score: float = 1.2):
+RETRIEVAL_MODES = ("vector", "hybrid")
+
+
+def get_retriever(
+    k: int = 3,
+    use_scores: bool = False,
+    max_score: float = 1.2,
+    retrieval_mode: str = "vector",
+    mmr_lambda: Optional[float] = None,
+    mmr_fetch_k: int = 0
+):
+    if mmr_lambda is not None:
+        logger.info("Enabling MMR rerank: lambda=%.2f, fetch_k=%s", mmr_lambda, mmr_fetch_k or "auto")
+    if retrieval_mode == "hybrid":
+        logger.info("Creating hybrid retriever: k=%d, use_scores=%s", k, use_scores)
+        return HybridRetriever(k=k, max_score=max_score if use_scores else None, mmr_lambda=mmr_lambda, mmr_fetch_k=mmr_fetch_k)
     if use_scores:
         logger.info("Creating retriever with score filtering: k=%d, max_score=%.2f", k, max_score)
-        return ScoreFilteringRetriever(k=k, max_score=max_score)
+        return ScoreFilteringRetriever(k=k, max_score=max_score, mmr_lambda=mmr_lambda, mmr_fetch_k=mmr_fetch_k)
     else:
         logger.info("Creating standard retriever: k=%d", k)
-        return vectorstore.as_retriever(search_kwargs={"k": k})
+        return VectorRetriever(k=k, mmr_lambda=mmr_lambda, mmr_fetch_k=mmr_fetch_k)
+
+
+class VectorRetriever:
+    """Top-k retriever with matching sync and async entry points.
+
+    The query is embedded first (through the cached embeddings client) and the
+    vector store is then searched by vector, so the async path can await the
+    embedding call and offload only the local index lookup to a worker thread.
+    ``where`` is a Chroma-style metadata filter pushed down into the store so
+    only matching products are ranked.
 
+    With ``mmr_lambda`` set, ``fetch_k`` candidates are fetched together with
+    their stored vectors and reranked by maximal marginal relevance, so
+    near-identical variants do not fill the prompt. The rerank is local
+    NumPy work on vectors returned by the same search call.
+    """
 
-class ScoreFilteringRetriever:    
-    def __init__(self, k: int = 3, max_score: float = 1.2):
+    def __init__(self, k: int = 3, mmr_lambda: Optional[float] = None, mmr_fetch_k: int = 0):
         self.k = k
+        self.mmr_lambda = mmr_lambda
+        self.mmr_fetch_k = mmr_fetch_k
+        self.vectorstore = get_vectorstore()
+        self.store = get_store_module()
+
+    @property
+    def fetch_k(self) -> int:
+        if self.mmr_lambda is not None:
+            return max(self.k, self.mmr_fetch_k or self.k * app_settings.mmr_fetch_multiplier)
+        return self.k
+
+    def _keep(self, score: float) -> bool:
+        return True
+
+    def _search(self, embedding: List[float], where: Optional[Dict[str, Any]] = None) -> List[Tuple[Any, float]]:
+        if self.mmr_lambda is None:
+            return self.vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k=self.fetch_k, filter=where)
+
+        hits = [hit for hit in self.store.search_with_embeddings(embedding, k=self.fetch_k, filter=where) if self._keep(hit[1])]
+        if not hits:
+            return []
+        order = mmr_select(np.asarray(embedding), np.stack([vector for _, _, vector in hits]), self.k, self.mmr_lambda)
+        return [(hits[i][0], hits[i][1]) for i in order]
+
+    def _select(self, docs_with_scores: List[Tuple[Any, float]]) -> List[Any]:
+        return [doc for doc, _ in docs_with_scores][:self.k]
+
+    def invoke(self, query: str, where: Optional[Dict[str, Any]] = None) -> List[Any]:
+        try:
+            embedding = embeddings.embed_query(query)
+            return self._select(self._search(embedding, where))
+        except Exception as e:
+            logger.error("Error in vector retriever: %s", str(e))
+            raise
+
+    async def ainvoke(self, query: str, where: Optional[Dict[str, Any]] = None) -> List[Any]:
+        try:
+            embedding = await embeddings.aembed_query(query)
+            docs_with_scores = await run_in_threadpool(self._search, embedding, where)
+            return self._select(docs_with_scores)
+        except Exception as e:
+            logger.error("Error in async vector retriever: %s", str(e))
+            raise
+
+    def get_relevant_documents(self, query: str, where: Optional[Dict[str, Any]] = None) -> List[Any]:
+        return self.invoke(query, where)
+
+
+class ScoreFilteringRetriever(VectorRetriever):    
+    # Results come back sorted by distance, so the hits under ``max_score``
+    # are always a prefix: without MMR, fetching more than k cannot add any.
+    def __init__(self, k: int = 3, max_score: float = 1.2, mmr_lambda: Optional[float] = None, mmr_fetch_k: int = 0):
+        super().__init__(k=k, mmr_lambda=mmr_lambda, mmr_fetch_k=mmr_fetch_k)
         self.max_score = max_score
-        self.vectorstore = vectorstore
 
-    def invoke(self, query: str) -> List[Any]:
+    def _keep(self, score: float) -> bool:
+        return score < self.max_score
+
+    def _select(self, docs_with_scores: List[Tuple[Any, float]]) -> List[Any]:
+        filtered_docs = [doc for doc, score in docs_with_scores if self._keep(score)]
+        
+        result = filtered_docs[:self.k]
+        
+        logger.info("Found %d documents after score filtering (requested %d)", len(result), self.k)
+        return result
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[Any]], k: int, rrf_k: int = 60) -> List[Any]:
+    """Merge ranked document lists by summing ``1 / (rrf_k + rank)`` per document.
+
+    Documents are matched across lists by id; the first list a document
+    appears in supplies the returned object.
+    """
+    scores = {}
+    docs = {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked, start=1):
+            key = document_id(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    best = sorted(scores, key=lambda key: scores[key], reverse=True)[:k]
+    return [docs[key] for key in best]
+
+
+class HybridRetriever(VectorRetriever):
+    """Vector search fused with the in-memory BM25 index.
+
+    Exact model numbers and brand names are found by the lexical stage, so
+    the vector stage only fetches ``HYBRID_VECTOR_K`` candidates (``k`` by
+    default). When ``max_score`` is set, vector hits above it are dropped
+    before fusion.
+    """
+
+    def __init__(
+        self,
+        k: int = 3,
+        max_score: Optional[float] = None,
+        mmr_lambda: Optional[float] = None,
+        mmr_fetch_k: int = 0
+    ):
+        super().__init__(k=k, mmr_lambda=mmr_lambda, mmr_fetch_k=mmr_fetch_k)
+        self.max_score = max_score
+        self.lexical_k = app_settings.hybrid_lexical_k or k * 2
+        self.rrf_k = app_settings.hybrid_rrf_k
+
+    @property
+    def fetch_k(self) -> int:
+        return app_settings.hybrid_vector_k or super().fetch_k
+
+    def _keep(self, score: float) -> bool:
+        return self.max_score is None or score < self.max_score
+
+    def _fuse(self, query: str, docs_with_scores: List[Tuple[Any, float]], where: Optional[Dict[str, Any]] = None) -> List[Any]:
+        vector_docs = [doc for doc, score in docs_with_scores if self._keep(score)]
+        lexical_docs = [doc for doc, _ in lexical_index.search(query, self.lexical_k, where)]
+        result = reciprocal_rank_fusion([vector_docs, lexical_docs], self.k, self.rrf_k)
+        logger.info(
+            "Hybrid retrieval fused %d vector and %d lexical hits into %d documents",
+            len(vector_docs), len(lexical_docs), len(result)
+        )
+        return result
+
+    def invoke(self, query: str, where: Optional[Dict[str, Any]] = None) -> List[Any]:
+        try:
+            embedding = embeddings.embed_query(query)
+            return self._fuse(query, self._search(embedding, where), where)
+        except Exception as e:
+            logger.error("Error in hybrid retriever: %s", str(e))
+            raise
+
+    async def ainvoke(self, query: str, where: Optional[Dict[str, Any]] = None) -> List[Any]:
         try:
-            logger.info("Retrieving documents with score filtering for: '%s'", query)
-            
-            docs_with_scores = self.vectorstore.similarity_search_with_score(query, k=self.k * 2)
-            
-            filtered_docs = [doc for doc, score in docs_with_scores if score < self.max_score]
-            
-            result = filtered_docs[:self.k]
-            
-            logger.info("Found %d documents after score filtering (requested %d)", len(result), self.k)
-            return result
-            
+            embedding = await embeddings.aembed_query(query)
+            docs_with_scores = await run_in_threadpool(self._search, embedding, where)
+            return await run_in_threadpool(self._fuse, query, docs_with_scores, where)
         except Exception as e:
-            logger.error("Error in score filtering retriever: %s", str(e))
+            logger.error("Error in async hybrid retriever: %s", str(e))
             raise
-    
-    def get_relevant_documents(self, query: str) -> List[Any]:
-        return self.invoke(query)
\ No newline at end of file
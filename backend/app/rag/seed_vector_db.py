@@ -1,48 +1,99 @@
+import hashlib
 import logging
-from db.connection import get_db_connection
-from app.rag.chroma_store import add_documents
+from dataclasses import dataclass, field
+from typing import Dict, List
+from app.rag.filters import category_key, normalize_facet
 
 logger = logging.getLogger(__name__)
 
-def extract_products():
-    conn = get_db_connection()
-    cur  = conn.cursor()
-    cur.execute(
-        "SELECT id, name, brand, features, price, quantity FROM products;"
-        )
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    logger.info("Found %d products in database", len(rows))
-    
-    if len(rows) == 0:
-        logger.warning("No products found in database. Please run the database seed first.")
-        return []
-
-    docs = []
-    for prod_id, name, brand, features, price, quantity in rows:
-        text = f"{name} {brand} {features}"
-        docs.append({
-            "id": str(prod_id),
-            "text": text,
-            "metadata": {
-                "price": float(price),
-                "quantity": int(quantity)
-            }
-        })
-    return docs
+# Metadata keys that are bookkeeping for the sync rather than product data.
+SYNC_METADATA_KEYS = {"content_hash"}
+
+
+def content_hash(name: str, brand: str, features: str) -> str:
+    """Hash of the fields that make up the embedded text."""
+    payload = "\x1f".join([name or "", brand or "", features or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_document(prod_id, name, brand, features, price, quantity, categories=None) -> dict:
+    """Vector store document for a product row.
+
+    Brand and categories are stored as filterable metadata: the normalized
+    brand name, plus one ``cat_<slug>: True`` flag per category so category
+    filters work with scalar-only metadata stores.
+    """
+    metadata = {
+        "price": float(price),
+        "quantity": int(quantity),
+        "brand": normalize_facet(brand),
+        "content_hash": content_hash(name, brand, features)
+    }
+    for category in categories or []:
+        metadata[category_key(category)] = True
+    return {
+        "id": str(prod_id),
+        "text": f"{name} {brand} {features}",
+        "metadata": metadata
+    }
+
+
+@dataclass
+class SyncPlan:
+    to_embed: List[dict] = field(default_factory=list)
+    to_update: List[dict] = field(default_factory=list)
+    to_delete: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "embedded": len(self.to_embed),
+            "metadata_updated": len(self.to_update),
+            "deleted": len(self.to_delete),
+            "unchanged": self.unchanged
+        }
+
+
+def plan_sync(docs: List[dict], indexed: Dict[str, dict]) -> SyncPlan:
+    """Diff catalog documents against what the vector store already holds.
+
+    - new products or changed name/brand/features -> re-embed (upsert)
+    - only price/quantity changed -> metadata update, no embedding call
+    - indexed ids no longer in the catalog (including legacy UUID ids from
+      seeds that ignored product ids) -> delete
+    """
+    plan = SyncPlan()
+    catalog_ids = set()
+    for doc in docs:
+        catalog_ids.add(doc["id"])
+        current = indexed.get(doc["id"])
+        if current is None or current.get("content_hash") != doc["metadata"]["content_hash"]:
+            plan.to_embed.append(doc)
+        elif {k: v for k, v in current.items() if k not in SYNC_METADATA_KEYS} != \
+                {k: v for k, v in doc["metadata"].items() if k not in SYNC_METADATA_KEYS}:
+            plan.to_update.append(doc)
+        else:
+            plan.unchanged += 1
+    plan.to_delete = sorted(doc_id for doc_id in indexed if doc_id not in catalog_ids)
+    return plan
+
+
+def sync_vector_db(backend: str = None) -> Dict[str, int]:
+    """Idempotently bring the vector store in line with the products table.
+
+    Runs the streaming ingestion from scratch (ignoring any checkpoint) so
+    memory stays flat regardless of catalog size.
+    """
+    from app.rag.ingest import ingest_products
+
+    logger.info("Starting vector store sync")
+    return ingest_products(backend=backend, resume=False)
+
 
 def seed_vector_db():
     logger.info("Starting vector store seed process")
-    docs = extract_products()
-    
-    if len(docs) == 0:
-        logger.error("No documents to add. Exiting.")
-        return
-        
-    add_documents(docs)
-    logger.info("Vector store seed completed successfully: inserted %d embeddings", len(docs))
+    summary = sync_vector_db()
+    logger.info("Vector store seed completed successfully: embedded %d documents", summary["embedded"])
 
 
 if __name__ == "__main__":
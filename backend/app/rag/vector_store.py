@@ -0,0 +1,39 @@
+import importlib
+import logging
+from types import ModuleType
+
+from app.config.app_config import app_settings
+
+logger = logging.getLogger(__name__)
+
+# Each backend module exposes a module-level ``vectorstore`` plus the same
+# functions as chroma_store: ``add_documents(docs)`` (upsert by id),
+# ``add_embedded_documents(docs, vectors)`` (upsert precomputed embeddings),
+# ``flush()`` (persist documents buffered by ``add_embedded_documents``),
+# ``search_with_embeddings(embedding, k, filter)`` (hits plus their vectors),
+# ``get_indexed_metadata(ids)`` (metadata of those ids that are indexed),
+# ``iter_indexed_ids(batch_size)`` (pages of every indexed id),
+# ``update_metadata(ids, metadatas, persist=True)`` (``persist=False`` buffers
+# until ``flush()`` and leaves the catalog version bump to the caller) and
+# ``delete_documents(ids)``.
+VECTOR_BACKENDS = {
+    "chroma": "app.rag.chroma_store",
+    "numpy": "app.rag.numpy_store",
+    "faiss": "app.rag.faiss_store",
+}
+
+
+def get_store_module(backend: str = None) -> ModuleType:
+    """Import the configured vector backend lazily so unused stores are never opened."""
+    backend = (backend or app_settings.vector_backend).lower()
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend '{backend}'. Expected one of: {', '.join(VECTOR_BACKENDS)}")
+    return importlib.import_module(VECTOR_BACKENDS[backend])
+
+
+def get_vectorstore(backend: str = None):
+    return get_store_module(backend).vectorstore
+
+
+def add_documents(docs: list[dict], backend: str = None) -> None:
+    get_store_module(backend).add_documents(docs)
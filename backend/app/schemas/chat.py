@@ -15,6 +15,24 @@ class ChatRequest(BaseModel):
     business_type: Optional[str] = Field(default="e-commerce", description="Type of business context")
     use_scores: Optional[bool] = Field(default=False, description="Whether to filter by similarity scores")
     max_score: Optional[float] = Field(default=1.2, ge=0.0, le=2.0, description="Maximum score threshold")
+    retrieval_mode: Optional[str] = Field(
+        default="vector",
+        pattern="^(vector|hybrid)$",
+        description="Retrieval strategy: 'vector' (embedding search) or 'hybrid' (BM25 + vector fused with reciprocal rank fusion)"
+    )
+    min_price: Optional[float] = Field(default=None, ge=0.0, description="Only retrieve products at or above this price")
+    max_price: Optional[float] = Field(default=None, ge=0.0, description="Only retrieve products at or below this price")
+    in_stock_only: Optional[bool] = Field(default=False, description="Only retrieve products with quantity > 0")
+    categories: Optional[List[str]] = Field(default=None, description="Only retrieve products in any of these categories")
+    brand: Optional[str] = Field(default=None, description="Only retrieve products of this brand")
+    mmr: Optional[bool] = Field(default=False, description="Rerank candidates by maximal marginal relevance for more diverse products")
+    mmr_lambda: Optional[float] = Field(default=0.5, ge=0.0, le=1.0, description="MMR trade-off: 1.0 is pure relevance, 0.0 pure diversity")
+    mmr_fetch_k: Optional[int] = Field(default=None, ge=1, le=100, description="Candidates to rerank with MMR (default: k * MMR_FETCH_MULTIPLIER)")
+    parse_filters: Optional[bool] = Field(
+        default=False,
+        description="Also extract price, stock, brand and category constraints from the message; explicit fields win, "
+                    "and retrieval falls back to the explicit ones if the extracted constraints match nothing"
+    )
 
 
 class ChatResponse(BaseModel):
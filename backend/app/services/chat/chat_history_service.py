@@ -1,8 +1,43 @@
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Dict, Any
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+from typing import List, Dict, Any, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
 from app.models.chat_message import ChatMessage
+from app.models.chat_session_summary import ChatSessionSummary
+from app.exceptions.chat_exceptions import ChatValidationException
 from app.interfaces.chat_history_interface import ChatHistoryServiceInterface
+from app.services.chat.history_cache import CachedMessage, CachedSummary, history_cache
+from app.services.chat.history_writer import history_writer, message_row
+from app.services.chat.history_retention import history_maintenance
+from app.services.chat.message_counter import get_cleared_through_id, get_message_count, increment_message_count, mark_cleared, not_cleared
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+# Upper bound on how long clearing history waits for write-behind messages.
+CLEAR_FLUSH_TIMEOUT_SECONDS = 10
+
+def encode_cursor(message: ChatMessage) -> str:
+    """Opaque cursor pointing just past ``message`` in newest-first order."""
+    payload = json.dumps([message.created_at.isoformat(), message.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Return the ``(created_at, id)`` position encoded by ``encode_cursor``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (binascii.Error, UnicodeError, TypeError, ValueError) as e:
+        raise ChatValidationException("Invalid history cursor") from e
+
 
 class ChatHistoryService(ChatHistoryServiceInterface):
     def __init__(self, db: Session):
@@ -16,41 +51,225 @@ class ChatHistoryService(ChatHistoryServiceInterface):
             content=content,
             session_id=session_id
         )
-        self.db.add(message)
-        self.db.commit()
-        self.db.refresh(message)
+        try:
+            self.db.add(message)
+            self.db.flush()
+            message_id = message.id
+            increment_message_count(self.db, user_id, [message_id])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        history_cache.append(user_id, session_id, [(message_id, message_type, content)])
         return message
 
+    def save_turn(self, user_id: int, session_id: str, user_message: str, assistant_message: str) -> None:
+        """Save a user message and its reply together.
+
+        Both rows go in one transaction, or to the write-behind queue when
+        ``CHAT_HISTORY_WRITE_BEHIND`` is on. Nothing is read back.
+        """
+        rows = [
+            message_row(user_id, "user", user_message, session_id),
+            message_row(user_id, "assistant", assistant_message, session_id)
+        ]
+        if history_writer.enabled:
+            history_writer.enqueue(rows)
+            history_cache.append(user_id, session_id, [(None, row["message_type"], row["content"]) for row in rows])
+            return
+        messages = [ChatMessage(**row) for row in rows]
+        try:
+            self.db.add_all(messages)
+            # The INSERT returns the ids, so the cache gets them without a read.
+            self.db.flush()
+            cached = [(message.id, message.message_type, message.content) for message in messages]
+            increment_message_count(self.db, user_id, [message.id for message in messages])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        history_cache.append(user_id, session_id, cached)
+
     def get_recent_history(self, user_id: int, session_id: str, limit: int = 10) -> List[ChatMessage]:
         """Get recent chat history for a specific session."""
         return self._get_messages_by_session(user_id, session_id, limit)
 
     def get_recent_history_as_dict(self, user_id: int, session_id: str, limit: int = 10) -> List[Dict[str, str]]:
         """Get recent chat history as a list of dictionaries for LangChain."""
+        cached = self._get_cached_session(user_id, session_id, limit)
+        if cached is not None:
+            return [{"role": role, "content": content} for _, role, content in cached[1][-limit:]]
         messages = self.get_recent_history(user_id, session_id, limit)
         return self._convert_messages_to_dict(messages)
 
+    def get_prompt_history_as_dict(self, user_id: int, session_id: str, limit: int = 10) -> List[Dict[str, str]]:
+        """Get the session summary followed by up to ``limit`` turns it does not cover yet."""
+        cached = self._get_cached_session(user_id, session_id, limit)
+        if cached is not None:
+            summary, messages = cached
+            after_id = summary[1] if summary is not None else 0
+            # Queued write-behind messages have no id yet and are newer than any summary.
+            uncovered = [message for message in messages if message[0] is None or message[0] > after_id]
+            history = [{"role": role, "content": content} for _, role, content in uncovered[-limit:]]
+            if summary is not None:
+                history.insert(0, {"role": "system", "content": SUMMARY_PREFIX + summary[0]})
+            return history
+
+        summary = self.get_summary(user_id, session_id)
+        after_id = summary.last_message_id if summary is not None else 0
+        history = self._convert_messages_to_dict(self._get_messages_by_session(user_id, session_id, limit, after_id))
+        if summary is not None:
+            history.insert(0, {"role": "system", "content": SUMMARY_PREFIX + summary.summary})
+        return history
+
+    def get_summary(self, user_id: int, session_id: str) -> Optional[ChatSessionSummary]:
+        """Get the rolling summary of a session, if one has been written."""
+        return (
+            self.db.query(ChatSessionSummary)
+            .filter(
+                ChatSessionSummary.user_id == user_id,
+                ChatSessionSummary.session_id == session_id
+            )
+            .first()
+        )
+
+    def get_messages_after(self, user_id: int, session_id: str, after_id: int = 0) -> List[ChatMessage]:
+        """Get the session messages newer than ``after_id`` in chronological order."""
+        return (
+            self.db.query(ChatMessage)
+            .filter(
+                ChatMessage.user_id == user_id,
+                ChatMessage.session_id == session_id,
+                ChatMessage.id > after_id,
+                not_cleared(user_id)
+            )
+            .order_by(ChatMessage.id)
+            .all()
+        )
+
+    def save_summary(self, user_id: int, session_id: str, summary: str, last_message_id: int) -> None:
+        """Store a session summary; a summary covering fewer messages never replaces a newer one."""
+        row = self.get_summary(user_id, session_id)
+        if row is None:
+            self.db.add(ChatSessionSummary(
+                user_id=user_id,
+                session_id=session_id,
+                summary=summary,
+                last_message_id=last_message_id
+            ))
+        elif row.last_message_id < last_message_id:
+            row.summary = summary
+            row.last_message_id = last_message_id
+        else:
+            return
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Another worker created the summary first; the next turn folds again.
+            self.db.rollback()
+            logger.info("Summary for session %s was written concurrently, skipping", session_id)
+            return
+        history_cache.invalidate(user_id, session_id)
+
     def get_history(self, user_id: int, limit: int = 50, offset: int = 0) -> List[ChatMessage]:
         """Get paginated chat history for a user."""
         return self._get_messages_by_user(user_id, limit, offset)
 
+    def get_history_page(self, user_id: int, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[ChatMessage], Optional[str]]:
+        """Get a page of a user's history older than ``cursor`` (the newest page without one).
+
+        Returns the messages in chronological order and the cursor of the
+        next, older page, or ``None`` once the history is exhausted. Pages
+        are located by index seek on ``(created_at, id)``, so deep pages
+        cost the same as the first one.
+        """
+        query = self.db.query(ChatMessage).filter(ChatMessage.user_id == user_id, not_cleared(user_id))
+        if cursor:
+            query = query.filter(tuple_(ChatMessage.created_at, ChatMessage.id) < tuple_(*decode_cursor(cursor)))
+        messages = (
+            query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        next_cursor = encode_cursor(messages[limit - 1]) if len(messages) > limit else None
+        return messages[:limit][::-1], next_cursor
+
     def get_message_count(self, user_id: int) -> int:
-        """Get total number of messages for a user."""
-        return self._count_messages_by_user(user_id)
+        """Get total number of messages for a user from the maintained counter."""
+        return get_message_count(self.db, user_id)
 
     def clear_history(self, user_id: int) -> None:
-        """Clear all chat history for a user."""
-        self._delete_messages_by_user(user_id)
+        """Clear all chat history for a user.
+
+        The messages disappear from every read as soon as this returns; the
+        rows themselves are deleted in batches by ``history_maintenance``.
+        """
+        if history_writer.enabled and not history_writer.flush(CLEAR_FLUSH_TIMEOUT_SECONDS):
+            logger.warning("Clearing history of user %s while chat messages are still queued", user_id)
+        through_id = self._hide_messages_by_user(user_id)
+        history_cache.invalidate_user(user_id)
+        history_maintenance.schedule_delete(user_id, through_id)
+
+    # Async variants: the SQLAlchemy session is synchronous, so each call is
+    # offloaded to the threadpool instead of running on the event loop.
+    async def asave_message(self, user_id: int, message_type: str, content: str, session_id: str):
+        return await run_in_threadpool(self.save_message, user_id, message_type, content, session_id)
+
+    async def asave_turn(self, user_id: int, session_id: str, user_message: str, assistant_message: str) -> None:
+        await run_in_threadpool(self.save_turn, user_id, session_id, user_message, assistant_message)
+
+    async def aget_recent_history_as_dict(self, user_id: int, session_id: str, limit: int = 10) -> List[Dict[str, str]]:
+        return await run_in_threadpool(self.get_recent_history_as_dict, user_id, session_id, limit)
+
+    async def aget_prompt_history_as_dict(self, user_id: int, session_id: str, limit: int = 10) -> List[Dict[str, str]]:
+        return await run_in_threadpool(self.get_prompt_history_as_dict, user_id, session_id, limit)
+
+    async def aget_history(self, user_id: int, limit: int = 50, offset: int = 0) -> List[ChatMessage]:
+        return await run_in_threadpool(self.get_history, user_id, limit, offset)
 
-    def _get_messages_by_session(self, user_id: int, session_id: str, limit: int) -> List[ChatMessage]:
+    async def aget_history_page(self, user_id: int, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[ChatMessage], Optional[str]]:
+        return await run_in_threadpool(self.get_history_page, user_id, limit, cursor)
+
+    async def aget_message_count(self, user_id: int) -> int:
+        return await run_in_threadpool(self.get_message_count, user_id)
+
+    async def aclear_history(self, user_id: int) -> None:
+        await run_in_threadpool(self.clear_history, user_id)
+
+    def _get_cached_session(self, user_id: int, session_id: str, limit: int) -> Optional[Tuple[CachedSummary, List[CachedMessage]]]:
+        """Summary and recent messages of a session from the history cache, loading them on a miss.
+
+        Returns ``None`` when the cache is off or holds fewer than ``limit`` messages per session.
+        A per-worker cache is checked against the user's clear watermark, one
+        primary-key read, so history cleared on another worker is not served.
+        """
+        if not history_cache.enabled or limit > history_cache.capacity:
+            return None
+        watermark = get_cleared_through_id(self.db, user_id) if history_cache.needs_watermark else None
+        cached = history_cache.get(user_id, session_id, watermark)
+        if cached is not None:
+            return cached
+        version = history_cache.version(user_id, session_id)
+        row = self.get_summary(user_id, session_id)
+        summary = (row.summary, row.last_message_id) if row is not None else None
+        messages = [
+            (message.id, message.message_type, message.content)
+            for message in self._get_messages_by_session(user_id, session_id, history_cache.capacity)
+        ]
+        history_cache.fill(user_id, session_id, summary, messages, version, watermark)
+        return summary, messages
+
+    def _get_messages_by_session(self, user_id: int, session_id: str, limit: int, after_id: int = 0) -> List[ChatMessage]:
         """Private method to get messages by session with common query logic."""
         messages = (
             self.db.query(ChatMessage)
             .filter(
                 ChatMessage.user_id == user_id,
-                ChatMessage.session_id == session_id
+                ChatMessage.session_id == session_id,
+                ChatMessage.id > after_id,
+                not_cleared(user_id)
             )
-            .order_by(ChatMessage.created_at.desc())
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
             .limit(limit)
             .all()
         )
@@ -60,31 +279,28 @@ class ChatHistoryService(ChatHistoryServiceInterface):
         """Private method to get messages by user with pagination."""
         messages = (
             self.db.query(ChatMessage)
-            .filter(ChatMessage.user_id == user_id)
-            .order_by(ChatMessage.created_at.desc())
+            .filter(ChatMessage.user_id == user_id, not_cleared(user_id))
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
             .offset(offset)
             .limit(limit)
             .all()
         )
         return messages[::-1]  # Reverse to get chronological order
 
-    def _count_messages_by_user(self, user_id: int) -> int:
-        """Private method to count messages by user."""
-        count = (
-            self.db.query(func.count(ChatMessage.id))
-            .filter(ChatMessage.user_id == user_id)
-            .scalar()
-        )
-        return count or 0
-
-    def _delete_messages_by_user(self, user_id: int) -> None:
-        """Private method to delete messages by user."""
-        (
-            self.db.query(ChatMessage)
-            .filter(ChatMessage.user_id == user_id)
-            .delete()
-        )
-        self.db.commit()
+    def _hide_messages_by_user(self, user_id: int) -> int:
+        """Private method to hide a user's messages and delete their summaries; returns the hidden-through id."""
+        try:
+            through_id = mark_cleared(self.db, user_id)
+            (
+                self.db.query(ChatSessionSummary)
+                .filter(ChatSessionSummary.user_id == user_id)
+                .delete()
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return through_id
 
     def _convert_messages_to_dict(self, messages: List[ChatMessage]) -> List[Dict[str, str]]:
         """Private method to convert messages to dictionary format."""
@@ -1,7 +1,11 @@
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 from app.schemas.chat import ChatRequest, ChatMessage
-from app.services.rag.rag_service import ask_rag
+from starlette.concurrency import run_in_threadpool
+from app.rag.filters import ProductFilter, parse_message_filters
+from app.rag.lexical_index import lexical_index
+from app.rag.retriever import RETRIEVAL_MODES
+from app.services.rag.rag_service import ask_rag, aask_rag, engine_registry
 from app.interfaces.chat_interface import ChatServiceInterface, HistoryConverterInterface, RequestValidatorInterface
 
 logger = logging.getLogger(__name__)
@@ -24,6 +28,34 @@ class ChatService(ChatServiceInterface, HistoryConverterInterface, RequestValida
             raise ValueError("k must be between 1 and 20")
         if request.max_score < 0 or request.max_score > 2.0:
             raise ValueError("max_score must be between 0.0 and 2.0")
+        if request.retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"retrieval_mode must be one of: {', '.join(RETRIEVAL_MODES)}")
+        if request.min_price is not None and request.max_price is not None and request.min_price > request.max_price:
+            raise ValueError("min_price must not exceed max_price")
+    
+    @staticmethod
+    def mmr_lambda(request: ChatRequest) -> Optional[float]:
+        """MMR trade-off for the request, or ``None`` when reranking is off."""
+        return request.mmr_lambda if request.mmr else None
+    
+    def build_product_filter(self, request: ChatRequest) -> ProductFilter:
+        """Combine explicit request constraints with ones parsed from the message."""
+        product_filter = ProductFilter(
+            min_price=request.min_price,
+            max_price=request.max_price,
+            in_stock_only=bool(request.in_stock_only),
+            categories=list(request.categories or []),
+            brands=[request.brand] if request.brand else []
+        )
+        if request.parse_filters:
+            brands, categories = lexical_index.facets()
+            merged = product_filter.merged_with(parse_message_filters(request.message, brands, categories))
+            if merged != product_filter:
+                merged.fallback = product_filter
+            product_filter = merged
+        if not product_filter.is_empty():
+            self.logger.info("Retrieval filter: %s", product_filter.to_where())
+        return product_filter
     
     def process_chat_request(self, request: ChatRequest, user_id: str, history: List[Dict[str, str]] = None) -> str:
         """Process a chat request and return the response."""
@@ -35,6 +67,7 @@ class ChatService(ChatServiceInterface, HistoryConverterInterface, RequestValida
             
             # Use provided history or empty list
             chat_history = history or []
+            product_filter = self.build_product_filter(request)
             
             # Get response from RAG service
             response = ask_rag(
@@ -44,7 +77,11 @@ class ChatService(ChatServiceInterface, HistoryConverterInterface, RequestValida
                 k=request.k,
                 business_type=request.business_type,
                 use_scores=request.use_scores,
-                max_score=request.max_score
+                max_score=request.max_score,
+                retrieval_mode=request.retrieval_mode,
+                product_filter=product_filter,
+                mmr_lambda=self.mmr_lambda(request),
+                mmr_fetch_k=request.mmr_fetch_k or 0
             )
             
             self.logger.info("Chat response generated successfully for user %s", user_id)
@@ -57,47 +94,96 @@ class ChatService(ChatServiceInterface, HistoryConverterInterface, RequestValida
             self.logger.error("Error processing chat request for user %s: %s", user_id, str(e))
             raise
     
-    def health_check(self) -> Dict[str, Any]:
-        health_status = {
-            "rag_service": "unknown",
-            "vector_database": "unknown", 
-            "llm_service": "unknown",
-            "overall": "unknown"
-        }
-        
+    async def aprocess_chat_request(self, request: ChatRequest, user_id: str, history: List[Dict[str, str]] = None) -> str:
+        """Process a chat request without blocking the event loop."""
         try:
-            test_request = ChatRequest(
-                message="test",
-                k=1,
-                business_type="e-commerce",
-                use_scores=False
+            self.logger.info("Processing async chat request for user %s", user_id)
+            
+            self.validate_request(request)
+            product_filter = await run_in_threadpool(self.build_product_filter, request)
+            
+            response = await aask_rag(
+                user_id=user_id,
+                message=request.message,
+                history=history or [],
+                k=request.k,
+                business_type=request.business_type,
+                use_scores=request.use_scores,
+                max_score=request.max_score,
+                retrieval_mode=request.retrieval_mode,
+                product_filter=product_filter,
+                mmr_lambda=self.mmr_lambda(request),
+                mmr_fetch_k=request.mmr_fetch_k or 0
             )
             
-            response = self.process_chat_request(test_request, "health_check", [])
+            self.logger.info("Async chat response generated successfully for user %s", user_id)
+            return response
             
-            if response and len(response) > 0:
-                health_status.update({
-                    "rag_service": "healthy",
-                    "vector_database": "healthy",
-                    "llm_service": "healthy", 
-                    "overall": "healthy"
-                })
-            else:
-                health_status.update({
-                    "rag_service": "unhealthy",
-                    "vector_database": "unhealthy",
-                    "llm_service": "unhealthy",
-                    "overall": "unhealthy"
-                })
-                
+        except ValueError as e:
+            self.logger.error("Validation error for user %s: %s", user_id, str(e))
+            raise
+        except Exception as e:
+            self.logger.error("Error processing async chat request for user %s: %s", user_id, str(e))
+            raise
+    
+    def astream_chat_request(self, request: ChatRequest, user_id: str, history: List[Dict[str, str]] = None) -> AsyncIterator[str]:
+        """Validate the request and return an async iterator over response tokens."""
+        self.validate_request(request)
+        self.logger.info("Streaming chat request for user %s", user_id)
+        engine = engine_registry.get_engine(
+            k=request.k,
+            use_scores=request.use_scores,
+            max_score=request.max_score,
+            business_type=request.business_type,
+            retrieval_mode=request.retrieval_mode,
+            mmr_lambda=self.mmr_lambda(request),
+            mmr_fetch_k=request.mmr_fetch_k or 0
+        )
+        return self._astream_with_filter(engine, request, user_id, history or [])
+    
+    async def _astream_with_filter(self, engine, request: ChatRequest, user_id: str, history: List[Dict[str, str]]) -> AsyncIterator[str]:
+        # The filter may need the catalog facets, so it is built off the event loop.
+        product_filter = await run_in_threadpool(self.build_product_filter, request)
+        token_stream = engine.astream(user_id, request.message, history, product_filter)
+        try:
+            async for token in token_stream:
+                yield token
+        finally:
+            await token_stream.aclose()
+    
+    @staticmethod
+    def _health_test_request() -> ChatRequest:
+        return ChatRequest(
+            message="test",
+            k=1,
+            business_type="e-commerce",
+            use_scores=False
+        )
+    
+    @staticmethod
+    def _health_status(state: str, error: str = None) -> Dict[str, Any]:
+        health_status = {
+            "rag_service": state,
+            "vector_database": state, 
+            "llm_service": state,
+            "overall": state
+        }
+        if error is not None:
+            health_status["error"] = error
+        return health_status
+    
+    def health_check(self) -> Dict[str, Any]:
+        try:
+            response = self.process_chat_request(self._health_test_request(), "health_check", [])
+            return self._health_status("healthy" if response else "unhealthy")
+        except Exception as e:
+            self.logger.error("Health check failed: %s", str(e))
+            return self._health_status("failed", str(e))
+    
+    async def ahealth_check(self) -> Dict[str, Any]:
+        try:
+            response = await self.aprocess_chat_request(self._health_test_request(), "health_check", [])
+            return self._health_status("healthy" if response else "unhealthy")
         except Exception as e:
             self.logger.error("Health check failed: %s", str(e))
-            health_status.update({
-                "rag_service": "failed",
-                "vector_database": "failed", 
-                "llm_service": "failed",
-                "overall": "failed",
-                "error": str(e)
-            })
-        
-        return health_status 
\ No newline at end of file
+            return self._health_status("failed", str(e))
@@ -0,0 +1,348 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.config.app_config import app_settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[int, str]
+# ``(id, role, content)``; ``id`` is ``None`` while a write-behind message is queued.
+CachedMessage = Tuple[Optional[int], str, str]
+# ``(text, last_message_id)`` of the session summary.
+CachedSummary = Optional[Tuple[str, int]]
+
+HISTORY_CACHE_BACKENDS = ("memory", "redis", "none")
+# Rough per-message bookkeeping cost on top of the content itself.
+MESSAGE_OVERHEAD_BYTES = 96
+# Returned by ``ChatHistoryCache.version`` when the backend could not be read.
+_UNKNOWN_VERSION = object()
+
+
+class MemoryHistoryBackend:
+    """Per-process store: one ring buffer per session, LRU over sessions.
+
+    Sessions are evicted least recently used first once there are more than
+    ``max_sessions`` of them or their messages exceed ``max_bytes``. Every
+    write to a session bumps its version, and ``fill`` is skipped when the
+    version moved while the caller was reading the database.
+
+    Clears made by other workers never reach this store, so each entry
+    keeps the user's clear watermark it was filled under and ``get`` drops
+    it when the caller passes a different one.
+    """
+
+    shared = False
+
+    def __init__(self, capacity: int, max_sessions: int, max_bytes: int, ttl_seconds: float = 0):
+        self.capacity = capacity
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[SessionKey, Dict[str, Any]]" = OrderedDict()
+        self._versions: "OrderedDict[Any, int]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @staticmethod
+    def _size(messages) -> int:
+        return sum(len(content) + MESSAGE_OVERHEAD_BYTES for _, _, content in messages)
+
+    def _drop(self, key: SessionKey) -> None:
+        entry = self._sessions.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry["bytes"]
+
+    def version(self, key: SessionKey) -> Tuple[int, int]:
+        with self._lock:
+            return self._versions.get(key[0], 0), self._versions.get(key, 0)
+
+    def _bump(self, key: Any) -> None:
+        self._versions[key] = self._versions.get(key, 0) + 1
+        self._versions.move_to_end(key)
+        while len(self._versions) > self.max_sessions:
+            self._versions.popitem(last=False)
+
+    def get(self, key: SessionKey, watermark: Optional[int] = None) -> Optional[Tuple[CachedSummary, List[CachedMessage]]]:
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return None
+            expired = entry["expires_at"] is not None and entry["expires_at"] < time.monotonic()
+            if expired or (watermark is not None and entry["watermark"] != watermark):
+                self._drop(key)
+                return None
+            self._sessions.move_to_end(key)
+            return entry["summary"], list(entry["messages"])
+
+    def fill(self, key: SessionKey, summary: CachedSummary, messages: List[CachedMessage], version: int, watermark: Optional[int] = None) -> None:
+        buffer: Deque[CachedMessage] = deque(messages[-self.capacity:], maxlen=self.capacity)
+        with self._lock:
+            if (self._versions.get(key[0], 0), self._versions.get(key, 0)) != version:
+                return
+            self._drop(key)
+            self._sessions[key] = {
+                "summary": summary,
+                "messages": buffer,
+                "bytes": self._size(buffer),
+                "watermark": watermark,
+                "expires_at": time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+            }
+            self._bytes += self._sessions[key]["bytes"]
+            self._evict()
+
+    def append(self, key: SessionKey, messages: List[CachedMessage]) -> None:
+        with self._lock:
+            self._bump(key)
+            entry = self._sessions.get(key)
+            if entry is None:
+                return
+            buffer = entry["messages"]
+            for message in messages:
+                buffer.append(message)
+            self._bytes -= entry["bytes"]
+            entry["bytes"] = self._size(buffer)
+            self._bytes += entry["bytes"]
+            self._sessions.move_to_end(key)
+            self._evict()
+
+    def delete(self, key: SessionKey) -> None:
+        with self._lock:
+            self._bump(key)
+            self._drop(key)
+
+    def delete_user(self, user_id: int) -> None:
+        with self._lock:
+            # The user-level version also voids loads of sessions not cached yet.
+            self._bump(user_id)
+            for key in [key for key in self._sessions if key[0] == user_id]:
+                self._drop(key)
+
+    def _evict(self) -> None:
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            key, entry = self._sessions.popitem(last=False)
+            self._bytes -= entry["bytes"]
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions
+        }
+
+
+class RedisHistoryBackend:
+    """Store shared by all workers on any Redis-protocol server.
+
+    Each session keeps a capped list of messages plus a ``meta`` key holding
+    its summary; the ``meta`` key marks the session as loaded, so a list
+    without one is never served. Writes bump a per-session ``version`` key
+    and ``fill`` runs under ``WATCH`` on it, so a load that raced with a
+    write from any worker is discarded. Keys expire after ``ttl_seconds``.
+    Clears reach every worker, so the ``watermark`` arguments are ignored.
+    """
+
+    shared = True
+
+    def __init__(self, client, capacity: int, ttl_seconds: float = 0, prefix: str = "chat:history:"):
+        self.client = client
+        self.capacity = capacity
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+
+    def _keys(self, key: SessionKey) -> Tuple[str, str, str, str]:
+        user_id, session_id = key
+        base = f"{self.prefix}{user_id}:{session_id}"
+        return f"{base}:meta", f"{base}:messages", f"{self.prefix}{user_id}:sessions", f"{base}:version"
+
+    def _user_version_key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}:version"
+
+    def version(self, key: SessionKey) -> List[Optional[bytes]]:
+        return self.client.mget(self._user_version_key(key[0]), self._keys(key)[3])
+
+    def get(self, key: SessionKey, watermark: Optional[int] = None) -> Optional[Tuple[CachedSummary, List[CachedMessage]]]:
+        meta_key, messages_key, _, _ = self._keys(key)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(meta_key)
+        pipe.lrange(messages_key, 0, -1)
+        meta, raw_messages = pipe.execute()
+        if meta is None:
+            return None
+        summary = json.loads(meta)
+        return (tuple(summary) if summary else None), [tuple(json.loads(raw)) for raw in raw_messages]
+
+    def fill(self, key: SessionKey, summary: CachedSummary, messages: List[CachedMessage], version: List[Optional[bytes]], watermark: Optional[int] = None) -> None:
+        from redis.exceptions import WatchError
+
+        meta_key, messages_key, sessions_key, version_key = self._keys(key)
+        user_version_key = self._user_version_key(key[0])
+        with self.client.pipeline(transaction=True) as pipe:
+            try:
+                pipe.watch(user_version_key, version_key)
+                if pipe.mget(user_version_key, version_key) != version:
+                    return
+                pipe.multi()
+                pipe.delete(messages_key)
+                if messages:
+                    pipe.rpush(messages_key, *[json.dumps(message) for message in messages[-self.capacity:]])
+                pipe.set(meta_key, json.dumps(summary))
+                pipe.sadd(sessions_key, key[1])
+                self._expire(pipe, meta_key, messages_key, sessions_key)
+                pipe.execute()
+            except WatchError:
+                return
+
+    def append(self, key: SessionKey, messages: List[CachedMessage]) -> None:
+        meta_key, messages_key, sessions_key, version_key = self._keys(key)
+        self.client.incr(version_key)
+        if not self.client.exists(meta_key):
+            return
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(messages_key, *[json.dumps(message) for message in messages])
+        pipe.ltrim(messages_key, -self.capacity, -1)
+        self._expire(pipe, meta_key, messages_key, sessions_key, version_key)
+        pipe.execute()
+
+    def delete(self, key: SessionKey) -> None:
+        meta_key, messages_key, _, version_key = self._keys(key)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.incr(version_key)
+        pipe.delete(meta_key, messages_key)
+        self._expire(pipe, version_key)
+        pipe.execute()
+
+    def delete_user(self, user_id: int) -> None:
+        pipe = self.client.pipeline(transaction=True)
+        pipe.incr(self._user_version_key(user_id))
+        self._expire(pipe, self._user_version_key(user_id))
+        pipe.execute()
+        sessions_key = f"{self.prefix}{user_id}:sessions"
+        for session_id in self.client.smembers(sessions_key):
+            session_id = session_id.decode("utf-8") if isinstance(session_id, bytes) else session_id
+            self.delete((user_id, session_id))
+        self.client.delete(sessions_key)
+
+    def _expire(self, pipe, *keys: str) -> None:
+        if self.ttl_seconds > 0:
+            for key in keys:
+                pipe.expire(key, self.ttl_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "prefix": self.prefix}
+
+
+class ChatHistoryCache:
+    """Recent messages and summary of each chat session, kept next to the database.
+
+    ``ChatHistoryService`` fills an entry from the database on a miss,
+    appends each saved message to it and drops it whenever the summary or
+    the history changes in a way it cannot replay, so prompt history for an
+    active session is served without a query. Backend errors are logged and
+    treated as misses; the database stays the source of truth.
+    """
+
+    def __init__(self, backend=None, capacity: int = 20):
+        self.backend = backend
+        self.capacity = capacity
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @property
+    def needs_watermark(self) -> bool:
+        """Whether ``get`` and ``fill`` need the user's clear watermark to notice clears made by other workers."""
+        return self.backend is not None and not self.backend.shared
+
+    def version(self, user_id: int, session_id: str) -> Any:
+        """Opaque version to pass to ``fill``; read it before querying the database."""
+        if self.backend is None:
+            return _UNKNOWN_VERSION
+        try:
+            return self.backend.version((user_id, session_id))
+        except Exception as e:
+            logger.warning("Chat history cache read failed: %s", str(e))
+            return _UNKNOWN_VERSION
+
+    def get(self, user_id: int, session_id: str, watermark: Optional[int] = None) -> Optional[Tuple[CachedSummary, List[CachedMessage]]]:
+        """Cached session, unless it was filled under a clear watermark other than ``watermark``."""
+        if self.backend is None:
+            return None
+        try:
+            entry = self.backend.get((user_id, session_id), watermark)
+        except Exception as e:
+            logger.warning("Chat history cache read failed: %s", str(e))
+            entry = None
+        metrics.increment("chat_history_cache_hits" if entry is not None else "chat_history_cache_misses")
+        return entry
+
+    def fill(self, user_id: int, session_id: str, summary: CachedSummary, messages: List[CachedMessage], version: Any, watermark: Optional[int] = None) -> None:
+        """Cache what was read from the database, unless the session was written since ``version``."""
+        if version is _UNKNOWN_VERSION:
+            return
+        self._call("fill", (user_id, session_id), summary, messages, version, watermark)
+
+    def append(self, user_id: int, session_id: str, messages: List[CachedMessage]) -> None:
+        self._call("append", (user_id, session_id), messages)
+
+    def invalidate(self, user_id: int, session_id: str) -> None:
+        self._call("delete", (user_id, session_id))
+
+    def invalidate_user(self, user_id: int) -> None:
+        self._call("delete_user", user_id)
+
+    def _call(self, method: str, *args) -> None:
+        if self.backend is None:
+            return
+        try:
+            getattr(self.backend, method)(*args)
+        except Exception as e:
+            logger.warning("Chat history cache %s failed: %s", method, str(e))
+            if method in ("fill", "append"):
+                # A half-applied update must not be served later.
+                self._drop(args[0])
+
+    def _drop(self, key: SessionKey) -> None:
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            logger.error("Failed to drop chat history cache entry for session %s: %s", key[1], str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        if self.backend is None:
+            return {"enabled": False}
+        return {"enabled": True, "capacity": self.capacity, **self.backend.stats()}
+
+
+def _build_backend():
+    backend = app_settings.chat_history_cache_backend.lower()
+    if backend not in HISTORY_CACHE_BACKENDS:
+        raise ValueError(f"Unknown CHAT_HISTORY_CACHE_BACKEND '{backend}', expected one of: {', '.join(HISTORY_CACHE_BACKENDS)}")
+    if backend == "none":
+        return None
+    if backend == "redis":
+        import redis  # Optional dependency, only needed for the shared backend.
+        logger.info("Using Redis chat history cache at %s", app_settings.chat_history_cache_redis_url)
+        return RedisHistoryBackend(
+            redis.Redis.from_url(app_settings.chat_history_cache_redis_url, socket_timeout=1),
+            capacity=app_settings.chat_history_cache_messages,
+            ttl_seconds=app_settings.chat_history_cache_ttl_seconds
+        )
+    return MemoryHistoryBackend(
+        capacity=app_settings.chat_history_cache_messages,
+        max_sessions=app_settings.chat_history_cache_max_sessions,
+        max_bytes=app_settings.chat_history_cache_max_mb * 2 ** 20,
+        ttl_seconds=app_settings.chat_history_cache_ttl_seconds
+    )
+
+
+history_cache = ChatHistoryCache(_build_backend(), capacity=app_settings.chat_history_cache_messages)
@@ -0,0 +1,335 @@
+import argparse
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import delete, exists, insert, select
+
+from app.config.app_config import app_settings
+from app.core.metrics import metrics
+from app.models.chat_message import ChatMessage
+from app.models.chat_message_archive import ChatMessageArchive
+from app.models.chat_message_count import ChatMessageCount
+from app.services.chat.history_cache import history_cache
+from app.services.chat.message_counter import increment_message_count, not_cleared
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_ARCHIVED_COLUMNS = ("id", "user_id", "message_type", "content", "session_id", "created_at")
+
+
+def _cutoff(days: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def _pause(seconds: float) -> None:
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def delete_cleared_messages(
+    session_factory: Callable,
+    user_id: int,
+    through_id: int,
+    batch_size: int = 1000,
+    pause_seconds: float = 0.0
+) -> int:
+    """Delete a user's messages up to ``through_id``, one batch per transaction; return how many."""
+    deleted = 0
+    db = session_factory()
+    try:
+        while True:
+            ids = db.scalars(
+                select(ChatMessage.id)
+                .where(ChatMessage.user_id == user_id, ChatMessage.id <= through_id)
+                .limit(batch_size)
+            ).all()
+            if not ids:
+                break
+            db.execute(delete(ChatMessage).where(ChatMessage.id.in_(ids)))
+            db.commit()
+            deleted += len(ids)
+            if len(ids) < batch_size:
+                break
+            _pause(pause_seconds)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return deleted
+
+
+def purge_cleared_messages(session_factory: Callable = SessionLocal, batch_size: int = 1000, pause_seconds: float = 0.0) -> int:
+    """Finish deleting cleared histories whose background deletion was interrupted."""
+    db = session_factory()
+    try:
+        pending = db.execute(
+            select(ChatMessageCount.user_id, ChatMessageCount.cleared_through_id).where(
+                ChatMessageCount.cleared_through_id > 0,
+                exists().where(
+                    ChatMessage.user_id == ChatMessageCount.user_id,
+                    ChatMessage.id <= ChatMessageCount.cleared_through_id
+                )
+            )
+        ).all()
+    finally:
+        db.close()
+    return sum(
+        delete_cleared_messages(session_factory, user_id, through_id, batch_size, pause_seconds)
+        for user_id, through_id in pending
+    )
+
+
+def archive_expired_messages(
+    session_factory: Callable = SessionLocal,
+    retention_days: int = 30,
+    batch_size: int = 1000,
+    pause_seconds: float = 0.0
+) -> int:
+    """Move messages older than ``retention_days`` to the archive, one batch per transaction.
+
+    Each batch copies the rows, deletes them from ``chat_messages`` and
+    lowers the owners' counters together. Messages hidden by a clear are left
+    for ``purge_cleared_messages`` so cleared history never reaches the
+    archive. Rows locked by another worker's pass are skipped.
+    """
+    cutoff = _cutoff(retention_days)
+    archived = 0
+    db = session_factory()
+    try:
+        while True:
+            rows = db.execute(
+                select(ChatMessage.id, ChatMessage.user_id)
+                .where(ChatMessage.created_at < cutoff, not_cleared(ChatMessage.user_id))
+                .order_by(ChatMessage.created_at)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not rows:
+                break
+            ids = [row.id for row in rows]
+            db.execute(
+                insert(ChatMessageArchive).from_select(
+                    list(_ARCHIVED_COLUMNS),
+                    select(*(getattr(ChatMessage, column) for column in _ARCHIVED_COLUMNS)).where(ChatMessage.id.in_(ids))
+                )
+            )
+            db.execute(delete(ChatMessage).where(ChatMessage.id.in_(ids)))
+            users = defaultdict(list)
+            for row in rows:
+                users[row.user_id].append(row.id)
+            for user_id, moved in users.items():
+                increment_message_count(db, user_id, moved, removed=True)
+            db.commit()
+            for user_id in users:
+                history_cache.invalidate_user(user_id)
+            archived += len(ids)
+            if len(ids) < batch_size:
+                break
+            _pause(pause_seconds)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return archived
+
+
+def purge_archive(
+    session_factory: Callable = SessionLocal,
+    retention_days: int = 365,
+    batch_size: int = 1000,
+    pause_seconds: float = 0.0
+) -> int:
+    """Delete archived messages older than ``retention_days``, one batch per transaction."""
+    cutoff = _cutoff(retention_days)
+    purged = 0
+    db = session_factory()
+    try:
+        while True:
+            ids = db.scalars(
+                select(ChatMessageArchive.id).where(ChatMessageArchive.created_at < cutoff).limit(batch_size)
+            ).all()
+            if not ids:
+                break
+            db.execute(delete(ChatMessageArchive).where(ChatMessageArchive.id.in_(ids)))
+            db.commit()
+            purged += len(ids)
+            if len(ids) < batch_size:
+                break
+            _pause(pause_seconds)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return purged
+
+
+def run_retention(
+    session_factory: Callable = SessionLocal,
+    retention_days: int = 0,
+    archive_retention_days: int = 0,
+    batch_size: int = 1000,
+    pause_seconds: float = 0.0
+) -> Dict[str, int]:
+    """One retention pass: finish interrupted clears, archive expired messages, purge the archive."""
+    result = {
+        "cleared": purge_cleared_messages(session_factory, batch_size, pause_seconds),
+        "archived": archive_expired_messages(session_factory, retention_days, batch_size, pause_seconds) if retention_days > 0 else 0,
+        "purged": purge_archive(session_factory, archive_retention_days, batch_size, pause_seconds) if archive_retention_days > 0 else 0
+    }
+    metrics.increment("chat_history_messages_archived", result["archived"])
+    metrics.increment("chat_history_archive_purged", result["purged"])
+    logger.info(
+        "Chat history retention: deleted %d cleared, archived %d, purged %d from archive",
+        result["cleared"], result["archived"], result["purged"]
+    )
+    return result
+
+
+class ChatHistoryMaintenance:
+    """Background thread that deletes cleared histories and runs periodic retention passes.
+
+    ``schedule_delete`` returns at once; the rows are deleted in batches of
+    ``batch_size`` with ``pause_seconds`` between transactions, so clearing a
+    long history never holds locks on a large range of ``chat_messages``.
+    Every ``interval_seconds`` the thread also runs ``run_retention``.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        retention_days: int = 0,
+        archive_retention_days: int = 0,
+        interval_seconds: float = 3600,
+        batch_size: int = 1000,
+        pause_seconds: float = 0.01
+    ):
+        self.session_factory = session_factory
+        self.retention_days = retention_days
+        self.archive_retention_days = archive_retention_days
+        self.interval_seconds = interval_seconds
+        self.batch_size = max(batch_size, 1)
+        self.pause_seconds = pause_seconds
+        self._queue: "queue.Queue" = queue.Queue()
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._deleted = 0
+        self._archived = 0
+
+    def schedule_delete(self, user_id: int, through_id: int) -> None:
+        """Queue deletion of a user's messages up to ``through_id``."""
+        self.start()
+        with self._idle:
+            self._pending += 1
+        self._queue.put((user_id, through_id))
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every scheduled deletion has run; return ``False`` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chat-history-maintenance", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop the thread after the scheduled deletions; unfinished ones resume on the next pass."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("Chat history maintenance did not finish in time; %d deletions left for the next pass", self._pending)
+            return
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": self._pending, "deleted": self._deleted, "archived": self._archived}
+
+    def _run(self) -> None:
+        next_pass = time.monotonic() + self.interval_seconds if self.interval_seconds > 0 else None
+        while True:
+            timeout = None if next_pass is None else max(next_pass - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._retention_pass()
+                next_pass = time.monotonic() + self.interval_seconds
+                continue
+            if item is _STOP:
+                return
+            self._delete(*item)
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+
+    def _delete(self, user_id: int, through_id: int) -> None:
+        try:
+            deleted = delete_cleared_messages(self.session_factory, user_id, through_id, self.batch_size, self.pause_seconds)
+        except Exception as e:
+            metrics.increment("chat_history_maintenance_errors")
+            logger.error("Failed to delete cleared history of user %s: %s", user_id, str(e))
+            return
+        self._deleted += deleted
+        metrics.increment("chat_history_messages_deleted", deleted)
+
+    def _retention_pass(self) -> None:
+        try:
+            result = run_retention(
+                self.session_factory, self.retention_days, self.archive_retention_days, self.batch_size, self.pause_seconds
+            )
+        except Exception as e:
+            metrics.increment("chat_history_maintenance_errors")
+            logger.error("Chat history retention pass failed: %s", str(e))
+            return
+        self._deleted += result["cleared"]
+        self._archived += result["archived"]
+
+
+history_maintenance = ChatHistoryMaintenance(
+    retention_days=app_settings.chat_history_retention_days,
+    archive_retention_days=app_settings.chat_history_archive_retention_days,
+    interval_seconds=app_settings.chat_history_retention_interval_seconds,
+    batch_size=app_settings.chat_history_delete_batch_size,
+    pause_seconds=app_settings.chat_history_delete_pause_ms / 1000
+)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Archive expired chat messages and finish deleting cleared histories.")
+    parser.add_argument("--retention-days", type=int, default=app_settings.chat_history_retention_days,
+                        help="Archive messages older than this; 0 skips archiving")
+    parser.add_argument("--archive-retention-days", type=int, default=app_settings.chat_history_archive_retention_days,
+                        help="Delete archived messages older than this; 0 keeps them")
+    parser.add_argument("--batch-size", type=int, default=app_settings.chat_history_delete_batch_size,
+                        help="Rows per transaction")
+    args = parser.parse_args()
+    run_retention(
+        retention_days=args.retention_days,
+        archive_retention_days=args.archive_retention_days,
+        batch_size=args.batch_size,
+        pause_seconds=app_settings.chat_history_delete_pause_ms / 1000
+    )
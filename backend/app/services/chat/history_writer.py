@@ -0,0 +1,192 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.config.app_config import app_settings
+from app.core.metrics import metrics
+from app.models.chat_message import ChatMessage
+from app.services.chat.message_counter import increment_message_count
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+MAX_RETRY_BACKOFF_SECONDS = 5.0
+
+
+def message_row(user_id: int, message_type: str, content: str, session_id: str) -> Dict[str, Any]:
+    """Column values for one ``chat_messages`` row, timestamped when the message was produced."""
+    return {
+        "user_id": user_id,
+        "message_type": message_type,
+        "content": content,
+        "session_id": session_id,
+        "created_at": datetime.now(timezone.utc)
+    }
+
+
+class ChatHistoryWriter:
+    """Write-behind buffer that persists chat messages in batched INSERTs.
+
+    ``enqueue`` hands the rows of a turn to a single writer thread, which
+    collects them for up to ``flush_interval_seconds`` (or ``batch_size``
+    rows) and writes the batch with one multi-row INSERT in one transaction.
+    Rows are written strictly in enqueue order, so messages of a session
+    keep their order. A failed batch is retried with backoff; if it keeps
+    failing, its rows are written one by one and only rows that still fail
+    are dropped. When ``max_pending`` turns are queued, ``enqueue`` blocks,
+    which pushes back on callers instead of reordering writes.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        enabled: bool = False,
+        batch_size: int = 500,
+        flush_interval_seconds: float = 0.05,
+        max_pending: int = 10000,
+        max_retries: int = 3,
+        retry_backoff_seconds: float = 0.5
+    ):
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(max_pending, 1))
+        self._idle = threading.Condition()
+        self._pending_rows = 0
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._written = 0
+        self._dropped = 0
+
+    def enqueue(self, rows: List[Dict[str, Any]]) -> None:
+        """Queue rows for writing; the rows of one call are never split across transactions."""
+        if not rows:
+            return
+        self._ensure_started()
+        with self._idle:
+            self._pending_rows += len(rows)
+        self._queue.put(list(rows))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every row queued so far has been handled; return ``False`` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending_rows:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write what is queued and stop the writer thread, e.g. on shutdown."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error("Chat history writer did not finish in time; %d messages not written", self._pending_rows)
+            return
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pending": self._pending_rows,
+            "written": self._written,
+            "dropped": self._dropped
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = list(item)
+            deadline = time.monotonic() + self.flush_interval_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.extend(item)
+            self._write(batch)
+            with self._idle:
+                self._pending_rows -= len(batch)
+                self._idle.notify_all()
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                self._insert(rows)
+            except Exception as e:
+                logger.warning(
+                    "Failed to write %d chat messages (attempt %d/%d): %s",
+                    len(rows), attempt + 1, self.max_retries + 1, str(e)
+                )
+                if attempt < self.max_retries:
+                    time.sleep(min(self.retry_backoff_seconds * 2 ** attempt, MAX_RETRY_BACKOFF_SECONDS))
+                continue
+            self._written += len(rows)
+            metrics.observe("chat_history_batch_rows", len(rows))
+            metrics.observe("chat_history_batch_write_seconds", time.perf_counter() - start)
+            return
+
+        # Isolate the rows that cannot be written so the rest of the batch survives.
+        for row in rows:
+            try:
+                self._insert([row])
+                self._written += 1
+            except Exception as e:
+                self._dropped += 1
+                metrics.increment("chat_history_messages_dropped")
+                logger.error("Dropping chat message for session %s: %s", row.get("session_id"), str(e))
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        db = self.session_factory()
+        try:
+            inserted = db.execute(insert(ChatMessage).returning(ChatMessage.id, ChatMessage.user_id), rows)
+            ids_by_user = defaultdict(list)
+            for message_id, user_id in inserted:
+                ids_by_user[user_id].append(message_id)
+            for user_id, message_ids in ids_by_user.items():
+                increment_message_count(db, user_id, message_ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+history_writer = ChatHistoryWriter(
+    enabled=app_settings.chat_history_write_behind,
+    batch_size=app_settings.chat_history_write_batch_size,
+    flush_interval_seconds=app_settings.chat_history_write_interval_ms / 1000,
+    max_pending=app_settings.chat_history_write_max_pending,
+    max_retries=app_settings.chat_history_write_max_retries
+)
@@ -0,0 +1,177 @@
+import argparse
+import logging
+from typing import Callable, Dict, Sequence
+
+from sqlalchemy import BigInteger, Integer, case, func, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.models.chat_message import ChatMessage
+from app.models.chat_message_count import ChatMessageCount
+from app.models.user import User
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_INSERT_BY_DIALECT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _insert_counter_if_missing(db: Session, user_id: int, count) -> bool:
+    """Create the user's counter row with ``count`` (a number or SQL expression); return ``False`` if it already existed."""
+    insert = _INSERT_BY_DIALECT[db.get_bind().dialect.name]
+    if isinstance(count, int):
+        count = literal(count, BigInteger)
+    statement = insert(ChatMessageCount).from_select(
+        [ChatMessageCount.user_id, ChatMessageCount.message_count],
+        select(literal(user_id, Integer), count)
+    ).on_conflict_do_nothing(index_elements=[ChatMessageCount.user_id])
+    return db.execute(statement).rowcount > 0
+
+
+def not_cleared(user_id):
+    """Filter for messages not hidden by clearing their owner's history.
+
+    ``user_id`` is an id, or ``ChatMessage.user_id`` to check each row's own owner.
+    """
+    cleared = select(ChatMessageCount.cleared_through_id).where(ChatMessageCount.user_id == user_id).scalar_subquery()
+    return ChatMessage.id > func.coalesce(cleared, 0)
+
+
+def _count_stored(user_id: int):
+    return select(func.count(ChatMessage.id)).where(ChatMessage.user_id == user_id, not_cleared(user_id)).scalar_subquery()
+
+
+def _add(db: Session, user_id: int, delta: int) -> int:
+    return db.execute(
+        update(ChatMessageCount)
+        .where(ChatMessageCount.user_id == user_id)
+        .values(message_count=ChatMessageCount.message_count + delta)
+    ).rowcount
+
+
+def _lock_cleared_through(db: Session, user_id: int):
+    return db.scalar(
+        select(ChatMessageCount.cleared_through_id).where(ChatMessageCount.user_id == user_id).with_for_update()
+    )
+
+
+def increment_message_count(db: Session, user_id: int, message_ids: Sequence[int], removed: bool = False) -> None:
+    """Account for a user's messages inserted, or with ``removed`` deleted, in this transaction.
+
+    Only ids above the user's clear watermark change the counter. A clear
+    hides every id up to the newest committed one, which can include ids
+    this transaction took from the sequence before the clear committed; the
+    counter row is locked before reading the watermark, so those rows are
+    either zeroed by the clear or skipped here.
+
+    The first write for a user without a counter row creates it from a
+    ``COUNT`` that already reflects this transaction's rows. If another
+    transaction created the row first, its count could not see our rows yet,
+    so they are applied on top.
+    """
+    through_id = _lock_cleared_through(db, user_id)
+    if through_id is None:
+        if _insert_counter_if_missing(db, user_id, _count_stored(user_id)):
+            return
+        through_id = _lock_cleared_through(db, user_id)
+    changed = sum(1 for message_id in message_ids if message_id > through_id)
+    if changed:
+        _add(db, user_id, -changed if removed else changed)
+
+
+def mark_cleared(db: Session, user_id: int) -> int:
+    """Hide all of a user's current messages and zero their counter; return the id they are hidden through.
+
+    Message ids come from one sequence, so everything up to the newest id in
+    the table is covered without scanning the user's rows. Rows with lower
+    ids that commit afterwards stay hidden and are not counted; see
+    ``increment_message_count``.
+    """
+    through_id = db.scalar(select(func.coalesce(func.max(ChatMessage.id), 0))) or 0
+    _insert_counter_if_missing(db, user_id, 0)
+    db.execute(
+        update(ChatMessageCount)
+        .where(ChatMessageCount.user_id == user_id)
+        .values(
+            message_count=0,
+            cleared_through_id=case(
+                (ChatMessageCount.cleared_through_id > through_id, ChatMessageCount.cleared_through_id),
+                else_=through_id
+            )
+        )
+    )
+    return through_id
+
+
+def get_cleared_through_id(db: Session, user_id: int) -> int:
+    """Read the id a user's messages are hidden through; 0 if their history was never cleared."""
+    return db.scalar(select(ChatMessageCount.cleared_through_id).where(ChatMessageCount.user_id == user_id)) or 0
+
+
+def get_message_count(db: Session, user_id: int) -> int:
+    """Read a user's message count, creating the counter from a full count the first time."""
+    count = db.scalar(select(ChatMessageCount.message_count).where(ChatMessageCount.user_id == user_id))
+    if count is not None:
+        return int(count)
+    try:
+        _insert_counter_if_missing(db, user_id, _count_stored(user_id))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return int(db.scalar(select(ChatMessageCount.message_count).where(ChatMessageCount.user_id == user_id)) or 0)
+
+
+def reconcile_user(db: Session, user_id: int) -> bool:
+    """Recount one user's messages and repair the counter; return whether it had drifted.
+
+    The counter row is locked before counting, so inserts that commit while
+    the recount runs are either included in the count or add themselves to
+    the repaired value afterwards.
+    """
+    try:
+        _insert_counter_if_missing(db, user_id, 0)
+        stored = db.scalar(
+            select(ChatMessageCount.message_count).where(ChatMessageCount.user_id == user_id).with_for_update()
+        )
+        actual = db.scalar(select(func.count(ChatMessage.id)).where(ChatMessage.user_id == user_id, not_cleared(user_id))) or 0
+        if stored != actual:
+            db.execute(update(ChatMessageCount).where(ChatMessageCount.user_id == user_id).values(message_count=actual))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if stored != actual:
+        logger.warning("Repaired message count of user %s: %s -> %s", user_id, stored, actual)
+        return True
+    return False
+
+
+def reconcile_message_counts(session_factory: Callable = SessionLocal, batch_size: int = 500) -> Dict[str, int]:
+    """Recount every user's messages, one short transaction per user."""
+    checked = repaired = 0
+    last_id = 0
+    db = session_factory()
+    try:
+        while True:
+            user_ids = db.scalars(select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)).all()
+            if not user_ids:
+                break
+            for user_id in user_ids:
+                repaired += reconcile_user(db, user_id)
+                checked += 1
+            last_id = user_ids[-1]
+    finally:
+        db.close()
+    metrics.increment("chat_message_counts_repaired", repaired)
+    logger.info("Reconciled message counts of %d users, repaired %d", checked, repaired)
+    return {"checked": checked, "repaired": repaired}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Recount chat messages per user and repair drifted counters.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Users read per query")
+    args = parser.parse_args()
+    reconcile_message_counts(batch_size=args.batch_size)
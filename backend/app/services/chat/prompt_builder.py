@@ -1,8 +1,15 @@
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from app.config.app_config import app_settings
+from app.core.metrics import metrics
+from app.llm.tokenizer import MESSAGE_OVERHEAD_TOKENS, estimate_message_tokens, estimate_tokens, truncate_to_tokens
 
 logger = logging.getLogger(__name__)
 
+CONTEXT_HEADER = "Relevant context:"
+# Below this many tokens a truncated message or document is not worth sending.
+MIN_TRUNCATED_TOKENS = 32
+
 
 def get_system_prompt(business_type: str = "e-commerce") -> str:
     """Get the system prompt based on business type."""
@@ -16,11 +23,66 @@ def get_system_prompt(business_type: str = "e-commerce") -> str:
     )
 
 
+def format_document(doc: Any) -> str:
+    """One context line: stock, indexed text and price."""
+    metadata = doc.metadata
+    quantity = metadata.get('quantity', 'N/A')
+    price = metadata.get('price', 'N/A')
+    return f"- {quantity}x {doc.page_content} (Price: ${price})"
+
+
+def fit_context(lines: List[str], budget: int) -> List[str]:
+    """Keep the best-ranked context lines that fit ``budget`` tokens.
+
+    Lines are in retrieval order, so the lowest-scored documents are dropped
+    first. If not even the first line fits, it is truncated instead.
+    """
+    budget -= MESSAGE_OVERHEAD_TOKENS + estimate_tokens(CONTEXT_HEADER)
+    kept = []
+    for line in lines:
+        cost = estimate_tokens(line)
+        if cost > budget:
+            break
+        kept.append(line)
+        budget -= cost
+    if not kept and lines and budget >= MIN_TRUNCATED_TOKENS:
+        kept.append(truncate_to_tokens(lines[0], budget))
+    return kept
+
+
+def fit_history(history: List[Dict[str, str]], budget: int, max_message_tokens: int = 0) -> List[Dict[str, str]]:
+    """Keep the most recent turns that fit ``budget`` tokens.
+
+    System messages, such as the session summary, are always kept. Each
+    other message is first capped at ``max_message_tokens`` (0 disables the
+    cap). Older turns are dropped first; the oldest turn that only partly
+    fits is truncated when enough room is left to be useful.
+    """
+    pinned = [message for message in history if message.get("role") == "system"]
+    budget -= sum(MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content", "")) for message in pinned)
+    kept = []
+    for message in reversed([message for message in history if message.get("role") != "system"]):
+        content = message.get("content", "")
+        if max_message_tokens > 0:
+            content = truncate_to_tokens(content, max_message_tokens)
+        cost = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(content)
+        if cost > budget:
+            room = budget - MESSAGE_OVERHEAD_TOKENS
+            if room >= MIN_TRUNCATED_TOKENS:
+                kept.append({**message, "content": truncate_to_tokens(content, room)})
+            break
+        kept.append({**message, "content": content})
+        budget -= cost
+    kept.reverse()
+    return pinned + kept
+
+
 def build_chat_prompt(
     docs: List[Any],
     user_msg: str,
     history: List[Dict[str, str]] = None,
-    business_type: str = "e-commerce"
+    business_type: str = "e-commerce",
+    token_budget: Optional[int] = None
 ) -> List[Dict[str, str]]:
     """
     Build the list of messages to send to the LLM:
@@ -29,51 +91,61 @@ def build_chat_prompt(
       3. Context block with retrieved documents (text + metadata).
       4. Current user message.
 
+    The system prompt and user message are always sent. Retrieved context
+    gets up to ``PROMPT_CONTEXT_TOKEN_BUDGET`` tokens and history fills what
+    is left of the overall budget, newest turns first.
+
     Args:
-        docs: List of document objects, each with:
+        docs: List of document objects, best match first, each with:
           - page_content: str (indexed text: name+brand+features)
           - metadata: dict with keys 'price' and 'quantity'
         user_msg: Current user message
         history: List of dicts {'role':'user'|'assistant','content':str}
         business_type: Type of business (e.g., "e-commerce", "clothing store")
+        token_budget: Estimated prompt token limit; defaults to
+          ``PROMPT_TOKEN_BUDGET``, 0 disables trimming
     
     Returns:
         List of message dictionaries for the LLM
     """
     try:
-        messages = []
-        
-        system_prompt = get_system_prompt(business_type)
-        messages.append({"role": "system", "content": system_prompt})
-        
-        if history:
-            messages.extend(history)
-        
-        # 3) Add retrieved context
-        if docs:
-            context_lines = []
-            for doc in docs:
-                text = doc.page_content
-                metadata = doc.metadata
-                quantity = metadata.get('quantity', 'N/A')
-                price = metadata.get('price', 'N/A')
-                context_lines.append(
-                    f"- {quantity}x {text} (Price: ${price})"
+        history = history or []
+        budget = app_settings.prompt_token_budget if token_budget is None else token_budget
+
+        system_message = {"role": "system", "content": get_system_prompt(business_type)}
+        user_message = {"role": "user", "content": user_msg}
+        context_lines = [format_document(doc) for doc in docs]
+        turns = history
+
+        if budget > 0:
+            remaining = budget - estimate_message_tokens([system_message, user_message])
+            context_lines = fit_context(context_lines, min(remaining, app_settings.prompt_context_token_budget))
+            if context_lines:
+                remaining -= MESSAGE_OVERHEAD_TOKENS + estimate_tokens(CONTEXT_HEADER) + sum(
+                    estimate_tokens(line) for line in context_lines
                 )
-            context_block = "\n".join(context_lines)
+            turns = fit_history(history, remaining, app_settings.prompt_history_message_max_tokens)
+
+        messages = [system_message]
+        messages.extend(turns)
+        if context_lines:
             messages.append({
                 "role": "user",
-                "content": f"Relevant context:\n{context_block}"
+                "content": CONTEXT_HEADER + "\n" + "\n".join(context_lines)
             })
-        
-        messages.append({
-            "role": "user",
-            "content": user_msg
-        })
-        
-        logger.info("Built chat prompt with %d documents and %d history messages", len(docs), len(history) if history else 0)
+        messages.append(user_message)
+
+        prompt_tokens = estimate_message_tokens(messages)
+        metrics.observe("prompt_tokens", prompt_tokens)
+        metrics.increment("prompt_history_messages_dropped", len(history) - len(turns))
+        metrics.increment("prompt_documents_dropped", len(docs) - len(context_lines))
+
+        logger.info(
+            "Built chat prompt with %d/%d documents and %d/%d history messages (~%d tokens)",
+            len(context_lines), len(docs), len(turns), len(history), prompt_tokens
+        )
         return messages
         
     except Exception as e:
         logger.error("Error building chat prompt: %s", str(e))
-        raise 
\ No newline at end of file
+        raise
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config.app_config import app_settings
+from app.llm.client import agenerate_chat_completion
+from app.llm.tokenizer import truncate_to_tokens
+from app.services.chat.chat_history_service import ChatHistoryService
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[int, str]
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a customer and a store's sales assistant. "
+    "Update the summary with the new messages. Keep what the customer wants, their constraints (budget, brands, "
+    "use case), products that were recommended or rejected with their prices, and any open questions. "
+    "Drop greetings and small talk. Write plain prose of at most {max_words} words."
+)
+
+
+async def summarize_messages(summary: str, messages: List[Dict[str, str]], max_tokens: int) -> str:
+    """Ask the LLM to fold ``messages`` into ``summary``."""
+    transcript = "\n".join(
+        f"{message['role']}: {truncate_to_tokens(message['content'], max_tokens)}" for message in messages
+    )
+    prompt = [
+        {"role": "system", "content": SUMMARY_INSTRUCTIONS.format(max_words=max(max_tokens * 3 // 4, 20))},
+        {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"}
+    ]
+    return await agenerate_chat_completion(prompt)
+
+
+class SessionSummarizer:
+    """Folds older turns of a chat session into its rolling summary.
+
+    After each turn ``schedule`` starts a background task that summarizes
+    everything except the last ``keep_recent`` messages once at least
+    ``min_new_messages`` have accumulated, so the prompt carries a bounded
+    summary plus a short tail of raw turns. One task runs per session at a
+    time; turns finishing meanwhile trigger one more pass. Failures are
+    logged and retried on the next turn.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        summarize: Callable[[str, List[Dict[str, str]], int], Awaitable[str]] = summarize_messages,
+        keep_recent: int = 4,
+        min_new_messages: int = 4,
+        max_tokens: int = 300,
+        enabled: bool = True
+    ):
+        self.session_factory = session_factory
+        self.summarize = summarize
+        self.keep_recent = keep_recent
+        self.min_new_messages = min_new_messages
+        self.max_tokens = max_tokens
+        self.enabled = enabled
+        self._running: Set[SessionKey] = set()
+        self._pending: Set[SessionKey] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, user_id: int, session_id: str) -> None:
+        """Update the session summary in the background; must run on the event loop."""
+        if not self.enabled:
+            return
+        key = (user_id, session_id)
+        if key in self._running:
+            self._pending.add(key)
+            return
+        self._running.add(key)
+        task = asyncio.get_running_loop().create_task(self._run(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: SessionKey) -> None:
+        try:
+            while True:
+                self._pending.discard(key)
+                await self.update(*key)
+                if key not in self._pending:
+                    break
+        except Exception as e:
+            logger.error("Error updating summary for session %s: %s", key[1], str(e))
+        finally:
+            self._running.discard(key)
+
+    async def update(self, user_id: int, session_id: str) -> bool:
+        """Fold eligible messages into the summary; return whether it changed."""
+        summary, messages = await run_in_threadpool(self._load, user_id, session_id)
+        folded = messages[:len(messages) - self.keep_recent] if self.keep_recent > 0 else messages
+        if len(folded) < self.min_new_messages:
+            return False
+
+        text = await self.summarize(summary or "", [{"role": role, "content": content} for _, role, content in folded], self.max_tokens)
+        text = truncate_to_tokens((text or "").strip(), self.max_tokens)
+        if not text:
+            return False
+        await run_in_threadpool(self._store, user_id, session_id, text, folded[-1][0])
+        logger.info("Folded %d messages into the summary of session %s", len(folded), session_id)
+        return True
+
+    def _load(self, user_id: int, session_id: str) -> Tuple[Optional[str], List[Tuple[int, str, str]]]:
+        db = self.session_factory()
+        try:
+            history_service = ChatHistoryService(db)
+            row = history_service.get_summary(user_id, session_id)
+            after_id = row.last_message_id if row is not None else 0
+            messages = history_service.get_messages_after(user_id, session_id, after_id)
+            return (
+                row.summary if row is not None else None,
+                [(message.id, message.message_type, message.content) for message in messages]
+            )
+        finally:
+            db.close()
+
+    def _store(self, user_id: int, session_id: str, summary: str, last_message_id: int) -> None:
+        db = self.session_factory()
+        try:
+            ChatHistoryService(db).save_summary(user_id, session_id, summary, last_message_id)
+        finally:
+            db.close()
+
+    async def wait_idle(self) -> None:
+        """Wait for running summary updates, e.g. before shutdown or in tests."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+session_summarizer = SessionSummarizer(
+    keep_recent=app_settings.chat_summary_keep_recent_messages,
+    min_new_messages=app_settings.chat_summary_min_new_messages,
+    max_tokens=app_settings.chat_summary_max_tokens,
+    enabled=app_settings.chat_summary_enabled
+)
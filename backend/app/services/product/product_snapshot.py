@@ -0,0 +1,149 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.config.app_config import app_settings
+from app.core.cache import TTLCache
+from app.models.product import Product
+from app.rag.catalog_version import get_catalog_version
+from app.services.rag.answer_cache import document_id
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Cached for ids that no longer exist so they are not looked up again.
+_MISSING = {"price": None, "quantity": 0, "missing": True}
+_CHANGED_IDS = "changed_product_ids"
+
+
+def load_product_snapshots(product_ids: List[int]) -> Dict[str, Dict[str, Any]]:
+    """Fetch live price and stock for many products in a single query."""
+    db = SessionLocal()
+    try:
+        rows = db.query(Product.id, Product.price, Product.quantity).filter(Product.id.in_(product_ids)).all()
+        return {str(row.id): {"price": float(row.price), "quantity": int(row.quantity)} for row in rows}
+    finally:
+        db.close()
+
+
+class ProductSnapshotCache:
+    """Live price/stock per product id, bulk-loaded and versioned.
+
+    Misses for a batch of ids are fetched together. Each product write seen
+    by the ORM invalidates its entry and bumps ``version``; a load that raced
+    with an invalidation is not cached, so a stale row never outlives the
+    write that replaced it. Writes from other processes are picked up when
+    the entry's TTL expires or the catalog version changes.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[List[int]], Dict[str, Dict[str, Any]]] = load_product_snapshots,
+        max_entries: int = 50000,
+        ttl_seconds: float = 30
+    ):
+        self.loader = loader
+        self.cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.version = 0
+        self._catalog_version = None
+        self._lock = threading.Lock()
+
+    def _check_catalog_version(self) -> None:
+        catalog_version = get_catalog_version()
+        if self._catalog_version is not None and catalog_version != self._catalog_version:
+            self.invalidate()
+        self._catalog_version = catalog_version
+
+    def get_many(self, product_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return ``{id: {"price", "quantity"}}``; ids that cannot be loaded are left out."""
+        self._check_catalog_version()
+        snapshots, missing = {}, []
+        for product_id in dict.fromkeys(str(product_id) for product_id in product_ids):
+            snapshot = self.cache.get(product_id)
+            if snapshot is not None:
+                snapshots[product_id] = snapshot
+            elif product_id.isdigit():
+                missing.append(product_id)
+        if not missing:
+            return snapshots
+
+        version = self.version
+        try:
+            loaded = self.loader([int(product_id) for product_id in missing])
+        except Exception as e:
+            logger.warning("Live product lookup failed, using indexed metadata: %s", str(e))
+            return snapshots
+        with self._lock:
+            cacheable = version == self.version
+        for product_id in missing:
+            snapshot = loaded.get(product_id, _MISSING)
+            snapshots[product_id] = snapshot
+            if cacheable:
+                self.cache.set(product_id, snapshot)
+        return snapshots
+
+    def overlay(self, docs: List[Any]) -> List[Any]:
+        """Return copies of ``docs`` whose price/quantity metadata is live."""
+        if not docs:
+            return docs
+        snapshots = self.get_many(document_id(doc) for doc in docs)
+        result = []
+        for doc in docs:
+            snapshot = snapshots.get(document_id(doc))
+            if snapshot is None:
+                result.append(doc)
+                continue
+            metadata = {**(doc.metadata or {}), "quantity": snapshot["quantity"]}
+            if snapshot["price"] is not None:
+                metadata["price"] = snapshot["price"]
+            result.append(Document(id=getattr(doc, "id", None), page_content=doc.page_content, metadata=metadata))
+        return result
+
+    def invalidate(self, product_ids: Optional[Iterable[Any]] = None) -> None:
+        with self._lock:
+            self.version += 1
+        if product_ids is None:
+            self.cache.clear()
+            return
+        for product_id in product_ids:
+            self.cache.delete(str(product_id))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        stats["version"] = self.version
+        return stats
+
+
+product_snapshots = ProductSnapshotCache(
+    max_entries=app_settings.product_snapshot_cache_size,
+    ttl_seconds=app_settings.product_snapshot_ttl_seconds
+)
+
+
+@event.listens_for(Product, "after_insert")
+@event.listens_for(Product, "after_update")
+@event.listens_for(Product, "after_delete")
+def _mark_product_changed(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is None:
+        product_snapshots.invalidate([target.id])
+        return
+    session.info.setdefault(_CHANGED_IDS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_products(session) -> None:
+    # Invalidate only once the new row is visible, otherwise a concurrent
+    # lookup could re-cache the value being replaced.
+    changed = session.info.pop(_CHANGED_IDS, None)
+    if changed:
+        product_snapshots.invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_products(session) -> None:
+    session.info.pop(_CHANGED_IDS, None)
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.config.app_config import app_settings
+from app.rag.catalog_version import get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+
+def document_id(doc: Any) -> str:
+    """Stable identifier for a retrieved document."""
+    doc_id = getattr(doc, "id", None) or (doc.metadata or {}).get("id")
+    if doc_id:
+        return str(doc_id)
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def history_window_hash(history: List[Dict[str, str]], message: str) -> str:
+    """Hash the history window that will be sent with ``message``.
+
+    The router stores the user message before reading history, so a trailing
+    entry equal to the current message is dropped to keep near-identical first
+    questions in the same bucket.
+    """
+    window = list(history or [])
+    if window and window[-1].get("role") == "user" and window[-1].get("content") == message:
+        window = window[:-1]
+    payload = json.dumps(window, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_context_key(docs: List[Any], history: List[Dict[str, str]], message: str, business_type: str) -> str:
+    """Key of the exact-match part of a cache entry: docs, history and business type.
+
+    Each document contributes its id with the price and quantity it was shown
+    with, so a price or stock change never serves an answer quoting old values.
+    """
+    doc_keys = sorted(
+        ([document_id(doc), doc.metadata.get("price"), doc.metadata.get("quantity")] for doc in docs),
+        key=lambda doc_key: doc_key[0]
+    )
+    payload = json.dumps(
+        [doc_keys, history_window_hash(history, message), business_type],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    """Bounded cache of LLM answers looked up by query similarity.
+
+    An entry only matches when the retrieved document set, the history window
+    and the business type are identical (the context key) and the cosine
+    similarity of the query embeddings reaches ``similarity_threshold``. All
+    entries are dropped when the catalog version changes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        similarity_threshold: float = 0.97,
+        ttl_seconds: float = 600,
+        version_provider: Callable[[], int] = get_catalog_version
+    ):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.version_provider = version_provider
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._buckets: Dict[str, List[int]] = {}
+        self._ids = count()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self) -> None:
+        version = self.version_provider()
+        if self._version is not None and version != self._version:
+            logger.info("Catalog version changed (%s -> %s), invalidating answer cache", self._version, version)
+            self._clear()
+            self.invalidations += 1
+        self._version = version
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._buckets.clear()
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        bucket = self._buckets.get(entry["context_key"])
+        if bucket is not None:
+            bucket.remove(entry_id)
+            if not bucket:
+                del self._buckets[entry["context_key"]]
+
+    def lookup(self, query_embedding: List[float], context_key: str) -> Optional[str]:
+        """Return a cached answer for a similar query in the same context, if any."""
+        query = self._normalize(query_embedding)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version()
+            entry_ids = [
+                entry_id for entry_id in self._buckets.get(context_key, [])
+                if self._entries[entry_id]["expires_at"] >= now
+            ]
+            for entry_id in set(self._buckets.get(context_key, [])) - set(entry_ids):
+                self._remove(entry_id)
+            if not entry_ids:
+                self.misses += 1
+                return None
+
+            vectors = np.stack([self._entries[entry_id]["vector"] for entry_id in entry_ids])
+            similarities = vectors @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            entry_id = entry_ids[best]
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id]["answer"]
+
+    def store(self, query_embedding: List[float], context_key: str, answer: str) -> None:
+        if not answer:
+            return
+        with self._lock:
+            self._check_version()
+            entry_id = next(self._ids)
+            self._entries[entry_id] = {
+                "vector": self._normalize(query_embedding),
+                "context_key": context_key,
+                "answer": answer,
+                "expires_at": time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else float("inf")
+            }
+            self._buckets.setdefault(context_key, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "similarity_threshold": self.similarity_threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+answer_cache = SemanticAnswerCache(
+    max_entries=app_settings.answer_cache_size,
+    similarity_threshold=app_settings.answer_cache_similarity_threshold,
+    ttl_seconds=app_settings.answer_cache_ttl_seconds
+)
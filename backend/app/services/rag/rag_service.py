@@ -1,40 +1,127 @@
 import logging
+import threading
 import time
-from typing import List, Dict, Any
+from collections import OrderedDict
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.config.app_config import app_settings
+from app.rag.filters import ProductFilter
 from app.rag.retriever import get_retriever
-from app.llm.client import generate_chat_completion
+from app.llm.client import generate_chat_completion, agenerate_chat_completion, astream_chat_completion
+from app.embeddings.client import embeddings
+from app.services.product.product_snapshot import product_snapshots
+from app.services.rag.answer_cache import answer_cache, make_context_key
 from app.services.chat.prompt_builder import build_chat_prompt
 from app.interfaces.rag_interface import RAGServiceInterface
 
 logger = logging.getLogger(__name__)
 
+EngineKey = Tuple[int, bool, float, str, str, Optional[float], int]
+ENGINE_KEY_FIELDS = ("k", "use_scores", "max_score", "business_type", "retrieval_mode", "mmr_lambda", "mmr_fetch_k")
+# Client-supplied floats and candidate counts are snapped to these steps before
+# keying engines, so near-identical requests share one engine instead of
+# churning the registry.
+MAX_SCORE_STEP = 0.05
+MMR_LAMBDA_STEP = 0.05
+MMR_FETCH_K_STEP = 10
+
+
+def _snap(value: float, step: float) -> float:
+    return round(round(value / step) * step, 6)
+
 
 class RAGService(RAGServiceInterface):
-    def __init__(self, k: int = 3, business_type: str = "e-commerce", use_scores: bool = False, max_score: float = 1.2):
+    def __init__(
+        self,
+        k: int = 3,
+        business_type: str = "e-commerce",
+        use_scores: bool = False,
+        max_score: float = 1.2,
+        retrieval_mode: str = "vector",
+        mmr_lambda: Optional[float] = None,
+        mmr_fetch_k: int = 0
+    ):
         self.k = k
         self.business_type = business_type
         self.use_scores = use_scores
         self.max_score = max_score
-        self.retriever = get_retriever(k=self.k, use_scores=use_scores, max_score=max_score)
+        self.retrieval_mode = retrieval_mode
+        self.retriever = get_retriever(
+            k=self.k,
+            use_scores=use_scores,
+            max_score=max_score,
+            retrieval_mode=retrieval_mode,
+            mmr_lambda=mmr_lambda,
+            mmr_fetch_k=mmr_fetch_k
+        )
+
+    @staticmethod
+    def _where(product_filter: Optional[ProductFilter]) -> Optional[Dict[str, Any]]:
+        return product_filter.to_where() if product_filter is not None else None
+
+    def _retrieve(self, message: str, product_filter: Optional[ProductFilter]) -> List[Any]:
+        docs = self.retriever.invoke(message, self._where(product_filter))
+        if not docs and product_filter is not None and product_filter.fallback is not None:
+            logger.info("No documents match %s, retrying with %s", self._where(product_filter), self._where(product_filter.fallback))
+            docs = self.retriever.invoke(message, self._where(product_filter.fallback))
+        return docs
+
+    async def _aretrieve(self, message: str, product_filter: Optional[ProductFilter]) -> List[Any]:
+        docs = await self.retriever.ainvoke(message, self._where(product_filter))
+        if not docs and product_filter is not None and product_filter.fallback is not None:
+            logger.info("No documents match %s, retrying with %s", self._where(product_filter), self._where(product_filter.fallback))
+            docs = await self.retriever.ainvoke(message, self._where(product_filter.fallback))
+        return docs
+
+    @staticmethod
+    def _with_live_data(docs: List[Any]) -> List[Any]:
+        """Replace indexed price/stock with live values in one batched lookup."""
+        return product_snapshots.overlay(docs)
+
+    def _lookup_cached_reply(
+        self,
+        docs: List[Any],
+        message: str,
+        history: List[Dict[str, str]],
+        query_embedding: List[float]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Return ``(cached_reply, context_key)``; the key is reused to store the new reply."""
+        if query_embedding is None:
+            return None, None
+        context_key = make_context_key(docs, history, message, self.business_type)
+        return answer_cache.lookup(query_embedding, context_key), context_key
+
+    def _build_prompt(self, docs: List[Any], message: str, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        return build_chat_prompt(
+            docs=docs,
+            user_msg=message,
+            history=history or [],
+            business_type=self.business_type
+        )
 
     def ask(
         self,
         user_id: str,
         message: str,
-        history: List[Dict[str, str]] = None
+        history: List[Dict[str, str]] = None,
+        product_filter: Optional[ProductFilter] = None
     ) -> str:
         try:
             start_time = time.time()            
-            docs = self.retriever.invoke(message)
+            docs = self._with_live_data(self._retrieve(message, product_filter))
 
-            prompt_messages = build_chat_prompt(
-                docs=docs,
-                user_msg=message,
-                history=history or [],
-                business_type=self.business_type
-            )
+            # Served from the embedding cache: the retriever just embedded the same text.
+            query_embedding = embeddings.embed_query(message) if app_settings.answer_cache_enabled else None
+            cached_reply, context_key = self._lookup_cached_reply(docs, message, history, query_embedding)
+            if cached_reply is not None:
+                logger.info("Answer cache hit in %.3fs for user %s", time.time() - start_time, user_id)
+                return cached_reply
+
+            prompt_messages = self._build_prompt(docs, message, history)
 
             reply = generate_chat_completion(prompt_messages)
+            if context_key is not None:
+                answer_cache.store(query_embedding, context_key, reply)
             
             processing_time = time.time() - start_time
             logger.info("Chat response generated in %.3fs for user %s", processing_time, user_id)
@@ -45,6 +132,156 @@ class RAGService(RAGServiceInterface):
             logger.error("Error in ask method: %s", str(e))
             raise
 
+    async def aask(
+        self,
+        user_id: str,
+        message: str,
+        history: List[Dict[str, str]] = None,
+        product_filter: Optional[ProductFilter] = None
+    ) -> str:
+        try:
+            start_time = time.time()
+            docs = await self._aretrieve(message, product_filter)
+            docs = await run_in_threadpool(self._with_live_data, docs)
+
+            query_embedding = await embeddings.aembed_query(message) if app_settings.answer_cache_enabled else None
+            cached_reply, context_key = self._lookup_cached_reply(docs, message, history, query_embedding)
+            if cached_reply is not None:
+                logger.info("Answer cache hit in %.3fs for user %s", time.time() - start_time, user_id)
+                return cached_reply
+
+            prompt_messages = self._build_prompt(docs, message, history)
+
+            reply = await agenerate_chat_completion(prompt_messages)
+            if context_key is not None:
+                answer_cache.store(query_embedding, context_key, reply)
+
+            processing_time = time.time() - start_time
+            logger.info("Async chat response generated in %.3fs for user %s", processing_time, user_id)
+
+            return reply
+
+        except Exception as e:
+            logger.error("Error in aask method: %s", str(e))
+            raise
+
+    async def astream(
+        self,
+        user_id: str,
+        message: str,
+        history: List[Dict[str, str]] = None,
+        product_filter: Optional[ProductFilter] = None
+    ) -> AsyncIterator[str]:
+        """Stream the reply token by token; a cached answer is yielded as one chunk."""
+        start_time = time.time()
+        docs = await self._aretrieve(message, product_filter)
+        docs = await run_in_threadpool(self._with_live_data, docs)
+
+        query_embedding = await embeddings.aembed_query(message) if app_settings.answer_cache_enabled else None
+        cached_reply, context_key = self._lookup_cached_reply(docs, message, history, query_embedding)
+        if cached_reply is not None:
+            logger.info("Answer cache hit in %.3fs for user %s", time.time() - start_time, user_id)
+            yield cached_reply
+            return
+
+        prompt_messages = self._build_prompt(docs, message, history)
+
+        chunks = []
+        token_stream = astream_chat_completion(prompt_messages)
+        try:
+            async for token in token_stream:
+                if not chunks:
+                    logger.info("First token streamed in %.3fs for user %s", time.time() - start_time, user_id)
+                chunks.append(token)
+                yield token
+        finally:
+            await token_stream.aclose()
+
+        if context_key is not None:
+            answer_cache.store(query_embedding, context_key, "".join(chunks))
+        logger.info("Chat response streamed in %.3fs for user %s", time.time() - start_time, user_id)
+
+
+class RAGEngineRegistry:
+    """Process-wide registry of reusable RAG engines.
+
+    Engines are keyed by ``ENGINE_KEY_FIELDS`` (retrieval and prompt
+    parameters) and kept in a bounded LRU so request parameters cannot grow
+    the registry without limit. Float and candidate-count parameters are
+    quantised, which keeps the number of distinct keys small.
+    """
+
+    def __init__(self, max_engines: int = 32):
+        self.max_engines = max_engines
+        self._engines: "OrderedDict[EngineKey, RAGService]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        k: int,
+        use_scores: bool,
+        max_score: float,
+        business_type: str,
+        retrieval_mode: str = "vector",
+        mmr_lambda: Optional[float] = None,
+        mmr_fetch_k: int = 0
+    ) -> EngineKey:
+        return (
+            int(k),
+            bool(use_scores),
+            _snap(float(max_score), MAX_SCORE_STEP),
+            business_type or "e-commerce",
+            retrieval_mode or "vector",
+            _snap(float(mmr_lambda), MMR_LAMBDA_STEP) if mmr_lambda is not None else None,
+            -(-int(mmr_fetch_k or 0) // MMR_FETCH_K_STEP) * MMR_FETCH_K_STEP
+        )
+
+    def get_engine(
+        self,
+        k: int = 3,
+        use_scores: bool = False,
+        max_score: float = 1.2,
+        business_type: str = "e-commerce",
+        retrieval_mode: str = "vector",
+        mmr_lambda: Optional[float] = None,
+        mmr_fetch_k: int = 0
+    ) -> RAGService:
+        """Return a warm engine for the given parameters, creating it on first use."""
+        key = self.make_key(k, use_scores, max_score, business_type, retrieval_mode, mmr_lambda, mmr_fetch_k)
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is not None:
+                self._engines.move_to_end(key)
+                return engine
+
+            logger.info("Creating RAG engine for key %s", key)
+            engine = RAGService(**dict(zip(ENGINE_KEY_FIELDS, key)))
+            self._engines[key] = engine
+            if len(self._engines) > self.max_engines:
+                evicted_key, _ = self._engines.popitem(last=False)
+                logger.info("Evicted RAG engine for key %s", evicted_key)
+            return engine
+
+    def warmup(self, keys: List[EngineKey]) -> None:
+        """Pre-build engines so the first requests do not pay construction cost."""
+        for key in keys:
+            self.get_engine(*key)
+        logger.info("RAG engine registry warmed with %d engines", len(keys))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._engines.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "engines": len(self._engines),
+                "max_engines": self.max_engines
+            }
+
+
+engine_registry = RAGEngineRegistry(max_engines=app_settings.rag_engine_registry_size)
+
 
 def ask_rag(
     user_id: str,
@@ -53,7 +290,44 @@ def ask_rag(
     k: int = 3,
     business_type: str = "e-commerce",
     use_scores: bool = False,
-    max_score: float = 1.2
+    max_score: float = 1.2,
+    retrieval_mode: str = "vector",
+    product_filter: Optional[ProductFilter] = None,
+    mmr_lambda: Optional[float] = None,
+    mmr_fetch_k: int = 0
 ) -> str: 
-    service = RAGService(k=k, business_type=business_type, use_scores=use_scores, max_score=max_score)
-    return service.ask(user_id, message, history) 
\ No newline at end of file
+    service = engine_registry.get_engine(
+        k=k,
+        use_scores=use_scores,
+        max_score=max_score,
+        business_type=business_type,
+        retrieval_mode=retrieval_mode,
+        mmr_lambda=mmr_lambda,
+        mmr_fetch_k=mmr_fetch_k
+    )
+    return service.ask(user_id, message, history, product_filter)
+
+
+async def aask_rag(
+    user_id: str,
+    message: str,
+    history: List[Dict[str, str]] = None,
+    k: int = 3,
+    business_type: str = "e-commerce",
+    use_scores: bool = False,
+    max_score: float = 1.2,
+    retrieval_mode: str = "vector",
+    product_filter: Optional[ProductFilter] = None,
+    mmr_lambda: Optional[float] = None,
+    mmr_fetch_k: int = 0
+) -> str:
+    service = engine_registry.get_engine(
+        k=k,
+        use_scores=use_scores,
+        max_score=max_score,
+        business_type=business_type,
+        retrieval_mode=retrieval_mode,
+        mmr_lambda=mmr_lambda,
+        mmr_fetch_k=mmr_fetch_k
+    )
+    return await service.aask(user_id, message, history, product_filter)
@@ -0,0 +1,58 @@
+from langchain_core.documents import Document
+
+from app.services.rag import answer_cache as answer_cache_module
+from app.services.rag.answer_cache import SemanticAnswerCache, make_context_key
+
+
+def product(product_id, price, quantity):
+    return Document(page_content=f"Product {product_id}", metadata={"id": product_id, "price": price, "quantity": quantity})
+
+
+HISTORY = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+
+
+def make_cache(version=None, **kwargs):
+    version = version if version is not None else [1]
+    return SemanticAnswerCache(version_provider=lambda: version[0], **kwargs), version
+
+
+def test_similarity_threshold():
+    cache, _ = make_cache(similarity_threshold=0.95)
+    cache.store([1.0, 0.0], "ctx", "answer")
+
+    assert cache.lookup([0.99, 0.05], "ctx") == "answer"
+    assert cache.lookup([0.7, 0.7], "ctx") is None
+    assert cache.lookup([1.0, 0.0], "other-ctx") is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 2)
+
+
+def test_context_key_changes_with_price_or_stock():
+    key = make_context_key([product("1", 25.0, 50), product("2", 55.0, 30)], HISTORY, "q", "e-commerce")
+
+    assert make_context_key([product("2", 55.0, 30), product("1", 25.0, 50)], HISTORY, "q", "e-commerce") == key
+    assert make_context_key([product("1", 24.0, 50), product("2", 55.0, 30)], HISTORY, "q", "e-commerce") != key
+    assert make_context_key([product("1", 25.0, 49), product("2", 55.0, 30)], HISTORY, "q", "e-commerce") != key
+    assert make_context_key([product("1", 25.0, 50), product("2", 55.0, 30)], HISTORY, "q", "retail") != key
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, "monotonic", lambda: now[0])
+    cache, _ = make_cache(ttl_seconds=60)
+    cache.store([1.0, 0.0], "ctx", "answer")
+
+    now[0] += 59
+    assert cache.lookup([1.0, 0.0], "ctx") == "answer"
+    now[0] += 2
+    assert cache.lookup([1.0, 0.0], "ctx") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_catalog_version_bump_invalidates_entries():
+    cache, version = make_cache()
+    cache.store([1.0, 0.0], "ctx", "answer")
+    assert cache.lookup([1.0, 0.0], "ctx") == "answer"
+
+    version[0] += 1
+    assert cache.lookup([1.0, 0.0], "ctx") is None
+    assert cache.stats()["invalidations"] == 1
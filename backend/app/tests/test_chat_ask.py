@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.api.routers.chat as chat_router
+import app.llm.client as llm_client
+import app.rag.numpy_store as numpy_store
+from app.config.app_config import app_settings
+from app.embeddings.client import embeddings
+from app.embeddings.fake import HashEmbeddings
+from app.llm.fake import FakeChatModel
+from app.models.chat_message import ChatMessage
+from app.models.chat_message_count import ChatMessageCount
+from app.models.chat_session_summary import ChatSessionSummary
+from app.models.user import User
+from app.rag.numpy_store import NumpyVectorStore
+from app.schemas.chat import ChatRequest
+from app.services.chat.chat_service import ChatService
+from app.services.chat.history_cache import history_cache
+from app.services.product.product_snapshot import product_snapshots
+from app.services.rag.answer_cache import answer_cache
+from app.services.rag.rag_service import engine_registry
+from db.session import Base
+
+PRODUCTS = {
+    "1": ("Arduino Uno R3 microcontroller board", {"price": 25.0, "quantity": 50}),
+    "4": ("DJI Mini 3 Pro drone with 4K camera", {"price": 759.0, "quantity": 8}),
+}
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    model = HashEmbeddings(dimension=64)
+    store = NumpyVectorStore(str(tmp_path / "numpy"), model)
+    store.add_embeddings(
+        list(PRODUCTS),
+        [text for text, _ in PRODUCTS.values()],
+        model.embed_documents([text for text, _ in PRODUCTS.values()]),
+        [metadata for _, metadata in PRODUCTS.values()]
+    )
+    monkeypatch.setattr(app_settings, "vector_backend", "numpy")
+    monkeypatch.setattr(numpy_store, "vectorstore", store)
+    monkeypatch.setattr(embeddings, "underlying", model)
+    monkeypatch.setattr(llm_client, "llm", FakeChatModel(mode="canned"))
+    monkeypatch.setattr(product_snapshots, "loader", lambda product_ids: {})
+    monkeypatch.setattr(chat_router.session_summarizer, "schedule", lambda user_id, session_id: None)
+    engine_registry.clear()
+    answer_cache.invalidate()
+    history_cache.invalidate_user(1)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, ChatMessage.__table__, ChatSessionSummary.__table__, ChatMessageCount.__table__
+    ])
+    session = sessionmaker(bind=engine, autoflush=False)()
+    session.add(User(id=1, email="u1@example.com", password="x"))
+    session.commit()
+    yield session
+    session.close()
+    engine_registry.clear()
+    answer_cache.invalidate()
+    history_cache.invalidate_user(1)
+
+
+def test_async_ask_answers_from_the_catalog_and_saves_the_turn(db):
+    user = db.get(User, 1)
+    request = ChatRequest(message="Do you have a DJI drone with a 4K camera?", k=1)
+
+    response = asyncio.run(chat_router.chat_ask(request, user, db, ChatService()))
+
+    assert "DJI Mini 3 Pro drone with 4K camera for $759.0" in response.response
+    messages = db.scalars(select(ChatMessage).order_by(ChatMessage.id)).all()
+    assert [(m.user_id, m.message_type, m.content) for m in messages] == [
+        (1, "user", request.message), (1, "assistant", response.response)
+    ]
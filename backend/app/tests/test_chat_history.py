@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.exceptions.chat_exceptions import ChatValidationException
+from app.models.chat_message import ChatMessage
+from app.models.chat_message_count import ChatMessageCount
+from app.models.chat_session_summary import ChatSessionSummary
+from app.models.user import User
+from app.services.chat.chat_history_service import ChatHistoryService
+from db.session import Base
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[User.__table__, ChatMessage.__table__, ChatMessageCount.__table__, ChatSessionSummary.__table__])
+    session = sessionmaker(bind=engine, autoflush=False)()
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    # Each user/assistant pair shares a timestamp, so pages must break ties on id.
+    for i in range(11):
+        session.add(ChatMessage(user_id=1, session_id="1", message_type="user", content=f"m{i}", created_at=start + timedelta(seconds=i // 2)))
+    session.add(ChatMessage(user_id=2, session_id="2", message_type="user", content="other", created_at=start))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_cursor_pages_cover_history_once_newest_first(db):
+    service = ChatHistoryService(db)
+    pages, cursor = [], None
+    while True:
+        messages, cursor = service.get_history_page(1, limit=4, cursor=cursor)
+        pages.append([message.content for message in messages])
+        if cursor is None:
+            break
+
+    assert pages == [["m7", "m8", "m9", "m10"], ["m3", "m4", "m5", "m6"], ["m0", "m1", "m2"]]
+
+
+def test_exact_last_page_has_no_cursor(db):
+    messages, cursor = ChatHistoryService(db).get_history_page(1, limit=11)
+    assert len(messages) == 11 and cursor is None
+
+
+def test_invalid_cursor_is_rejected(db):
+    with pytest.raises(ChatValidationException):
+        ChatHistoryService(db).get_history_page(1, cursor="not-a-cursor")
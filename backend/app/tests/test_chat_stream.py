@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.api.routers.chat as chat_router
+from app.exceptions.llm_exceptions import LLMUnavailableException
+from app.llm.fake import FakeChatModel
+from app.models.chat_message import ChatMessage
+from app.models.chat_message_count import ChatMessageCount
+from app.models.chat_session_summary import ChatSessionSummary
+from app.models.user import User
+from db.session import Base
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after=None):
+        self.disconnect_after = disconnect_after
+        self.checks = 0
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.disconnect_after is not None and self.checks > self.disconnect_after
+
+
+class TokenStream:
+    """Async iterator over the fake model's tokens that records ``aclose``."""
+
+    def __init__(self, text, fail_after=None):
+        self._tokens = self._generate(text, fail_after)
+        self.closed = False
+
+    async def _generate(self, text, fail_after):
+        model = FakeChatModel(mode="echo")
+        chunks = model.astream([HumanMessage(content=text)])
+        async for i, content in _enumerate(chunk.content async for chunk in chunks if chunk.content):
+            if fail_after is not None and i == fail_after:
+                raise LLMUnavailableException("circuit open")
+            yield content
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._tokens.__anext__()
+
+    async def aclose(self):
+        self.closed = True
+        await self._tokens.aclose()
+
+
+async def _enumerate(iterator):
+    i = 0
+    async for item in iterator:
+        yield i, item
+        i += 1
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, ChatMessage.__table__, ChatSessionSummary.__table__, ChatMessageCount.__table__
+    ])
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as db:
+        db.add(User(id=1, email="u1@example.com", password="x"))
+        db.commit()
+    monkeypatch.setattr(chat_router, "SessionLocal", factory)
+    monkeypatch.setattr(chat_router.session_summarizer, "schedule", lambda user_id, session_id: None)
+    return factory
+
+
+def collect(request, stream):
+    async def run():
+        return [frame async for frame in chat_router.stream_chat_events(request, stream, 1, "1", "hello big world")]
+    return asyncio.run(run())
+
+
+def parse(frame):
+    event, data = frame.strip().split("\n")
+    return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def stored_messages(factory):
+    with factory() as db:
+        return db.scalar(select(func.count(ChatMessage.id)))
+
+
+def test_completed_stream_sends_tokens_then_done_and_saves_the_turn(session_factory):
+    stream = TokenStream("hello big world")
+    frames = [parse(frame) for frame in collect(FakeRequest(), stream)]
+
+    assert frames[:-1] == [("token", {"content": token}) for token in ("hello ", "big ", "world")]
+    assert frames[-1] == ("done", {"response": "hello big world"})
+    assert stream.closed
+    with session_factory() as db:
+        assert [(m.message_type, m.content) for m in db.scalars(select(ChatMessage).order_by(ChatMessage.id))] == [
+            ("user", "hello big world"), ("assistant", "hello big world")
+        ]
+
+
+def test_error_mid_stream_sends_error_frame_and_saves_nothing(session_factory):
+    frames = [parse(frame) for frame in collect(FakeRequest(), TokenStream("hello big world", fail_after=1))]
+
+    assert frames == [
+        ("token", {"content": "hello "}),
+        ("error", {"detail": "Chat service is temporarily unavailable"})
+    ]
+    assert stored_messages(session_factory) == 0
+
+
+def test_client_disconnect_closes_the_stream_and_saves_nothing(session_factory):
+    stream = TokenStream("hello big world")
+    frames = [parse(frame) for frame in collect(FakeRequest(disconnect_after=1), stream)]
+
+    assert frames == [("token", {"content": "hello "})]
+    assert stream.closed
+    assert stored_messages(session_factory) == 0
+
+
+def test_failed_save_sends_error_frame_instead_of_done(session_factory, monkeypatch):
+    async def failing_save(self, *args):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(chat_router.ChatHistoryService, "asave_turn", failing_save)
+    frames = [parse(frame) for frame in collect(FakeRequest(), TokenStream("hello big world"))]
+
+    assert frames[:-1] == [("token", {"content": token}) for token in ("hello ", "big ", "world")]
+    assert frames[-1] == ("error", {"detail": "Error saving chat history"})
+    assert stored_messages(session_factory) == 0
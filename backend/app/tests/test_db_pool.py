@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core.metrics import metrics
+from db.pool import InstrumentedQueuePool, instrument_engine, pool_stats
+
+
+def counters():
+    return metrics.snapshot()["counters"]
+
+
+def test_pool_reports_occupancy_waits_and_connection_events(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    instrument_engine(engine)
+    before = counters()
+    waits = metrics.snapshot()["distributions"].get("db_pool_wait_seconds", {}).get("count", 0)
+
+    connection = engine.connect()
+    connection.execute(text("select 1"))
+    assert pool_stats(engine)["checked_out"] == 1
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    connection.close()
+    assert pool_stats(engine)["checked_out"] == 0
+    engine.dispose()
+
+    after = counters()
+    assert after["db_pool_connects"] - before.get("db_pool_connects", 0) == 1
+    assert after["db_pool_disconnects"] - before.get("db_pool_disconnects", 0) == 1
+    assert after["db_pool_timeouts"] - before.get("db_pool_timeouts", 0) == 1
+    assert metrics.snapshot()["distributions"]["db_pool_wait_seconds"]["count"] - waits == 2
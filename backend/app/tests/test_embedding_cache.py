@@ -0,0 +1,67 @@
+from langchain_core.embeddings import Embeddings
+from app.embeddings.cache import CachedEmbeddings, SQLiteEmbeddingStore, normalize_text
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = 0
+        self.texts = []
+
+    def embed_query(self, text):
+        self.calls += 1
+        self.texts.append(text)
+        return [float(len(text)), 1.0, 0.5]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def test_normalize_text():
+    assert normalize_text("  Cheap   ARDUINO ") == "cheap arduino"
+
+
+def test_repeated_queries_hit_memory_cache():
+    underlying = CountingEmbeddings()
+    cached = CachedEmbeddings(underlying, model_name="test-model", max_entries=2)
+
+    first = cached.embed_query("cheap arduino")
+    second = cached.embed_query("Cheap  Arduino")
+
+    assert first == second
+    assert underlying.calls == 1
+    assert cached.stats()["hits"] == 1
+
+
+def test_model_sees_original_text_and_callers_get_copies():
+    underlying = CountingEmbeddings()
+    cached = CachedEmbeddings(underlying, model_name="test-model")
+
+    first = cached.embed_query("Cheap ARDUINO")
+    first.append(99.0)
+
+    assert underlying.texts == ["Cheap ARDUINO"]
+    assert cached.embed_query("cheap arduino") == [13.0, 1.0, 0.5]
+
+
+def test_lru_eviction():
+    underlying = CountingEmbeddings()
+    cached = CachedEmbeddings(underlying, model_name="test-model", max_entries=1)
+
+    cached.embed_query("best drone")
+    cached.embed_query("cheap arduino")
+    cached.embed_query("best drone")
+
+    assert underlying.calls == 3
+    assert cached.stats()["evictions"] == 2
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    path = tmp_path / "embeddings.sqlite3"
+    underlying = CountingEmbeddings()
+
+    CachedEmbeddings(underlying, "test-model", disk_store=SQLiteEmbeddingStore(str(path))).embed_query("best drone")
+    restarted = CachedEmbeddings(underlying, "test-model", disk_store=SQLiteEmbeddingStore(str(path)))
+    restarted.embed_query("best drone")
+
+    assert underlying.calls == 1
+    assert restarted.stats()["disk_hits"] == 1
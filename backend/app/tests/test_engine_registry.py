@@ -0,0 +1,14 @@
+from app.services.rag.rag_service import RAGEngineRegistry
+
+
+def test_near_identical_parameters_share_an_engine_key():
+    make_key = RAGEngineRegistry.make_key
+    assert make_key(3, False, 1.2, "e-commerce", "vector", 0.5, 15) == make_key(3, False, 1.2001, "e-commerce", "vector", 0.50999, 20)
+    assert make_key(3, False, 1.2, "e-commerce", "vector", 0.5, 0) != make_key(3, False, 1.2, "e-commerce", "vector", 0.7, 0)
+    assert make_key(3, False, 1.2, "e-commerce", "vector", None, 0)[5:] == (None, 0)
+
+
+def test_registry_size_is_bounded_by_quantised_keys():
+    registry = RAGEngineRegistry(max_engines=32)
+    keys = {registry.make_key(3, False, 1.2, "e-commerce", "vector", 0.5 + i / 10000, 11 + i % 9) for i in range(200)}
+    assert len(keys) == 1
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+from langchain_core.embeddings.fake import DeterministicFakeEmbedding
+
+from app.rag.faiss_store import IVF_MIN_POINTS_PER_LIST, FaissVectorStore
+
+NLIST = 2
+COUNT = IVF_MIN_POINTS_PER_LIST * NLIST + 10
+
+
+def make_store(tmp_path, index_type):
+    return FaissVectorStore(
+        str(tmp_path / "faiss"), DeterministicFakeEmbedding(size=16), index_type=index_type, nlist=NLIST, nprobe=NLIST
+    )
+
+
+def seeded_store(tmp_path, index_type):
+    store = make_store(tmp_path, index_type)
+    vectors = np.random.default_rng(0).normal(size=(COUNT, 16)).astype(np.float32)
+    store.add_embeddings(
+        [str(i) for i in range(COUNT)],
+        [f"product {i}" for i in range(COUNT)],
+        vectors,
+        [{"price": float(i)} for i in range(COUNT)]
+    )
+    return store, vectors
+
+
+def search_ids(store, vector, k=5, filter=None):
+    return [doc.id for doc, _ in store.similarity_search_by_vector_with_relevance_scores(vector.tolist(), k=k, filter=filter)]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_upsert_replaces_document(tmp_path, index_type):
+    store, vectors = seeded_store(tmp_path, index_type)
+    store.add_embeddings(["3"], ["product 3 v2"], [vectors[7]], [{"price": 99.0}])
+
+    hits = store.similarity_search_by_vector_with_relevance_scores(vectors[7].tolist(), k=2)
+    assert len(store) == COUNT
+    assert {doc.id for doc, _ in hits} == {"3", "7"}
+    assert next(doc for doc, _ in hits if doc.id == "3").metadata == {"price": 99.0}
+    assert "3" not in search_ids(store, vectors[3], k=1)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_deleted_documents_are_never_returned(tmp_path, index_type):
+    store, vectors = seeded_store(tmp_path, index_type)
+    store.delete(ids=["5", "6"])
+
+    assert len(store) == COUNT - 2
+    assert not {"5", "6"} & set(search_ids(store, vectors[5], k=COUNT))
+    assert len(search_ids(store, vectors[5], k=COUNT)) == COUNT - 2
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_filtered_search_only_returns_matching_documents(tmp_path, index_type):
+    store, vectors = seeded_store(tmp_path, index_type)
+    store.delete(ids=["2"])
+
+    ids = search_ids(store, vectors[40], k=10, filter={"price": {"$lte": 4.0}})
+    assert sorted(ids, key=int) == ["0", "1", "3", "4"]
+    assert search_ids(store, vectors[40], filter={"price": {"$gte": 1000.0}}) == []
+
+
+def test_filter_selector_is_memoized_until_the_next_write(tmp_path):
+    store, vectors = seeded_store(tmp_path, "flat")
+    cheap = {"price": {"$lte": 4.0}}
+
+    assert search_ids(store, vectors[3], k=1, filter=cheap) == ["3"]
+    selector = store._filter_selector(cheap)
+    assert store._filter_selector(cheap) is selector
+
+    store.update_metadata(["3"], [{"price": 500.0}])
+    assert "3" not in search_ids(store, vectors[3], k=10, filter=cheap)
+    store.delete(["2"])
+    assert sorted(search_ids(store, vectors[3], k=10, filter=cheap), key=int) == ["0", "1", "4"]
+    store.add_embeddings(["new"], ["new product"], vectors[3:4], [{"price": 1.0}])
+    assert search_ids(store, vectors[3], k=1, filter=cheap) == ["new"]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_save_and_reload(tmp_path, index_type):
+    store, vectors = seeded_store(tmp_path, index_type)
+    store.delete(ids=["9"])
+    expected = search_ids(store, vectors[11])
+
+    reloaded = make_store(tmp_path, index_type)
+    assert len(reloaded) == COUNT - 1
+    assert search_ids(reloaded, vectors[11]) == expected
+    assert expected[0] == "11"
+
+
+def test_ivf_stays_exact_until_enough_vectors_to_train(tmp_path):
+    store = make_store(tmp_path, "ivf")
+    vectors = np.random.default_rng(1).normal(size=(COUNT, 16)).astype(np.float32)
+    store.add_embeddings([str(i) for i in range(10)], ["p"] * 10, vectors[:10])
+    assert not store._is_ivf(store.index)
+
+    store.add_embeddings([str(i) for i in range(10, COUNT)], ["p"] * (COUNT - 10), vectors[10:])
+    assert store._is_ivf(store.index)
+    assert store.index.ntotal == COUNT
+
+
+def test_hnsw_compacts_tombstones(tmp_path):
+    store, vectors = seeded_store(tmp_path, "hnsw")
+    store.delete(ids=[str(i) for i in range(5)])
+    assert len(store.tombstones) == 5
+
+    store.delete(ids=[str(i) for i in range(5, 30)])
+    assert store.tombstones == set()
+    assert store.index.ntotal == COUNT - 30
+    assert search_ids(store, vectors[50], k=1) == ["50"]
+    assert search_ids(make_store(tmp_path, "hnsw"), vectors[50], k=1) == ["50"]
+
+
+def test_metadata_lookup_and_id_pages(tmp_path):
+    store, _ = seeded_store(tmp_path, "flat")
+    store.delete(ids=["1"])
+
+    assert store.get_metadata(["0", "1", "2", "missing"]) == {"0": {"price": 0.0}, "2": {"price": 2.0}}
+    pages = list(store.iter_ids(batch_size=7))
+    assert max(len(page) for page in pages) <= 7
+    assert sorted(doc_id for page in pages for doc_id in page) == sorted(str(i) for i in range(COUNT) if i != 1)
+
+
+def test_buffered_metadata_updates_are_written_on_flush(tmp_path):
+    store, _ = seeded_store(tmp_path, "flat")
+    store.update_metadata(["1"], [{"price": 0.5}], persist=False)
+
+    assert make_store(tmp_path, "flat").get_metadata(["1"]) == {"1": {"price": 1.0}}
+    store.flush()
+    assert make_store(tmp_path, "flat").get_metadata(["1"]) == {"1": {"price": 0.5}}
@@ -0,0 +1,29 @@
+import asyncio
+
+import numpy as np
+from langchain_core.messages import HumanMessage
+
+from app.embeddings.fake import HashEmbeddings
+from app.llm.fake import FakeChatModel
+
+
+def test_hash_embeddings_are_deterministic_and_lexical():
+    embeddings = HashEmbeddings(dimension=256)
+    query = np.array(embeddings.embed_query("Noise cancelling headphones"))
+
+    assert query.shape == (256,)
+    assert np.allclose(query, embeddings.embed_documents(["noise cancelling headphones"])[0])
+    assert query @ np.array(embeddings.embed_query("headphones with noise cancelling")) > query @ np.array(embeddings.embed_query("3D printer"))
+
+
+def test_fake_llm_streams_the_same_reply():
+    model = FakeChatModel(mode="canned")
+    prompt = [HumanMessage(content="Relevant context:\n- 8x DJI Mini 3 Pro Drone (Price: $759.0)"), HumanMessage(content="drones?")]
+
+    async def collect():
+        return "".join([chunk.content async for chunk in model.astream(prompt)])
+
+    reply = model.invoke(prompt).content
+    assert "DJI Mini 3 Pro Drone for $759.0" in reply
+    assert asyncio.run(collect()) == reply
+    assert FakeChatModel(mode="echo").invoke(prompt).content == "drones?"
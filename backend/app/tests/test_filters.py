@@ -0,0 +1,70 @@
+import asyncio
+
+from app.rag.filters import ProductFilter, matches_where, parse_message_filters
+from app.rag.seed_vector_db import build_document
+
+BRANDS = ["Creality", "DJI", "Raspberry Pi"]
+CATEGORIES = ["3d-printing", "drones", "single-board-computers"]
+
+
+def test_parse_price_stock_brand_and_category():
+    product_filter = parse_message_filters("Any DJI drones under $800 in stock?", BRANDS, CATEGORIES)
+    assert product_filter.max_price == 800.0
+    assert product_filter.min_price is None
+    assert product_filter.in_stock_only is True
+    assert product_filter.brands == ["DJI"]
+    assert product_filter.categories == ["drones"]
+
+
+def test_parse_ranges_and_ignore_units():
+    assert parse_message_filters("printers between 200 and 400 dollars").min_price == 200.0
+    assert parse_message_filters("$50-$100 boards").max_price == 100.0
+    assert parse_message_filters("a laptop with under 16gb").max_price is None
+
+
+def test_explicit_values_win_over_parsed_ones():
+    explicit = ProductFilter(max_price=300.0, brands=["Creality"])
+    merged = explicit.merged_with(parse_message_filters("DJI under $900 in stock", BRANDS, CATEGORIES))
+    assert merged.max_price == 300.0
+    assert merged.brands == ["Creality"]
+    assert merged.in_stock_only is True
+
+
+def test_where_matches_indexed_metadata():
+    metadata = build_document(3, "Ender 3 Pro", "Creality", "Resume Print", 299.0, 0, ["3d-printing", "maker"])["metadata"]
+    where = ProductFilter(max_price=300.0, brands=["creality"], categories=["3d-printing", "drones"]).to_where()
+
+    assert matches_where(metadata, where)
+    assert not matches_where(metadata, ProductFilter(in_stock_only=True).to_where())
+    assert not matches_where(metadata, ProductFilter(categories=["drones"]).to_where())
+    assert ProductFilter().to_where() is None
+
+
+class StubRetriever:
+    def __init__(self, docs_by_where):
+        self.docs_by_where = docs_by_where
+        self.calls = []
+
+    def invoke(self, query, where=None):
+        self.calls.append(where)
+        return self.docs_by_where.get(repr(where), [])
+
+    async def ainvoke(self, query, where=None):
+        return self.invoke(query, where)
+
+
+def test_inferred_filter_falls_back_to_explicit_when_nothing_matches():
+    from app.services.rag.rag_service import RAGService
+
+    explicit = ProductFilter(max_price=900.0)
+    inferred = explicit.merged_with(parse_message_filters("DJI drones in stock", BRANDS, CATEGORIES))
+    inferred.fallback = explicit
+    engine = RAGService.__new__(RAGService)
+    engine.retriever = StubRetriever({repr(explicit.to_where()): ["doc"]})
+
+    assert engine._retrieve("DJI drones in stock", inferred) == ["doc"]
+    assert engine.retriever.calls == [inferred.to_where(), explicit.to_where()]
+    assert asyncio.run(engine._aretrieve("DJI drones in stock", inferred)) == ["doc"]
+    assert engine.retriever.calls[2:] == [inferred.to_where(), explicit.to_where()]
+    assert inferred.merged_with(ProductFilter()).fallback is None
+    assert inferred == explicit.merged_with(parse_message_filters("DJI drones in stock", BRANDS, CATEGORIES))
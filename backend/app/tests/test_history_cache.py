@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.services.chat.chat_history_service as chat_history_service
+from app.models.chat_message import ChatMessage
+from app.models.chat_message_count import ChatMessageCount
+from app.models.chat_session_summary import ChatSessionSummary
+from app.models.user import User
+from app.services.chat.chat_history_service import SUMMARY_PREFIX, ChatHistoryService
+from app.services.chat.history_cache import ChatHistoryCache, MemoryHistoryBackend
+from app.services.chat.history_retention import ChatHistoryMaintenance
+from app.services.chat.message_counter import mark_cleared
+from db.session import Base
+
+
+def make_backend(**overrides):
+    options = {"capacity": 4, "max_sessions": 100, "max_bytes": 10 ** 6}
+    options.update(overrides)
+    return MemoryHistoryBackend(**options)
+
+
+def test_ring_buffer_keeps_newest_messages():
+    backend = make_backend()
+    backend.fill((1, "a"), None, [(1, "user", "m1")], backend.version((1, "a")))
+    backend.append((1, "a"), [(i, "user", f"m{i}") for i in range(2, 7)])
+
+    assert backend.get((1, "a")) == (None, [(i, "user", f"m{i}") for i in range(3, 7)])
+
+
+def test_sessions_are_evicted_lru_by_count_and_size():
+    backend = make_backend(max_sessions=2, max_bytes=450)
+    for session in ("a", "b", "c"):
+        backend.fill((1, session), None, [(1, "user", "x")], backend.version((1, session)))
+    assert backend.get((1, "a")) is None and backend.get((1, "c")) is not None
+
+    backend.append((1, "c"), [(2, "user", "y" * 200)])
+    assert backend.get((1, "b")) is None and backend.get((1, "c")) is not None
+
+
+def test_fill_that_raced_with_a_write_is_discarded():
+    backend = make_backend()
+    version = backend.version((1, "a"))
+    backend.append((1, "a"), [(5, "user", "newer")])
+    backend.fill((1, "a"), None, [(4, "user", "older")], version)
+    assert backend.get((1, "a")) is None
+
+    version = backend.version((1, "b"))
+    backend.delete_user(1)
+    backend.fill((1, "b"), None, [], version)
+    assert backend.get((1, "b")) is None
+
+
+def test_entry_filled_under_another_clear_watermark_is_dropped():
+    backend = make_backend()
+    backend.fill((1, "a"), None, [(3, "user", "m3")], backend.version((1, "a")), watermark=0)
+
+    assert backend.get((1, "a"), watermark=0) is not None
+    assert backend.get((1, "a"), watermark=3) is None
+    assert backend.get((1, "a")) is None
+
+
+@pytest.fixture
+def service(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[User.__table__, ChatMessage.__table__, ChatMessageCount.__table__, ChatSessionSummary.__table__])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    monkeypatch.setattr(chat_history_service, "history_cache", ChatHistoryCache(make_backend(capacity=12), capacity=12))
+    factory = sessionmaker(bind=engine, autoflush=False)
+    monkeypatch.setattr(chat_history_service, "history_maintenance", ChatHistoryMaintenance(factory, interval_seconds=0))
+    db = factory()
+    yield ChatHistoryService(db), statements
+    db.close()
+
+
+def test_prompt_history_is_served_from_cache_after_first_load(service):
+    history, statements = service
+    history.save_turn(1, "1", "q1", "r1")
+    assert history.get_prompt_history_as_dict(1, "1") == [
+        {"role": "user", "content": "q1"}, {"role": "assistant", "content": "r1"}
+    ]
+
+    history.save_turn(1, "1", "q2", "r2")
+    statements.clear()
+    assert [m["content"] for m in history.get_prompt_history_as_dict(1, "1", limit=3)] == ["r1", "q2", "r2"]
+    # Only the clear watermark is read; the messages come from the cache.
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 1 and "chat_message_counts" in selects[0]
+
+
+def test_summary_update_and_clear_invalidate_the_cache(service):
+    history, _ = service
+    for i in range(3):
+        history.save_turn(1, "1", f"q{i}", f"r{i}")
+    history.get_prompt_history_as_dict(1, "1")
+
+    last_folded = history.get_messages_after(1, "1")[3].id
+    history.save_summary(1, "1", "likes drones", last_folded)
+    assert history.get_prompt_history_as_dict(1, "1") == [
+        {"role": "system", "content": SUMMARY_PREFIX + "likes drones"},
+        {"role": "user", "content": "q2"},
+        {"role": "assistant", "content": "r2"}
+    ]
+
+    history.clear_history(1)
+    assert history.get_prompt_history_as_dict(1, "1") == []
+
+
+def test_history_cleared_by_another_worker_is_not_served(service):
+    history, _ = service
+    history.save_turn(1, "1", "q1", "r1")
+    history.get_prompt_history_as_dict(1, "1")
+
+    # Another worker clears the history: the rows are hidden, this worker's cache is not told.
+    mark_cleared(history.db, 1)
+    history.db.commit()
+    assert history.get_prompt_history_as_dict(1, "1") == []
+
+    history.save_turn(1, "1", "q2", "r2")
+    assert [m["content"] for m in history.get_prompt_history_as_dict(1, "1")] == ["q2", "r2"]
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.chat_message import ChatMessage
+from app.models.chat_message_archive import ChatMessageArchive
+from app.models.chat_message_count import ChatMessageCount
+from app.models.chat_session_summary import ChatSessionSummary
+from app.models.user import User
+from app.services.chat import chat_history_service
+from app.services.chat.chat_history_service import ChatHistoryService
+from app.services.chat.history_retention import ChatHistoryMaintenance, run_retention
+from app.services.chat.message_counter import mark_cleared
+from db.session import Base
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, ChatMessage.__table__, ChatSessionSummary.__table__,
+        ChatMessageCount.__table__, ChatMessageArchive.__table__
+    ])
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as db:
+        db.add_all([User(id=user_id, email=f"u{user_id}@example.com", password="x") for user_id in (1, 2)])
+        db.commit()
+    maintenance = ChatHistoryMaintenance(factory, interval_seconds=0, batch_size=2, pause_seconds=0)
+    monkeypatch.setattr(chat_history_service, "history_maintenance", maintenance)
+    yield factory
+    maintenance.close(5)
+
+
+def stored(factory, model, user_id):
+    with factory() as db:
+        return db.scalar(select(func.count()).select_from(model).where(model.user_id == user_id))
+
+
+def add_messages(factory, user_id, count, age_days):
+    created_at = datetime.now(timezone.utc) - timedelta(days=age_days)
+    with factory() as db:
+        db.add_all([
+            ChatMessage(user_id=user_id, session_id=str(user_id), message_type="user", content=f"m{i}", created_at=created_at)
+            for i in range(count)
+        ])
+        db.commit()
+
+
+def test_clear_hides_history_at_once_and_deletes_it_in_batches(session_factory):
+    with session_factory() as db:
+        history = ChatHistoryService(db)
+        for i in range(3):
+            history.save_turn(1, "1", f"q{i}", f"r{i}")
+        history.save_turn(2, "2", "q", "r")
+
+        history.clear_history(1)
+        assert history.get_history(1) == []
+        assert history.get_history_page(1) == ([], None)
+        assert history.get_recent_history_as_dict(1, "1") == []
+        history.save_turn(1, "1", "again", "ok")
+        assert [m.content for m in history.get_history(1)] == ["again", "ok"]
+        assert history.get_message_count(1) == 2
+
+    assert chat_history_service.history_maintenance.wait_idle(5)
+    assert stored(session_factory, ChatMessage, 1) == 2
+    assert stored(session_factory, ChatMessage, 2) == 2
+    assert chat_history_service.history_maintenance.stats()["deleted"] == 6
+
+
+def test_retention_pass_finishes_interrupted_clears(session_factory):
+    add_messages(session_factory, 1, 5, age_days=0)
+    with session_factory() as db:
+        mark_cleared(db, 1)
+        db.commit()
+
+    assert run_retention(session_factory, batch_size=2)["cleared"] == 5
+    assert stored(session_factory, ChatMessage, 1) == 0
+
+
+def test_expired_messages_move_to_archive_and_expire_from_it(session_factory):
+    add_messages(session_factory, 1, 3, age_days=40)
+    add_messages(session_factory, 1, 2, age_days=0)
+    add_messages(session_factory, 2, 2, age_days=40)
+    with session_factory() as db:
+        assert ChatHistoryService(db).get_message_count(1) == 5
+        mark_cleared(db, 2)
+        db.commit()
+
+    result = run_retention(session_factory, retention_days=30, batch_size=2)
+    assert result == {"cleared": 2, "archived": 3, "purged": 0}
+    assert stored(session_factory, ChatMessage, 1) == 2
+    assert stored(session_factory, ChatMessageArchive, 1) == 3
+    assert stored(session_factory, ChatMessageArchive, 2) == 0
+    with session_factory() as db:
+        assert ChatHistoryService(db).get_message_count(1) == 2
+
+    assert run_retention(session_factory, retention_days=30, archive_retention_days=30)["purged"] == 3
+    assert stored(session_factory, ChatMessageArchive, 1) == 0
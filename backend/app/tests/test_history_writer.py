@@ -0,0 +1,65 @@
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.chat_message import ChatMessage
+from app.models.chat_message_count import ChatMessageCount
+from app.models.user import User
+from app.services.chat.history_writer import ChatHistoryWriter, message_row
+from db.session import Base
+
+
+def make_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[User.__table__, ChatMessage.__table__, ChatMessageCount.__table__])
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def stored(session_factory):
+    with session_factory() as db:
+        return [(m.session_id, m.content) for m in db.query(ChatMessage).order_by(ChatMessage.id)]
+
+
+def test_turns_are_written_in_order_in_batches():
+    session_factory = make_session_factory()
+    writer = ChatHistoryWriter(session_factory, enabled=True, batch_size=100, flush_interval_seconds=0.05)
+    for i in range(5):
+        writer.enqueue([message_row(1, "user", f"q{i}", "a"), message_row(1, "assistant", f"r{i}", "a")])
+        writer.enqueue([message_row(2, "user", f"q{i}", "b")])
+
+    assert writer.flush(timeout=5)
+    rows = stored(session_factory)
+    assert [content for session, content in rows if session == "a"] == [c for i in range(5) for c in (f"q{i}", f"r{i}")]
+    assert [content for session, content in rows if session == "b"] == [f"q{i}" for i in range(5)]
+    assert writer.stats()["written"] == 15
+    writer.close(timeout=5)
+
+
+def test_failing_batch_falls_back_to_single_rows():
+    session_factory = make_session_factory()
+    calls = []
+
+    class FlakySession:
+        def __init__(self):
+            self.db = session_factory()
+
+        def execute(self, statement, rows=None):
+            if rows is None:
+                return self.db.execute(statement)
+            calls.append(len(rows))
+            if len(rows) > 1 or rows[0]["content"] == "bad":
+                raise OperationalError("INSERT", {}, Exception("database is locked"))
+            return self.db.execute(statement, rows)
+
+        def __getattr__(self, name):
+            return getattr(self.db, name)
+
+    writer = ChatHistoryWriter(FlakySession, enabled=True, max_retries=1, retry_backoff_seconds=0)
+    writer.enqueue([message_row(1, "user", text, "a") for text in ("first", "bad", "last")])
+
+    assert writer.flush(timeout=5)
+    assert calls == [3, 3, 1, 1, 1]
+    assert stored(session_factory) == [("a", "first"), ("a", "last")]
+    assert writer.stats()["dropped"] == 1
+    writer.close(timeout=5)
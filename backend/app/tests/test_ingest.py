@@ -0,0 +1,199 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+import app.rag.ingest as ingest
+from app.rag.ingest import IngestCheckpoint, RateLimiter, ingest_products
+
+PRODUCTS = [
+    (prod_id, f"Product {prod_id}", "Acme", f"Feature {prod_id}", float(prod_id), prod_id % 3, ["tools"])
+    for prod_id in range(1, 13)
+]
+
+
+class StubStore:
+    """In-memory stand-in for a vector store module; ``fail_on_add`` raises on that call."""
+
+    def __init__(self, fail_on_add=None):
+        self.fail_on_add = fail_on_add
+        self.adds = []
+        self.docs = {}
+        self.flushes = 0
+        self.buffered_updates = 0
+        self.deleted = []
+
+    def add_embedded_documents(self, docs, vectors):
+        if len(self.adds) + 1 == self.fail_on_add:
+            raise RuntimeError("disk full")
+        self.adds.append([d["id"] for d in docs])
+        for doc in docs:
+            self.docs[doc["id"]] = doc["metadata"]
+
+    def update_metadata(self, ids, metadatas, persist=True):
+        assert persist is False
+        self.buffered_updates += 1
+        self.docs.update(zip(ids, metadatas))
+
+    def flush(self):
+        self.flushes += 1
+
+    def get_indexed_metadata(self, ids):
+        return {doc_id: self.docs[doc_id] for doc_id in ids if doc_id in self.docs}
+
+    def iter_indexed_ids(self, batch_size):
+        ids = list(self.docs)
+        for start in range(0, len(ids), batch_size):
+            yield ids[start:start + batch_size]
+
+    def delete_documents(self, ids):
+        self.deleted.extend(ids)
+        for doc_id in ids:
+            self.docs.pop(doc_id)
+
+
+class StubEmbeddings:
+    """Records embedded texts and peak concurrency; ``delays`` maps a text to a sleep."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.texts = []
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.texts.extend(texts)
+        time.sleep(max(self.delays.get(text, 0.0) for text in texts))
+        with self._lock:
+            self.active -= 1
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.fixture
+def catalog(monkeypatch, tmp_path):
+    """Serve ``PRODUCTS`` as the products table and return a function that runs an ingest."""
+    products = list(PRODUCTS)
+    bumps = []
+
+    def iter_product_rows(batch_size, after_id=0):
+        rows = [row for row in products if row[0] > after_id]
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    def find_stale_ids(store, batch_size):
+        existing = {str(row[0]) for row in products}
+        return [doc_id for page in store.iter_indexed_ids(batch_size) for doc_id in page if doc_id not in existing]
+
+    monkeypatch.setattr(ingest, "iter_product_rows", iter_product_rows)
+    monkeypatch.setattr(ingest, "find_stale_ids", find_stale_ids)
+    monkeypatch.setattr(ingest, "bump_catalog_version", lambda: bumps.append(1))
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+
+    def run(store, model, **kwargs):
+        monkeypatch.setattr(ingest, "get_store_module", lambda backend=None: store)
+        monkeypatch.setattr(ingest, "embeddings", model)
+        options = dict(batch_size=2, max_workers=2, requests_per_second=0, flush_every_batches=1, checkpoint_path=checkpoint_path)
+        options.update(kwargs)
+        return ingest_products(**options)
+
+    run.products = products
+    run.bumps = bumps
+    run.checkpoint = IngestCheckpoint(checkpoint_path)
+    return run
+
+
+def product_ids(texts):
+    return [int(text.split()[1]) for text in texts]
+
+
+def test_crashed_run_resumes_after_the_checkpoint(catalog):
+    store = StubStore(fail_on_add=4)
+    first = StubEmbeddings()
+    with pytest.raises(RuntimeError):
+        catalog(store, first)
+
+    # Three batches of two were written and flushed before the fourth write failed.
+    assert catalog.checkpoint.load() == 6
+    assert [doc_id for batch in store.adds for doc_id in batch] == [str(i) for i in range(1, 7)]
+
+    store.fail_on_add = None
+    second = StubEmbeddings()
+    stats = catalog(store, second)
+
+    assert min(product_ids(second.texts)) == 7
+    written = Counter(doc_id for batch in store.adds for doc_id in batch)
+    assert written == Counter(str(row[0]) for row in PRODUCTS)
+    embedded = Counter(product_ids(first.texts) + product_ids(second.texts))
+    assert all(embedded[prod_id] == 1 for prod_id in range(1, 7))
+    assert stats["embedded"] == 6
+    assert catalog.checkpoint.load() is None
+
+
+def test_batches_are_committed_in_id_order_when_embeddings_finish_out_of_order(catalog, monkeypatch):
+    saved = []
+    save = IngestCheckpoint.save
+    monkeypatch.setattr(IngestCheckpoint, "save", lambda self, last_id, stats: (saved.append(last_id), save(self, last_id, stats)))
+    store = StubStore()
+    # The first batch is the slowest, so later batches finish before it.
+    model = StubEmbeddings(delays={"Product 1 Acme Feature 1": 0.2, "Product 3 Acme Feature 3": 0.1})
+
+    catalog(store, model, max_workers=3)
+
+    assert store.adds == [[str(i), str(i + 1)] for i in range(1, 13, 2)]
+    assert saved == sorted(saved) and saved[-1] == 12
+    assert model.peak <= 3
+
+
+def test_embedding_calls_are_bounded_by_max_workers(catalog):
+    model = StubEmbeddings(delays={f"Product {i} Acme Feature {i}": 0.05 for i in range(1, 13)})
+
+    catalog(StubStore(), model, max_workers=2, batch_size=1)
+
+    assert model.peak == 2
+
+
+def test_price_refresh_buffers_updates_and_bumps_once_per_flush(catalog):
+    store = StubStore()
+    catalog(store, StubEmbeddings())
+    catalog.products[:] = [row[:4] + (row[4] + 1,) + row[5:] for row in PRODUCTS]
+    catalog.bumps.clear()
+    store.flushes = 0
+    model = StubEmbeddings()
+
+    stats = catalog(store, model, flush_every_batches=3)
+
+    assert model.texts == []
+    assert stats["metadata_updated"] == 12
+    assert store.buffered_updates == 6
+    assert store.flushes == len(catalog.bumps) == 2
+    assert store.get_indexed_metadata(["1"])["1"]["price"] == 2.0
+
+
+def test_products_removed_from_the_catalog_are_deleted(catalog):
+    store = StubStore()
+    catalog(store, StubEmbeddings())
+    del catalog.products[-2:]
+
+    stats = catalog(store, StubEmbeddings())
+
+    assert stats["deleted"] == 2
+    assert sorted(store.deleted) == ["11", "12"]
+
+
+def test_rate_limiter_spaces_requests(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(ingest.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(ingest.time, "sleep", lambda seconds: clock.__setitem__(0, clock[0] + seconds))
+    limiter = RateLimiter(rate=4, burst=2)
+
+    for _ in range(6):
+        limiter.acquire()
+
+    # Two requests use the burst, the other four wait a quarter second each.
+    assert clock[0] == pytest.approx(1.0)
+    RateLimiter(rate=0).acquire()
+    assert clock[0] == pytest.approx(1.0)
@@ -0,0 +1,36 @@
+from langchain_core.documents import Document
+from app.rag.lexical_index import BM25Index, tokenize
+from app.rag.retriever import reciprocal_rank_fusion
+
+ROWS = [
+    (1, "Ender 3 Pro", "Creality", "3D printer;Magnetic bed;220x220x250mm", 239.0, 12),
+    (2, "WH-1000XM5", "Sony", "Noise cancelling;Bluetooth;30h battery", 399.0, 5),
+    (3, "QuietComfort 45", "Bose", "Noise cancelling;Bluetooth headphones", 329.0, 0),
+    (4, "Ender 5 S1", "Creality", "3D printer;Direct drive", 459.0, 3),
+]
+
+
+def test_tokenize_keeps_model_numbers_searchable():
+    assert tokenize("WH-1000XM5") == ["wh", "1000xm5", "wh1000xm5"]
+    assert tokenize("Ender 3 Pro") == ["ender", "3", "pro"]
+
+
+def test_exact_model_number_ranks_first():
+    index = BM25Index.from_rows(ROWS)
+
+    assert index.search("sony wh1000xm5", k=2)[0][0].id == "2"
+    assert index.search("Ender 3 Pro", k=2)[0][0].id == "1"
+    assert index.search("unrelated", k=2) == []
+
+
+def test_documents_match_vector_store_ids_and_metadata():
+    doc, _ = BM25Index.from_rows(ROWS).search("bose", k=1)[0]
+    assert doc.id == "3"
+    assert doc.metadata["price"] == 329.0
+    assert doc.metadata["quantity"] == 0
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = (Document(id=doc_id, page_content=doc_id) for doc_id in "abc")
+    fused = reciprocal_rank_fusion([[a, b, c], [b]], k=2)
+    assert [doc.id for doc in fused] == ["b", "a"]
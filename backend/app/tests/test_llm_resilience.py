@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from app.exceptions.llm_exceptions import CircuitOpenException
+from app.llm.resilience import CircuitBreaker, ResilientChatModel
+
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+
+class FlakyModel:
+    def __init__(self, failures, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise connection_error()
+        return "ok"
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return "ok"
+
+
+def make_client(model, **kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker(failure_threshold=3, reset_timeout_seconds=0.05))
+    return ResilientChatModel(lambda: model, backoff_seconds=0, **kwargs)
+
+
+def test_retryable_errors_are_retried():
+    model = FlakyModel(failures=2)
+    assert make_client(model, max_retries=2).invoke([]) == "ok"
+    assert model.calls == 3
+
+
+def test_circuit_opens_then_probes_after_reset():
+    model = FlakyModel(failures=3)
+    client = make_client(model, max_retries=0)
+    for _ in range(3):
+        with pytest.raises(openai.APIConnectionError):
+            client.invoke([])
+
+    with pytest.raises(CircuitOpenException):
+        client.invoke([])
+    assert model.calls == 3
+
+    time.sleep(0.06)
+    assert client.invoke([]) == "ok"
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_async_deadline_counts_as_failure():
+    client = make_client(FlakyModel(failures=0, delay=0.2), timeout_seconds=0.01, max_retries=1)
+    with pytest.raises(TimeoutError):
+        asyncio.run(client.ainvoke([]))
+    assert client.breaker.stats()["consecutive_failures"] == 2
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.chat_message import ChatMessage
+from app.models.chat_message_count import ChatMessageCount
+from app.models.chat_session_summary import ChatSessionSummary
+from app.models.user import User
+from app.services.chat import chat_history_service
+from app.services.chat.chat_history_service import ChatHistoryService
+from app.services.chat.history_retention import ChatHistoryMaintenance
+from app.services.chat.message_counter import increment_message_count, reconcile_message_counts, reconcile_user
+from db.session import Base
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, ChatMessage.__table__, ChatSessionSummary.__table__, ChatMessageCount.__table__
+    ])
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as db:
+        db.add_all([User(id=user_id, email=f"u{user_id}@example.com", password="x") for user_id in (1, 2)])
+        db.commit()
+    monkeypatch.setattr(chat_history_service, "history_maintenance", ChatHistoryMaintenance(factory, interval_seconds=0))
+    return factory
+
+
+def test_counter_follows_inserts_and_clear(session_factory):
+    with session_factory() as db:
+        history = ChatHistoryService(db)
+        history.save_turn(1, "1", "q1", "r1")
+        history.save_message(1, "user", "q2", "1")
+        assert history.get_message_count(1) == 3
+
+        history.clear_history(1)
+        # The background deletion shares the single sqlite connection; let it finish first.
+        assert chat_history_service.history_maintenance.wait_idle(5)
+        assert history.get_message_count(1) == 0
+        history.save_turn(1, "1", "q3", "r3")
+        assert history.get_message_count(1) == 2
+
+
+def test_existing_messages_are_counted_once_on_first_use(session_factory):
+    with session_factory() as db:
+        db.add_all([ChatMessage(user_id=2, session_id="2", message_type="user", content=f"m{i}") for i in range(5)])
+        db.commit()
+        history = ChatHistoryService(db)
+        assert history.get_message_count(2) == 5
+        history.save_turn(2, "2", "q", "r")
+        assert history.get_message_count(2) == 7
+
+
+def test_reconciliation_repairs_drift(session_factory):
+    with session_factory() as db:
+        ChatHistoryService(db).save_turn(1, "1", "q1", "r1")
+        db.execute(update(ChatMessageCount).values(message_count=42))
+        db.commit()
+
+    assert reconcile_message_counts(session_factory) == {"checked": 2, "repaired": 1}
+    with session_factory() as db:
+        assert ChatHistoryService(db).get_message_count(1) == 2
+        assert ChatHistoryService(db).get_message_count(2) == 0
+
+
+def test_message_committed_below_the_clear_watermark_is_not_counted(session_factory):
+    with session_factory() as db:
+        history = ChatHistoryService(db)
+        history.save_turn(1, "1", "q1", "r1")
+        db.add(ChatMessage(id=10, user_id=2, session_id="2", message_type="user", content="newest"))
+        db.commit()
+        history.clear_history(1)
+        assert chat_history_service.history_maintenance.wait_idle(5)
+
+        # A write-behind batch that took id 5 from the sequence before the clear and commits after it.
+        db.add(ChatMessage(id=5, user_id=1, session_id="1", message_type="user", content="late"))
+        db.flush()
+        increment_message_count(db, 1, [5])
+        db.commit()
+        assert history.get_message_count(1) == 0
+        history.save_message(1, "user", "after", "1")
+        assert history.get_message_count(1) == 1
+        assert reconcile_user(db, 1) is False
@@ -0,0 +1,106 @@
+import numpy as np
+from langchain_core.embeddings.fake import DeterministicFakeEmbedding
+from app.rag.numpy_store import NumpyVectorStore
+from app.rag.vector_math import mmr_select
+
+
+def make_store(tmp_path):
+    return NumpyVectorStore(str(tmp_path / "numpy"), DeterministicFakeEmbedding(size=16), search_batch_rows=3)
+
+
+def test_search_matches_brute_force(tmp_path):
+    store = make_store(tmp_path)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(10, 16)).astype(np.float32)
+    store.add_embeddings([str(i) for i in range(10)], [f"product {i}" for i in range(10)], vectors, [{"price": i} for i in range(10)])
+
+    query = rng.normal(size=16).astype(np.float32)
+    results = store.similarity_search_by_vector_with_relevance_scores(query.tolist(), k=4)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:4]
+    assert [doc.id for doc, _ in results] == [str(i) for i in expected]
+    assert [score for _, score in results] == sorted(score for _, score in results)
+
+
+def test_upsert_delete_and_reload(tmp_path):
+    store = make_store(tmp_path)
+    store.add_texts(["Arduino Uno", "DJI Drone"], metadatas=[{"price": 25.0}, {"price": 759.0}], ids=["1", "4"])
+    store.add_texts(["Arduino Uno R3"], metadatas=[{"price": 20.0}], ids=["1"])
+    store.delete(ids=["4"])
+
+    reloaded = make_store(tmp_path)
+    doc, score = reloaded.similarity_search_with_score("Arduino Uno R3", k=1)[0]
+    assert len(reloaded) == 1
+    assert doc.id == "1"
+    assert doc.metadata["price"] == 20.0
+    assert score < 1e-5
+
+
+def test_mmr_rerank_skips_near_duplicates(tmp_path):
+    store = make_store(tmp_path)
+    vectors = np.array([[1.0, 0.0, 0.0], [0.99, 0.01, 0.0], [0.8, 0.6, 0.0]], dtype=np.float32)
+    store.add_embeddings(["a7-body", "a7-kit", "drone"], ["Sony A7 IV body", "Sony A7 IV kit", "DJI Mini 3"], vectors)
+
+    hits = store.similarity_search_by_vector_with_embeddings([1.0, 0.0, 0.0], k=3)
+    candidates = np.stack([vector for _, _, vector in hits])
+
+    assert [hits[i][0].id for i in mmr_select(np.array([1.0, 0.0, 0.0]), candidates, 2, lambda_mult=1.0)] == ["a7-body", "a7-kit"]
+    assert [hits[i][0].id for i in mmr_select(np.array([1.0, 0.0, 0.0]), candidates, 2, lambda_mult=0.3)] == ["a7-body", "drone"]
+
+
+def test_metadata_lookup_and_id_pages(tmp_path):
+    store = make_store(tmp_path)
+    store.add_texts(["a", "b", "c"], metadatas=[{"price": 1.0}, {"price": 2.0}, {"price": 3.0}], ids=["1", "2", "3"])
+
+    assert store.get_metadata(["3", "1", "missing"]) == {"3": {"price": 3.0}, "1": {"price": 1.0}}
+    assert list(store.iter_ids(batch_size=2)) == [["1", "2"], ["3"]]
+
+
+def test_writes_append_to_the_journal_and_reload_to_the_same_state(tmp_path):
+    store = NumpyVectorStore(str(tmp_path / "numpy"), DeterministicFakeEmbedding(size=16), compact_ratio=100)
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(4, 16)).astype(np.float32)
+    store.add_embeddings(["1", "2"], ["a", "b"], vectors[:2], [{"price": 1.0}, {"price": 2.0}])
+    index_path = tmp_path / "numpy" / "index.json"
+    written = index_path.read_text()
+
+    store.add_embeddings(["2", "3"], ["b2", "c"], vectors[2:], [{"price": 2.5}, {"price": 3.0}])
+    store.update_metadata(["1", "missing"], [{"price": 0.5}, {"price": 9.0}])
+
+    assert index_path.read_text() == written
+    reloaded = NumpyVectorStore(str(tmp_path / "numpy"), DeterministicFakeEmbedding(size=16))
+    for current in (store, reloaded):
+        snapshot = current._snapshot
+        assert snapshot.ids == ["1", "2", "3"]
+        assert snapshot.texts == ["a", "b2", "c"]
+        assert [metadata["price"] for metadata in snapshot.metadatas] == [0.5, 2.5, 3.0]
+        assert np.allclose(snapshot.matrix[1:], vectors[2:] / np.linalg.norm(vectors[2:], axis=1, keepdims=True))
+
+
+def test_partial_journal_record_is_ignored_and_compaction_folds_the_journal(tmp_path):
+    store = NumpyVectorStore(str(tmp_path / "numpy"), DeterministicFakeEmbedding(size=16), compact_ratio=100)
+    store.add_texts(["a", "b"], metadatas=[{"price": 1.0}, {"price": 2.0}], ids=["1", "2"])
+    store.update_metadata(["1"], [{"price": 1.5}])
+    with open(tmp_path / "numpy" / store._journal_name, "ab") as journal:
+        journal.write(b'{"ids": ["2"], "texts": null, "metad')
+
+    reloaded = NumpyVectorStore(str(tmp_path / "numpy"), DeterministicFakeEmbedding(size=16), compact_ratio=0)
+    assert reloaded.get_metadata(["1", "2"]) == {"1": {"price": 1.5}, "2": {"price": 2.0}}
+    reloaded.update_metadata(["2"], [{"price": 2.5}])
+
+    assert reloaded._journal_bytes == 0
+    assert make_store(tmp_path).get_metadata(["1", "2"]) == {"1": {"price": 1.5}, "2": {"price": 2.5}}
+    assert sorted(path.name for path in (tmp_path / "numpy").iterdir()) == ["index.json", "vectors-1.f32"]
+
+
+def test_buffered_metadata_updates_are_written_on_flush(tmp_path):
+    store = make_store(tmp_path)
+    store.add_texts(["a", "b"], metadatas=[{"price": 1.0}, {"price": 2.0}], ids=["1", "2"])
+    store.update_metadata(["1"], [{"price": 1.5}], persist=False)
+    store.add_embeddings(["3"], ["c"], [np.ones(16)], [{"price": 3.0}], persist=False)
+    store.update_metadata(["3"], [{"price": 3.5}], persist=False)
+
+    assert make_store(tmp_path).get_metadata(["1", "3"]) == {"1": {"price": 1.0}}
+    store.flush()
+    assert make_store(tmp_path).get_metadata(["1", "3"]) == {"1": {"price": 1.5}, "3": {"price": 3.5}}
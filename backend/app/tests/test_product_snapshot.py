@@ -0,0 +1,51 @@
+from langchain_core.documents import Document
+from app.services.product.product_snapshot import ProductSnapshotCache
+
+DOCS = [
+    Document(id="1", page_content="Ender 3 Pro", metadata={"price": 239.0, "quantity": 12}),
+    Document(id="2", page_content="WH-1000XM5", metadata={"price": 399.0, "quantity": 5}),
+    Document(id="3", page_content="QuietComfort 45", metadata={"price": 329.0, "quantity": 2}),
+]
+
+
+class FakeLoader:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def __call__(self, product_ids):
+        self.calls.append(sorted(product_ids))
+        return {str(i): self.rows[i] for i in product_ids if i in self.rows}
+
+
+def test_overlay_uses_one_batched_lookup_and_caches():
+    loader = FakeLoader({1: {"price": 199.0, "quantity": 3}, 2: {"price": 399.0, "quantity": 0}})
+    cache = ProductSnapshotCache(loader)
+
+    docs = cache.overlay(DOCS)
+    cache.overlay(DOCS)
+
+    assert loader.calls == [[1, 2, 3]]
+    assert [(doc.metadata["price"], doc.metadata["quantity"]) for doc in docs] == [(199.0, 3), (399.0, 0), (329.0, 0)]
+    assert DOCS[0].metadata["price"] == 239.0
+
+
+def test_invalidate_reloads_only_changed_products():
+    rows = {1: {"price": 199.0, "quantity": 3}, 2: {"price": 399.0, "quantity": 5}}
+    loader = FakeLoader(rows)
+    cache = ProductSnapshotCache(loader)
+    cache.overlay(DOCS[:2])
+
+    rows[1] = {"price": 149.0, "quantity": 1}
+    cache.invalidate([1])
+
+    assert cache.overlay(DOCS[:2])[0].metadata["price"] == 149.0
+    assert loader.calls == [[1, 2], [1]]
+
+
+def test_failed_lookup_falls_back_to_indexed_metadata():
+    def failing_loader(product_ids):
+        raise RuntimeError("database unavailable")
+
+    docs = ProductSnapshotCache(failing_loader).overlay(DOCS)
+    assert [doc.metadata["price"] for doc in docs] == [239.0, 399.0, 329.0]
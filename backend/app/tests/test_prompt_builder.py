@@ -0,0 +1,50 @@
+from langchain_core.documents import Document
+from app.llm.tokenizer import estimate_message_tokens, estimate_tokens, truncate_to_tokens
+from app.services.chat.prompt_builder import build_chat_prompt, fit_history
+
+DOCS = [
+    Document(id=str(i), page_content=f"Product {i} " + "feature " * 40, metadata={"price": 10.0 * i, "quantity": i})
+    for i in range(1, 6)
+]
+
+
+def test_truncate_to_tokens_respects_limit():
+    text = "noise cancelling headphones " * 50
+    truncated = truncate_to_tokens(text, 20)
+    assert estimate_tokens(truncated) <= 20
+    assert truncated.endswith("...")
+    assert truncate_to_tokens("short text", 20) == "short text"
+
+
+def test_oldest_turns_are_dropped_first():
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "word " * 60} for i in range(10)]
+    kept = fit_history(history, 250)
+    assert kept[-1]["content"] == history[-1]["content"]
+    assert len(kept) < len(history)
+    assert kept[0]["content"].startswith(f"turn {10 - len(kept)} ")
+
+
+def test_prompt_fits_budget_and_keeps_best_documents():
+    history = [{"role": "user", "content": "tell me more " * 200}] * 10
+    messages = build_chat_prompt(DOCS, "Any cheap products?", history, token_budget=600)
+
+    assert estimate_message_tokens(messages) <= 600
+    assert messages[0]["role"] == "system"
+    assert messages[-1]["content"] == "Any cheap products?"
+    context = next(m["content"] for m in messages if m["content"].startswith("Relevant context:"))
+    assert "Product 1 " in context
+    assert "Product 5 " not in context
+
+
+def test_zero_budget_disables_trimming():
+    history = [{"role": "user", "content": "tell me more " * 200}] * 3
+    messages = build_chat_prompt(DOCS, "hi", history, token_budget=0)
+    assert len(messages) == 1 + 3 + 1 + 1
+
+
+def test_session_summary_is_never_dropped():
+    summary = {"role": "system", "content": "Summary of the earlier conversation:\nWants a drone under $800."}
+    history = [summary] + [{"role": "user", "content": "word " * 100}] * 4
+    kept = fit_history(history, 150)
+    assert kept[0] == summary
+    assert len(kept) < len(history)
@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.llm.client as llm_client
+from app.llm.fake import FakeChatModel
+from app.models.chat_message import ChatMessage
+from app.models.chat_message_count import ChatMessageCount
+from app.models.chat_session_summary import ChatSessionSummary
+from app.models.user import User
+from app.services.chat.chat_history_service import SUMMARY_PREFIX, ChatHistoryService
+from app.services.chat.history_cache import history_cache
+from app.services.chat.session_summarizer import SessionSummarizer
+from db.session import Base
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    # The echo model returns the summarization prompt, so the stored summary shows what was folded.
+    monkeypatch.setattr(llm_client, "llm", FakeChatModel(mode="echo"))
+    history_cache.invalidate_user(1)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, ChatMessage.__table__, ChatMessageCount.__table__, ChatSessionSummary.__table__
+    ])
+    factory = sessionmaker(bind=engine, autoflush=False)
+    session = factory()
+    session.add(User(id=1, email="u1@example.com", password="x"))
+    session.commit()
+    session.close()
+    yield factory
+    history_cache.invalidate_user(1)
+
+
+def save_turns(factory, first, count):
+    """Save ``count`` turns numbered from ``first`` and return the ids of their messages."""
+    db = factory()
+    try:
+        history = ChatHistoryService(db)
+        for i in range(first, first + count):
+            history.save_turn(1, "s", f"question {i}", f"answer {i}")
+        return [message.id for message in history.get_messages_after(1, "s")]
+    finally:
+        db.close()
+
+
+def load_summary(factory):
+    db = factory()
+    try:
+        row = ChatHistoryService(db).get_summary(1, "s")
+        return (row.summary, row.last_message_id) if row is not None else None
+    finally:
+        db.close()
+
+
+def prompt_history(factory):
+    db = factory()
+    try:
+        return ChatHistoryService(db).get_prompt_history_as_dict(1, "s", limit=10)
+    finally:
+        db.close()
+
+
+def test_update_folds_messages_older_than_keep_recent(session_factory):
+    ids = save_turns(session_factory, 0, 3)
+    summarizer = SessionSummarizer(session_factory, keep_recent=2, min_new_messages=4)
+
+    assert asyncio.run(summarizer.update(1, "s")) is True
+
+    text, last_message_id = load_summary(session_factory)
+    assert last_message_id == ids[3]
+    assert "Current summary:\n(none)" in text
+    assert "user: question 1\nassistant: answer 1" in text
+    assert "question 2" not in text
+    history = prompt_history(session_factory)
+    assert history == [
+        {"role": "system", "content": SUMMARY_PREFIX + text},
+        {"role": "user", "content": "question 2"},
+        {"role": "assistant", "content": "answer 2"}
+    ]
+
+
+def test_update_waits_for_enough_new_messages_and_builds_on_the_summary(session_factory):
+    ids = save_turns(session_factory, 0, 3)
+    summarizer = SessionSummarizer(session_factory, keep_recent=2, min_new_messages=4)
+    asyncio.run(summarizer.update(1, "s"))
+    first, _ = load_summary(session_factory)
+
+    # Only the two unfolded messages are older than keep_recent after one more turn.
+    ids = save_turns(session_factory, 3, 1)
+    assert asyncio.run(summarizer.update(1, "s")) is False
+    assert load_summary(session_factory) == (first, ids[3])
+
+    ids = save_turns(session_factory, 4, 1)
+    assert asyncio.run(summarizer.update(1, "s")) is True
+    text, last_message_id = load_summary(session_factory)
+    assert last_message_id == ids[7]
+    assert text.startswith("Current summary:\n" + first)
+    assert text.endswith("New messages:\nuser: question 2\nassistant: answer 2\nuser: question 3\nassistant: answer 3")
+    assert [m["content"] for m in prompt_history(session_factory)[1:]] == ["question 4", "answer 4"]
+
+
+def test_save_summary_never_moves_the_covered_range_back(session_factory):
+    ids = save_turns(session_factory, 0, 2)
+    db = session_factory()
+    try:
+        history = ChatHistoryService(db)
+        history.save_summary(1, "s", "newer", ids[3])
+        history.save_summary(1, "s", "older", ids[1])
+        history.save_summary(1, "s", "same", ids[3])
+    finally:
+        db.close()
+
+    assert load_summary(session_factory) == ("newer", ids[3])
+    assert prompt_history(session_factory) == [{"role": "system", "content": SUMMARY_PREFIX + "newer"}]
+
+
+def test_concurrent_schedules_collapse_into_one_more_pass(session_factory):
+    save_turns(session_factory, 0, 4)
+    calls = []
+
+    async def summarize(summary, messages, max_tokens):
+        calls.append([message["content"] for message in messages])
+        await release.wait()
+        return f"summary {len(calls)}"
+
+    summarizer = SessionSummarizer(session_factory, summarize=summarize, keep_recent=2, min_new_messages=2)
+
+    async def scenario():
+        summarizer.schedule(1, "s")
+        await asyncio.sleep(0.05)
+        # Turns finishing while the first pass runs queue a single rerun.
+        save_turns(session_factory, 4, 2)
+        for _ in range(3):
+            summarizer.schedule(1, "s")
+        assert len(summarizer._tasks) == 1
+        release.set()
+        await summarizer.wait_idle()
+
+    release = asyncio.Event()
+    asyncio.run(scenario())
+
+    assert len(calls) == 2
+    assert calls[0][-1] == "answer 2"
+    assert calls[1] == ["question 3", "answer 3", "question 4", "answer 4"]
+    assert load_summary(session_factory)[0] == "summary 2"
+    assert not summarizer._running and not summarizer._pending
+
+
+def test_failed_summary_is_logged_and_retried_on_the_next_schedule(session_factory):
+    save_turns(session_factory, 0, 3)
+    attempts = []
+
+    async def summarize(summary, messages, max_tokens):
+        attempts.append(len(messages))
+        if len(attempts) == 1:
+            raise RuntimeError("LLM unavailable")
+        return "recovered"
+
+    summarizer = SessionSummarizer(session_factory, summarize=summarize, keep_recent=2, min_new_messages=4)
+
+    async def scenario():
+        summarizer.schedule(1, "s")
+        await summarizer.wait_idle()
+        assert load_summary(session_factory) is None
+        summarizer.schedule(1, "s")
+        await summarizer.wait_idle()
+
+    asyncio.run(scenario())
+
+    assert attempts == [4, 4]
+    assert load_summary(session_factory)[0] == "recovered"
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "answer"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+
+
+def test_async_error_reaches_every_caller_and_is_not_cached():
+    flight = AsyncSingleFlight("test")
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        with pytest.raises(RuntimeError):
+            await flight.do("key", failing)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_async_cancelling_one_caller_keeps_the_shared_call():
+    flight = AsyncSingleFlight("test")
+    started = []
+
+    async def slow():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        first = asyncio.create_task(flight.do("key", slow))
+        second = asyncio.create_task(flight.do("key", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "answer"
+        assert first.cancelled()
+
+    asyncio.run(main())
+    assert len(started) == 1
+
+
+def test_async_cancelling_every_caller_cancels_upstream():
+    flight = AsyncSingleFlight("test")
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "answer"
+
+    async def main():
+        caller = asyncio.create_task(flight.do("key", slow))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.08)
+        assert await flight.do("key", slow) == "answer"
+
+    asyncio.run(main())
+    assert finished == [1]
@@ -0,0 +1,48 @@
+import pytest
+
+from app.rag.seed_vector_db import build_document, plan_sync
+
+ARDUINO = (1, "Arduino Uno R3", "Arduino", "Microcontroller;USB", 25.0, 50, ["electronics"])
+DRONE = (4, "DJI Mini 3 Pro", "DJI", "4K Camera;34min Flight", 759.0, 8, ["drones"])
+
+
+def indexed(*products):
+    return {doc["id"]: doc["metadata"] for doc in (build_document(*product) for product in products)}
+
+
+def changed(product, **fields):
+    names = ("prod_id", "name", "brand", "features", "price", "quantity", "categories")
+    values = dict(zip(names, product))
+    values.update(fields)
+    return tuple(values[name] for name in names)
+
+
+@pytest.mark.parametrize("catalog, index, expected", [
+    # expected: (ids to embed, ids to update, ids to delete, unchanged count)
+    ([ARDUINO, DRONE], indexed(ARDUINO, DRONE), ([], [], [], 2)),
+    ([ARDUINO, DRONE], indexed(ARDUINO), (["4"], [], [], 1)),
+    ([changed(ARDUINO, name="Arduino Uno R4"), DRONE], indexed(ARDUINO, DRONE), (["1"], [], [], 1)),
+    ([changed(ARDUINO, features="Microcontroller;USB-C"), DRONE], indexed(ARDUINO, DRONE), (["1"], [], [], 1)),
+    ([changed(ARDUINO, price=19.99), DRONE], indexed(ARDUINO, DRONE), ([], ["1"], [], 1)),
+    ([ARDUINO, changed(DRONE, quantity=0)], indexed(ARDUINO, DRONE), ([], ["4"], [], 1)),
+    ([ARDUINO, changed(DRONE, categories=["drones", "cameras"])], indexed(ARDUINO, DRONE), ([], ["4"], [], 1)),
+    ([ARDUINO], indexed(ARDUINO, DRONE), ([], [], ["4"], 1)),
+    ([ARDUINO], {**indexed(ARDUINO), "0b6f3c1e-legacy": {"price": 1.0}}, ([], [], ["0b6f3c1e-legacy"], 1)),
+], ids=["unchanged", "new", "name", "features", "price", "stock", "categories", "removed", "legacy-id"])
+def test_plan_sync_classifies_products(catalog, index, expected):
+    plan = plan_sync([build_document(*product) for product in catalog], index)
+
+    assert (
+        [doc["id"] for doc in plan.to_embed],
+        [doc["id"] for doc in plan.to_update],
+        plan.to_delete,
+        plan.unchanged
+    ) == expected
+
+
+def test_price_only_update_carries_new_metadata_and_same_hash():
+    plan = plan_sync([build_document(*changed(ARDUINO, price=19.99, quantity=3))], indexed(ARDUINO))
+
+    metadata = plan.to_update[0]["metadata"]
+    assert (metadata["price"], metadata["quantity"]) == (19.99, 3)
+    assert metadata["content_hash"] == indexed(ARDUINO)["1"]["content_hash"]
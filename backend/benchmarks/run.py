@@ -0,0 +1,339 @@
+"""
+End-to-end benchmarks for the retrieval, prompt and HTTP paths.
+
+Everything runs offline: the LLM and embeddings use the fake providers, the
+vector store is a NumPy store in a temporary directory and the catalog and
+chat history are synthetic. The API suite uses SQLite unless
+``--database-url`` points at a scratch PostgreSQL database.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.run --products 100000 --requests 500 --concurrency 16
+    python -m benchmarks.run --suites retrieval --compare benchmarks/results/<baseline>.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.stats import rss_mb, run_async, run_sync
+from benchmarks.synthetic import generate_history, generate_products, generate_queries
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SUITES = ("retrieval", "prompt", "api")
+# Only needed so app modules import; nothing connects to them.
+PLACEHOLDER_ENV = {
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "JWT_SECRET_KEY": "bench",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+}
+INGEST_BATCH_SIZE = 1000
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the offline end-to-end benchmarks.")
+    parser.add_argument("--suites", default=",".join(SUITES), help="Comma-separated subset of: " + ", ".join(SUITES))
+    parser.add_argument("--products", type=int, default=10000, help="Synthetic catalog size")
+    parser.add_argument("--requests", type=int, default=200, help="Measured calls per benchmark")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers for the async and API benchmarks")
+    parser.add_argument("--history-turns", type=int, default=20, help="Prior user/assistant turns per conversation")
+    parser.add_argument("--dimension", type=int, default=256, help="Fake embedding dimension")
+    parser.add_argument("--llm-latency-ms", type=float, default=50, help="Median fake LLM time to first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0, help="Fake LLM generation rate (0 = instant)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--database-url", default=None, help="SQLAlchemy URL for the API suite (default: temporary SQLite)")
+    parser.add_argument("--output", default=str(BACKEND_DIR / "benchmarks" / "results"), help="Directory for JSON results")
+    parser.add_argument("--compare", default=None, help="Earlier results file to print deltas against")
+    args = parser.parse_args(argv)
+    args.suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+    return args
+
+
+def configure_environment(args: argparse.Namespace, workdir: Path) -> None:
+    """Point the app at offline providers and scratch storage; must run before importing ``app``."""
+    os.environ.update({
+        "LLM_PROVIDER": "fake",
+        "EMBEDDING_PROVIDER": "fake",
+        "FAKE_EMBEDDING_DIMENSION": str(args.dimension),
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_LLM_TOKENS_PER_SECOND": str(args.llm_tokens_per_second),
+        "FAKE_PROVIDER_SEED": str(args.seed),
+        "VECTOR_BACKEND": "numpy",
+        "NUMPY_STORE_PATH": str(workdir / "numpy"),
+        "EMBEDDING_CACHE_DISK_PATH": "",
+    })
+    for key, value in PLACEHOLDER_ENV.items():
+        os.environ.setdefault(key, value)
+
+    # Keep the benchmark's catalog version bumps away from the real data directory.
+    from app.rag import catalog_version
+    catalog_version.VERSION_FILE = workdir / "catalog_version"
+
+
+def quiet_logs() -> None:
+    """Keep per-request app and HTTP client logs out of the measurements."""
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_retrieval_suite(args: argparse.Namespace, rows: List[tuple], queries: List[str]) -> Dict[str, Any]:
+    from app.embeddings.client import base_embeddings
+    from app.rag import numpy_store
+    from app.rag.lexical_index import BM25Index, lexical_index
+    from app.rag.retriever import get_retriever
+    from app.rag.seed_vector_db import build_document
+
+    results = {}
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    for offset in range(0, len(rows), INGEST_BATCH_SIZE):
+        docs = [build_document(*row) for row in rows[offset:offset + INGEST_BATCH_SIZE]]
+        numpy_store.add_embedded_documents(docs, base_embeddings.embed_documents([doc["text"] for doc in docs]))
+    numpy_store.flush()
+    elapsed = time.perf_counter() - start
+    results["ingest"] = {
+        "documents": len(rows),
+        "seconds": round(elapsed, 3),
+        "documents_per_second": round(len(rows) / elapsed, 1) if elapsed else 0.0,
+        "index_mb": round(rss_mb() - rss_before, 1),
+        "rss_mb": round(rss_mb(), 1)
+    }
+    logger.info("Ingested %d products in %.1fs", len(rows), elapsed)
+
+    lexical_index.loader = lambda: rows
+    start = time.perf_counter()
+    bm25 = BM25Index.from_rows(rows)
+    results["bm25_build"] = {"documents": len(bm25), "seconds": round(time.perf_counter() - start, 3), "rss_mb": round(rss_mb(), 1)}
+
+    under_500 = {"price": {"$lt": 500}}
+    retrievers = {
+        "vector": (get_retriever(k=3), None),
+        "vector_filtered": (get_retriever(k=3), under_500),
+        "vector_mmr": (get_retriever(k=3, mmr_lambda=0.5), None),
+        "hybrid": (get_retriever(k=3, retrieval_mode="hybrid"), None),
+    }
+    for name, (retriever, where) in retrievers.items():
+        results[f"retrieve_{name}"] = run_sync(lambda query: retriever.invoke(query, where), queries)
+    vector = retrievers["vector"][0]
+    results["retrieve_vector_async"] = asyncio.run(run_async(vector.ainvoke, queries, args.concurrency))
+    results["bm25_search"] = run_sync(lambda query: bm25.search(query, 10), queries)
+    return results
+
+
+def run_prompt_suite(args: argparse.Namespace, rows: List[tuple], queries: List[str]) -> Dict[str, Any]:
+    from langchain_core.documents import Document
+    from app.rag.seed_vector_db import build_document
+    from app.services.chat.prompt_builder import build_chat_prompt
+
+    docs = []
+    for row in rows[:10]:
+        doc = build_document(*row)
+        docs.append(Document(id=doc["id"], page_content=doc["text"], metadata=doc["metadata"]))
+    short_history = generate_history(2, args.seed)
+    long_history = generate_history(args.history_turns, args.seed)
+    return {
+        "prompt_short_history": run_sync(lambda query: build_chat_prompt(docs[:3], query, short_history), queries),
+        "prompt_long_history": run_sync(lambda query: build_chat_prompt(docs[:3], query, long_history), queries),
+        "prompt_many_documents": run_sync(lambda query: build_chat_prompt(docs, query, long_history), queries),
+    }
+
+
+def _seed_database(session_factory, rows: List[tuple], history_turns: int, seed: int) -> int:
+    """Insert the catalog (only into an empty products table) and a user with chat history; returns the user id."""
+    from sqlalchemy import func, insert, select
+    from app.models.chat_message import ChatMessage
+    from app.models.product import Product
+    from app.models.user import User
+
+    with session_factory() as db:
+        if not db.scalar(select(func.count()).select_from(Product)):
+            for offset in range(0, len(rows), INGEST_BATCH_SIZE):
+                db.execute(insert(Product), [
+                    {"id": pid, "name": name, "brand": brand, "features": features,
+                     "price": price, "quantity": quantity, "categories": categories}
+                    for pid, name, brand, features, price, quantity, categories in rows[offset:offset + INGEST_BATCH_SIZE]
+                ])
+        else:
+            logger.info("Products table is not empty; benchmarking against the existing catalog")
+
+        user = db.scalar(select(User).where(User.email == "bench@example.com"))
+        if user is None:
+            user = User(email="bench@example.com", password="not-a-hash", name="Benchmark", role="user", is_active=True)
+            db.add(user)
+            db.flush()
+        db.query(ChatMessage).filter(ChatMessage.user_id == user.id).delete()
+        for message in generate_history(history_turns, seed):
+            db.add(ChatMessage(user_id=user.id, session_id=str(user.id), message_type=message["role"], content=message["content"]))
+        db.commit()
+        return user.id
+
+
+def run_api_suite(args: argparse.Namespace, rows: List[tuple], queries: List[str], workdir: Path) -> Dict[str, Any]:
+    import httpx
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import app.api.routers.chat as chat_router
+    import app.models  # noqa: F401  (registers every table on Base.metadata)
+    import app.services.product.product_snapshot as product_snapshot
+    from app.api.deps import get_current_active_user, get_db
+    from app.config.app_config import app_settings
+    from app.main import app
+    quiet_logs()
+    from app.models.user import User
+    from app.rag.lexical_index import lexical_index
+    from app.services.chat.history_writer import history_writer
+    from app.services.chat.session_summarizer import session_summarizer
+    from db.session import Base
+
+    database_url = args.database_url or f"sqlite:///{workdir / 'bench.sqlite3'}"
+    is_sqlite = database_url.startswith("sqlite")
+    engine = create_engine(database_url, connect_args={"check_same_thread": False} if is_sqlite else {})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    user_id = _seed_database(session_factory, rows, args.history_turns, args.seed)
+
+    def bench_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def bench_user():
+        with session_factory() as db:
+            return db.get(User, user_id)
+
+    app.dependency_overrides[get_db] = bench_db
+    app.dependency_overrides[get_current_active_user] = bench_user
+    chat_router.SessionLocal = session_factory
+    product_snapshot.SessionLocal = session_factory
+    session_summarizer.session_factory = session_factory
+    history_writer.session_factory = session_factory
+    lexical_index.loader = lambda: rows
+
+    prefix = app_settings.api_prefix
+    categories = sorted({category for row in rows[:1000] for category in row[6]})
+
+    async def measure() -> Dict[str, Any]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            async def call(method: str, url: str, **kwargs) -> None:
+                response = await client.request(method, url, **kwargs)
+                response.raise_for_status()
+
+            results = {
+                "api_chat_ask": await run_async(
+                    lambda query: call("POST", f"{prefix}/chat/ask", json={"message": query}), queries, args.concurrency
+                ),
+                "api_products_list": await run_async(
+                    lambda page: call("GET", f"{prefix}/products/", params={"limit": 50, "offset": page * 50}),
+                    list(range(len(queries))), args.concurrency
+                ),
+            }
+            # Category filtering and search use PostgreSQL-only SQL (jsonb, ILIKE).
+            if not is_sqlite:
+                results["api_products_category"] = await run_async(
+                    lambda i: call("GET", f"{prefix}/products/", params={"category": categories[i % len(categories)]}),
+                    list(range(len(queries))), args.concurrency
+                )
+                results["api_products_search"] = await run_async(
+                    lambda query: call("GET", f"{prefix}/products/search", params={"query": query.split()[-1]}),
+                    queries, args.concurrency
+                )
+            else:
+                logger.info("Skipping /products?category= and /products/search: they need PostgreSQL")
+            await session_summarizer.wait_idle()
+            history_writer.flush()
+            return results
+
+    try:
+        return asyncio.run(measure())
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+def compare(current: Dict[str, Any], baseline_path: str) -> None:
+    """Print p95 latency and throughput changes against an earlier run."""
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    print(f"{'benchmark':32} {'p95 ms':>10} {'delta':>8} {'req/s':>10} {'delta':>8}")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or "p95_ms" not in result:
+            continue
+
+        def delta(key: str) -> str:
+            return f"{(result[key] - before[key]) / before[key] * 100:+.1f}%" if before.get(key) else "n/a"
+
+        print(f"{name:32} {result['p95_ms']:>10.2f} {delta('p95_ms'):>8} {result['throughput_rps']:>10.1f} {delta('throughput_rps'):>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    workdir = Path(tempfile.mkdtemp(prefix="rag-bench-"))
+    configure_environment(args, workdir)
+    quiet_logs()
+
+    rows = list(generate_products(args.products, args.seed))
+    queries = generate_queries(args.requests, args.seed)
+    results: Dict[str, Any] = {}
+    if "retrieval" in args.suites:
+        results.update(run_retrieval_suite(args, rows, queries))
+    if "prompt" in args.suites:
+        results.update(run_prompt_suite(args, rows, queries))
+    if "api" in args.suites:
+        results.update(run_api_suite(args, rows, queries, workdir))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "database_url")},
+        "database": "postgresql" if args.database_url and not args.database_url.startswith("sqlite") else "sqlite",
+        "results": results
+    }
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    output_path = output_dir / f"{stamp}-{report['commit'] or 'nogit'}.json"
+    output_path.write_text(json.dumps(report, indent=2))
+
+    for name, result in results.items():
+        print(f"{name:32} {json.dumps(result)}")
+    print(f"\nResults written to {output_path}")
+    if args.compare:
+        compare(report, args.compare)
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,90 @@
+"""Latency, throughput and memory measurement helpers."""
+import asyncio
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB (Linux), else the peak."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and KiB elsewhere.
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def summarize(latencies: Sequence[float], wall_seconds: float, errors: int = 0) -> Dict[str, Any]:
+    samples = np.asarray(latencies, dtype=np.float64) * 1000
+    count = len(samples)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) if count else (0.0, 0.0, 0.0)
+    return {
+        "requests": count + errors,
+        "errors": errors,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(samples.mean()), 3) if count else 0.0,
+        "max_ms": round(float(samples.max()), 3) if count else 0.0,
+        "throughput_rps": round(count / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "rss_mb": round(rss_mb(), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+
+def run_sync(fn: Callable[[Any], Any], inputs: Sequence[Any], concurrency: int = 1, warmup: int = 5) -> Dict[str, Any]:
+    """Call ``fn`` once per input from ``concurrency`` threads and summarize."""
+    for item in inputs[:warmup]:
+        fn(item)
+    latencies: List[float] = []
+    errors = 0
+
+    def timed(item):
+        start = time.perf_counter()
+        fn(item)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(timed, item) for item in inputs]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+async def run_async(fn: Callable[[Any], Awaitable[Any]], inputs: Sequence[Any], concurrency: int = 1, warmup: int = 5) -> Dict[str, Any]:
+    """Await ``fn`` once per input with at most ``concurrency`` in flight and summarize."""
+    for item in inputs[:warmup]:
+        await fn(item)
+    latencies: List[float] = []
+    errors = 0
+    queue = list(inputs)
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            item = queue.pop()
+            start = time.perf_counter()
+            try:
+                await fn(item)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
@@ -0,0 +1,78 @@
+"""Deterministic synthetic catalog, query and chat history generators."""
+import random
+from typing import Dict, Iterator, List, Tuple
+
+# category -> (product nouns, feature pool)
+CATALOG = {
+    "3d-printing": (["3D Printer", "Resin Printer", "Filament Dryer"], ["Auto Bed Leveling", "Direct Drive", "220x220x250mm Build", "Resume Print", "Silent Mainboard", "Glass Bed"]),
+    "drones": (["Drone", "FPV Drone", "Camera Drone"], ["4K Camera", "34min Flight", "Obstacle Avoidance", "GPS Return Home", "Foldable", "3-axis Gimbal"]),
+    "headphones": (["Headphones", "Earbuds", "Gaming Headset"], ["Noise Cancelling", "30h Battery", "Bluetooth 5.3", "Spatial Audio", "USB-C Charging", "Low Latency"]),
+    "laptops": (["Laptop", "Ultrabook", "Gaming Laptop"], ["16GB RAM", "512GB SSD", "OLED Display", "Thunderbolt 4", "Backlit Keyboard", "RTX Graphics"]),
+    "cameras": (["Mirrorless Camera", "Action Camera", "Vlogging Camera"], ["33MP Full-Frame", "4K Video", "Eye AF", "5-axis Stabilization", "Waterproof", "Flip Screen"]),
+    "single-board-computers": (["Single Board Computer", "Microcontroller", "Dev Kit"], ["Quad-core ARM", "WiFi", "GPIO Header", "4GB RAM", "USB Interface", "PoE Support"]),
+    "tablets": (["Tablet", "Drawing Tablet", "E-reader"], ["11-inch Display", "Stylus Support", "128GB", "AMOLED", "All-day Battery", "Keyboard Cover"]),
+    "gaming": (["Console", "Controller", "VR Headset"], ["OLED Screen", "Wireless", "Haptic Feedback", "120Hz", "Motion Tracking", "Dock Included"]),
+}
+BRANDS = ["Creality", "DJI", "Sony", "Bose", "Apple", "Samsung", "Raspberry Pi", "Arduino", "Nintendo", "Meta", "GoPro", "Lenovo", "Anker", "Logitech", "Elegoo", "Prusa"]
+QUERY_TEMPLATES = [
+    "{noun} under ${price}",
+    "best {noun} with {feature}",
+    "{brand} {noun}",
+    "do you have a {noun} in stock?",
+    "cheap {noun} for beginners",
+    "{brand} {model}",
+]
+ProductRow = Tuple[int, str, str, str, float, int, List[str]]
+
+
+def _model_code(rng: random.Random) -> str:
+    return f"{rng.choice('ABCDEFGHKMSXZ')}{rng.choice('ABCDEFGHKMSXZ')}-{rng.randint(100, 9999)}"
+
+
+def generate_products(count: int, seed: int = 7, start_id: int = 1) -> Iterator[ProductRow]:
+    """Yield ``(id, name, brand, features, price, quantity, categories)`` rows.
+
+    Rows have the same shape as ``app.rag.ingest.iter_product_rows``, so they
+    can be fed to ``build_document`` and ``BM25Index.from_rows`` directly.
+    """
+    rng = random.Random(seed)
+    categories = list(CATALOG)
+    for product_id in range(start_id, start_id + count):
+        category = rng.choice(categories)
+        nouns, features = CATALOG[category]
+        brand = rng.choice(BRANDS)
+        name = f"{brand} {rng.choice(nouns)} {_model_code(rng)}"
+        chosen = rng.sample(features, rng.randint(2, 4))
+        price = round(rng.lognormvariate(5.5, 0.9), 2)
+        quantity = 0 if rng.random() < 0.15 else rng.randint(1, 200)
+        extra = rng.sample([c for c in categories if c != category], rng.randint(0, 1))
+        yield product_id, name, brand, ";".join(chosen), price, quantity, [category] + extra
+
+
+def generate_queries(count: int, seed: int = 11) -> List[str]:
+    """Shopper-style questions drawn from the same vocabulary as the catalog."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        nouns, features = CATALOG[rng.choice(list(CATALOG))]
+        queries.append(rng.choice(QUERY_TEMPLATES).format(
+            noun=rng.choice(nouns).lower(),
+            feature=rng.choice(features).lower(),
+            brand=rng.choice(BRANDS),
+            model=_model_code(rng),
+            price=rng.choice([50, 100, 300, 800, 1500])
+        ))
+    return queries
+
+
+def generate_history(turns: int, seed: int = 13, reply_words: int = 120) -> List[Dict[str, str]]:
+    """Alternating user/assistant messages; replies are long, like real answers."""
+    rng = random.Random(seed)
+    questions = generate_queries(turns, seed)
+    filler = "This model offers great value with reliable build quality and strong reviews from customers".split()
+    history = []
+    for question in questions:
+        history.append({"role": "user", "content": question})
+        words = [rng.choice(filler) for _ in range(reply_words)]
+        history.append({"role": "assistant", "content": "Here are some options. " + " ".join(words) + "."})
+    return history
@@ -36,10 +36,45 @@ CREATE TABLE IF NOT EXISTS chat_messages (
 CREATE INDEX IF NOT EXISTS idx_chat_messages_user_id ON chat_messages(user_id);
 CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages(session_id);
 CREATE INDEX IF NOT EXISTS idx_chat_messages_created_at ON chat_messages(created_at);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_user_session_created ON chat_messages(user_id, session_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_user_created ON chat_messages(user_id, created_at DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS chat_session_summaries (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    session_id VARCHAR(100) NOT NULL,
+    summary TEXT NOT NULL,
+    last_message_id INTEGER NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_chat_session_summaries_session UNIQUE (user_id, session_id)
+);
+
+CREATE TABLE IF NOT EXISTS chat_message_counts (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    message_count BIGINT NOT NULL DEFAULT 0,
+    cleared_through_id INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS chat_messages_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    message_type VARCHAR(20) NOT NULL,
+    content TEXT NOT NULL,
+    session_id VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_archive_user ON chat_messages_archive(user_id);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_archive_created ON chat_messages_archive(created_at);
 
 COMMENT ON TABLE products IS 'Product and stock catalog for e-commerce';
 COMMENT ON TABLE users IS 'User accounts for authentication and personalization';
 COMMENT ON TABLE chat_messages IS 'Chat conversation history for each user session';
+COMMENT ON TABLE chat_session_summaries IS 'Rolling summary of older turns, used in place of them in prompts';
+COMMENT ON TABLE chat_message_counts IS 'Per-user message totals and clear watermark kept in step with chat_messages inserts and deletes';
+COMMENT ON TABLE chat_messages_archive IS 'Chat messages older than the retention window, moved out of chat_messages';
 
 insert into products (name, brand, features, price, quantity, categories, image_url, created_at, updated_at) values
     ('Arduino Uno R3', 'Arduino', 'Microcontroller;14 Digital I/O;6 Analog Inputs;USB Interface', 25.0, 50, '["microcontrollers", "electronics", "maker", "arduino", "programming"]', 'https://images.unsplash.com/photo-1581091226825-a6a2a5aee158?w=400', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP),
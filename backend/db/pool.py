@@ -0,0 +1,56 @@
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.core.metrics import metrics
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection.
+
+    The wait covers queueing for a free connection, opening a new one and
+    the pre-ping, i.e. everything a request spends before it can run SQL.
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            metrics.increment("db_pool_timeouts")
+            raise
+        finally:
+            metrics.observe("db_pool_wait_seconds", time.perf_counter() - start)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Publish connection lifecycle events of ``engine``'s pool to ``metrics``."""
+    pool = engine.pool
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        if isinstance(pool, QueuePool):
+            metrics.observe("db_pool_checked_out", pool.checkedout())
+
+    event.listen(engine, "connect", lambda *args: metrics.increment("db_pool_connects"))
+    event.listen(engine, "close", lambda *args: metrics.increment("db_pool_disconnects"))
+    event.listen(engine, "invalidate", lambda *args: metrics.increment("db_pool_invalidations"))
+    event.listen(engine, "checkout", on_checkout)
+
+
+def pool_stats(engine: Engine) -> Dict[str, Any]:
+    """Current occupancy of ``engine``'s pool."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "timeout_seconds": pool.timeout()
+    }
@@ -6,6 +6,9 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from app.config.app_config import app_settings
+from db.pool import InstrumentedQueuePool, instrument_engine
+
 logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -20,7 +23,24 @@ DB_PASSWORD = os.getenv('POSTGRES_PASSWORD')
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL)
+
+def _connect_args() -> dict:
+    if app_settings.db_statement_timeout_ms > 0:
+        return {"options": f"-c statement_timeout={app_settings.db_statement_timeout_ms}"}
+    return {}
+
+
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=app_settings.db_pool_size,
+    max_overflow=app_settings.db_max_overflow,
+    pool_timeout=app_settings.db_pool_timeout_seconds,
+    pool_recycle=app_settings.db_pool_recycle_seconds,
+    pool_pre_ping=app_settings.db_pool_pre_ping,
+    connect_args=_connect_args()
+)
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()